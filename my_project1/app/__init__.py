@@ -4,62 +4,107 @@ from app.routes.drivers import motoristas_bp
 from app.routes.trips import viagens_bp
 from app.routes.payment_records import registros_pagamento_bp
 from app.database import inicializador_banco
+from app.pool import preencher_pool
+from app.idempotencia import iniciar_limpeza
+from app.eventos import iniciar_despachante
+from app.pagamentos_automaticos import iniciar_trabalhador
+from app.ganhos import iniciar_consolidador
+from app.lancamentos import iniciar_consolidacao
+from app.reservas import iniciar_liberador, validar_configuracao
 from app.error import register_erro_handlers
+from app.metricas import register_metricas
+from app.serializacao import register_json
 from app.brute_force import limiter
+from app.log import configurar_logging
+import threading
 
 
-def create_api1():
-    app1 = Flask('API1')
-
-    limiter.init_app(app1)
+def _inicializacao(*servicos):
+    pronto = threading.Event()
+    lock = threading.Lock()
 
-    inicializador_banco()
+    # Banco, pool e threads de fundo só sobem na primeira requisição (ou
+    # quando o servidor chama inicializar_app); importar o pacote ou criar
+    # o app não abre conexão nenhuma.
+    def inicializar():
+        if pronto.is_set():
+            return
 
-    app1.register_blueprint(passageiros_bp, url_prefix='/passageiros')
+        with lock:
+            if pronto.is_set():
+                return
 
-    register_erro_handlers(app1)
+            inicializador_banco()
+            preencher_pool()
+            for iniciar in servicos:
+                iniciar()
 
-    return app1
+            pronto.set()
 
+    return inicializar
 
-def create_api2():
-    app2 = Flask('API2')
 
-    limiter.init_app(app2)
+def _criar_app(nome, blueprints, servicos):
+    validar_configuracao()
+    configurar_logging()
 
-    inicializador_banco()
+    app = Flask(nome)
 
-    app2.register_blueprint(motoristas_bp, url_prefix='/motoristas')
+    limiter.init_app(app)
 
-    register_erro_handlers(app2)
+    for blueprint, prefixo in blueprints:
+        app.register_blueprint(blueprint, url_prefix=prefixo)
 
-    return app2
+    inicializar = _inicializacao(*servicos)
+    app.extensions['inicializar'] = inicializar
+    app.before_request(inicializar)
 
+    register_erro_handlers(app)
+    register_metricas(app)
+    register_json(app)
 
-def create_api3():
-    app3 = Flask('API3')
-
-    limiter.init_app(app3)
+    return app
 
-    inicializador_banco()
 
-    app3.register_blueprint(viagens_bp, url_prefix='/viagens')
+def inicializar_app(app):
+    app.extensions['inicializar']()
+    return app
 
-    register_erro_handlers(app3)
 
-    return app3
+def create_api1():
+    return _criar_app(
+        'API1',
+        [(passageiros_bp, '/passageiros')],
+        [iniciar_despachante, iniciar_consolidacao])
 
 
-def create_api4():
-    app4 = Flask('API4')
+def create_api2():
+    return _criar_app(
+        'API2',
+        [(motoristas_bp, '/motoristas')],
+        [iniciar_despachante, iniciar_consolidador, iniciar_consolidacao])
 
-    limiter.init_app(app4)
 
-    inicializador_banco()
+def create_api3():
+    return _criar_app(
+        'API3',
+        [(viagens_bp, '/viagens')],
+        [iniciar_despachante, iniciar_limpeza, iniciar_liberador])
 
-    app4.register_blueprint(registros_pagamento_bp,
-                             url_prefix='/registros-pagamento')
-    
-    register_erro_handlers(app4)
 
-    return app4
+def create_api4():
+    return _criar_app(
+        'API4',
+        [(registros_pagamento_bp, '/registros-pagamento')],
+        [iniciar_despachante, iniciar_limpeza, iniciar_trabalhador])
+
+
+def create_api_unica():
+    return _criar_app(
+        'API',
+        [(passageiros_bp, '/passageiros'),
+         (motoristas_bp, '/motoristas'),
+         (viagens_bp, '/viagens'),
+         (registros_pagamento_bp, '/registros-pagamento')],
+        [iniciar_despachante, iniciar_consolidador, iniciar_consolidacao,
+         iniciar_limpeza, iniciar_liberador, iniciar_trabalhador])
@@ -0,0 +1,529 @@
+from contextlib import asynccontextmanager
+from app.auth import autenticar
+from app.database import inicializador_banco, espera_repeticao
+from app.eventos import iniciar_despachante
+from app.log import configurar_logging
+from app.serializacao import serializar, mapeador_do_cursor
+from app.routes.trips import (COLUNAS_VIAGEM,
+                               INSERIR_VIAGEM_SQL,
+                                reserva_sql,
+                                 diagnostico_sql,
+                                  avaliar_reserva,
+                                   validar_reserva,
+                                    corpo_reserva)
+from app.routes.payment_records import (COLUNAS_REGISTRO,
+                                         VIAGEM_REGISTRO_SQL,
+                                          REGISTRO_EXISTENTE_SQL,
+                                           INSERIR_REGISTRO_SQL,
+                                            avaliar_viagem,
+                                             validar_registro,
+                                              corpo_registro)
+from app.idempotencia import (CABECALHO,
+                               CABECALHO_REPETIDA,
+                                ERRO_CONFLITO,
+                                 APAGAR_EXPIRADA_SQL,
+                                  REGISTRAR_CHAVE_SQL,
+                                   CHAVE_SALVA_SQL,
+                                    SALVAR_RESPOSTA_SQL,
+                                     validar_chave,
+                                      calcular_impressao,
+                                       repeticao_valida,
+                                        contar_registrada)
+from app.pagamentos_automaticos import ENFILEIRAR_SQL
+from app.ganhos import GANHO_VIAGEM_SQL
+from app import eventos
+from app import config
+from app import cache
+from limits import parse
+from limits.aio.strategies import FixedWindowRateLimiter
+from limits.storage import storage_from_string
+import argparse
+import asyncio
+import logging
+import json
+import re
+
+try:
+    import aiomysql
+    from pymysql.err import MySQLError, IntegrityError
+except ImportError:
+    aiomysql = None
+    MySQLError = IntegrityError = None
+
+
+logger = logging.getLogger(__name__)
+
+
+_pool = None
+
+
+async def abrir_pool():
+    global _pool
+
+    if aiomysql is None:
+        raise RuntimeError('aiomysql não está instalado!')
+
+    _pool = await aiomysql.create_pool(
+        host=config.DB_HOST,
+        port=config.DB_PORTA,
+        user=config.DB_USUARIO,
+        password=config.DB_SENHA,
+        db=config.DB_NOME,
+        charset='utf8mb4',
+        autocommit=False,
+        minsize=config.ASGI_POOL_MIN,
+        maxsize=config.ASGI_POOL_MAX,
+        pool_recycle=config.POOL_VIDA_MAXIMA)
+
+    logger.info(
+        f'Pool assíncrono criado (min={config.ASGI_POOL_MIN}, '
+        f'max={config.ASGI_POOL_MAX}).')
+
+
+async def fechar_pool():
+    global _pool
+
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+
+@asynccontextmanager
+async def conexao_assincrona():
+    async with _pool.acquire() as con:
+        async with con.cursor() as cursor:
+            try:
+                yield cursor
+                await con.commit()
+            except Exception:
+                await con.rollback()
+                raise
+
+
+async def executar_transacao_assincrona(funcao, *args):
+    tentativa = 0
+
+    while True:
+        tentativa += 1
+        try:
+            async with conexao_assincrona() as cursor:
+                return await funcao(cursor, *args)
+
+        except MySQLError as erro:
+            errno = erro.args[0] if erro.args else None
+            espera = espera_repeticao(
+                funcao.__name__, errno, str(erro), tentativa)
+            if espera is None:
+                raise
+
+            await asyncio.sleep(espera)
+
+
+LIMITE_ROTA = parse('100 per hour')
+
+_limitador = None
+
+
+def _obter_limitador():
+    global _limitador
+
+    # Criado já dentro do loop: o armazenamento assíncrono agenda a expiração
+    # das janelas nele. Com Redis, divide os contadores entre os workers.
+    if _limitador is None:
+        _limitador = FixedWindowRateLimiter(
+            storage_from_string(f'async+{config.LIMITES_STORAGE_URI}'))
+
+    return _limitador
+
+
+async def dentro_do_limite(requisicao, rota):
+    if not config.LIMITES_HABILITADOS:
+        return True
+
+    return await _obter_limitador().hit(LIMITE_ROTA, requisicao.ip, rota)
+
+
+async def executar_idempotente_assincrono(requisicao, funcao, *args):
+    chave = requisicao.chave
+    if chave is None:
+        return await executar_transacao_assincrona(funcao, *args)
+
+    id_usuario = int(requisicao.id_usuario)
+    rota = requisicao.caminho[:100]
+    impressao = calcular_impressao(requisicao.caminho, await requisicao.corpo())
+
+    async def transacao(cursor):
+        await cursor.execute(APAGAR_EXPIRADA_SQL, (id_usuario, chave))
+
+        try:
+            await cursor.execute(
+                REGISTRAR_CHAVE_SQL,
+                (id_usuario, chave, rota, impressao, config.IDEMPOTENCIA_TTL))
+
+        except IntegrityError as erro:
+            if erro.args[0] != 1062:
+                raise
+
+            await cursor.execute(
+                f'{CHAVE_SALVA_SQL} FOR SHARE', (id_usuario, chave))
+            salva = await cursor.fetchone()
+
+            if not repeticao_valida(salva, impressao, id_usuario):
+                return 422, {'erro': ERRO_CONFLITO}
+
+            # Mesmo corpo gravado pela API Flask ou por esta: volta como está.
+            return salva[1], (salva[2] or '').encode(), \
+                [(CABECALHO_REPETIDA.lower().encode(), b'true')]
+
+        status, corpo = await funcao(cursor, *args)
+
+        await cursor.execute(
+            SALVAR_RESPOSTA_SQL,
+            (status, serializar(corpo).decode(), id_usuario, chave))
+        contar_registrada()
+
+        return status, corpo
+
+    return await executar_transacao_assincrona(transacao)
+
+
+async def _publicar(cursor, tipo, entidade, id_entidade, **dados):
+    await cursor.execute(
+        eventos.PUBLICAR_SQL,
+        eventos.parametros_evento(tipo, entidade, id_entidade, dados))
+
+
+async def reservar_viagem(cursor, id_passageiro, id_motorista,
+                          pagamento_automatico):
+    await cursor.execute(reserva_sql(), (id_motorista, id_passageiro))
+
+    if cursor.rowcount == 0:
+        await cursor.execute(diagnostico_sql(), (id_motorista, id_passageiro))
+        mensagem, status = avaliar_reserva(await cursor.fetchone())
+        logger.warning(mensagem)
+        return status, {'erro': mensagem}
+
+    await cursor.execute(INSERIR_VIAGEM_SQL, (id_motorista, id_passageiro))
+    novo_id = cursor.lastrowid
+
+    if config.GANHOS_ADIADOS:
+        await cursor.execute(GANHO_VIAGEM_SQL, (novo_id,))
+
+    await _publicar(cursor, eventos.VIAGEM_CRIADA, 'viagens', novo_id,
+                    id_passageiro=id_passageiro, id_motorista=id_motorista)
+
+    if pagamento_automatico:
+        await cursor.execute(ENFILEIRAR_SQL, (novo_id,))
+
+    return 201, corpo_reserva(novo_id, pagamento_automatico)
+
+
+async def registrar_pagamento(cursor, id_viagem):
+    await cursor.execute(VIAGEM_REGISTRO_SQL, (id_viagem,))
+    viagem = await cursor.fetchone()
+
+    registrada = False
+    if viagem:
+        await cursor.execute(REGISTRO_EXISTENTE_SQL, (id_viagem,))
+        registrada = await cursor.fetchone() is not None
+
+    valores, falha = avaliar_viagem(id_viagem, viagem, registrada)
+
+    if falha:
+        mensagem, status = falha
+        return status, {'erro': mensagem}
+
+    await cursor.execute(INSERIR_REGISTRO_SQL, valores)
+    novo_id = cursor.lastrowid
+
+    await _publicar(cursor, eventos.PAGAMENTO_REGISTRADO,
+                    'registros_pagamento', novo_id, id_viagem=id_viagem)
+
+    return 201, corpo_registro(novo_id)
+
+
+class Requisicao:
+    def __init__(self, scope, receive):
+        self.metodo = scope['method']
+        self.caminho = scope['path']
+        self.cabecalhos = {k.decode('latin-1').lower(): v.decode('latin-1')
+                           for k, v in scope['headers']}
+        self.ip = (scope.get('client') or ('',))[0]
+        self.id_usuario = None
+        self.chave = None
+        self._receive = receive
+        self._corpo = None
+
+    async def corpo(self):
+        if self._corpo is not None:
+            return self._corpo
+
+        partes = []
+        while True:
+            mensagem = await self._receive()
+            partes.append(mensagem.get('body', b''))
+            if not mensagem.get('more_body'):
+                self._corpo = b''.join(partes)
+                return self._corpo
+
+    async def json(self):
+        tipo = self.cabecalhos.get('content-type', '')
+        if tipo.split(';')[0].strip() != 'application/json':
+            logger.warning('Requisição deve ser Content_type: application/json.')
+            raise ValueError(
+                'Requisição deve ser Content-type: application/json!')
+
+        try:
+            dados = json.loads(await self.corpo())
+        except ValueError:
+            logger.warning(
+                'JSON malformado! Dados inválidos no corpo da requisição.')
+            raise ValueError('JSON malformado. Dados inválidos!')
+
+        if not dados or not isinstance(dados, dict):
+            logger.warning('Dados ausentes ou inválidos no corpo da requisição.')
+            raise ValueError(
+                'Dados ausentes ou inválidos no corpo da requisição!')
+
+        return dados
+
+
+async def responder(send, status, corpo, cabecalhos=()):
+    # bytes: corpo já serializado, como o de uma resposta idempotente salva.
+    conteudo = corpo if isinstance(corpo, bytes) else serializar(corpo)
+
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(conteudo)).encode()),
+                    *cabecalhos]
+    })
+    await send({'type': 'http.response.body', 'body': conteudo})
+
+
+async def adicionar_viagem(requisicao):
+    logger.info('Adicionando viagem...')
+
+    try:
+        id_passageiro, id_motorista, pagamento_automatico = \
+            validar_reserva(await requisicao.json())
+    except ValueError as erro:
+        logger.warning(str(erro))
+        return 400, {'erro': str(erro)}
+
+    resposta = await executar_idempotente_assincrono(
+        requisicao, reservar_viagem,
+        id_passageiro, id_motorista, pagamento_automatico)
+
+    # Resposta repetida (três elementos) não publicou nem alterou nada.
+    status, corpo = resposta[:2]
+    if status == 201 and len(resposta) == 2:
+        eventos.contar_publicado()
+        cache.invalidar('passageiros', id_passageiro)
+        cache.invalidar('motoristas', id_motorista)
+        logger.info(f"Viagem id={corpo['id']} adicionada com sucesso.")
+
+    return resposta
+
+
+async def adicionar_pagamento(requisicao):
+    logger.info('Adicionando registro de pagamentos...')
+
+    try:
+        id_viagem = validar_registro(await requisicao.json())
+    except ValueError as erro:
+        logger.warning(str(erro))
+        return 400, {'erro': str(erro)}
+
+    resposta = await executar_idempotente_assincrono(
+        requisicao, registrar_pagamento, id_viagem)
+
+    status, corpo = resposta[:2]
+    if status == 201 and len(resposta) == 2:
+        eventos.contar_publicado()
+        logger.info(
+            f"Registro de pagamento id={corpo['id']} adicionado com sucesso.")
+
+    return resposta
+
+
+async def _buscar(entidade, colunas, id):
+    registro = cache.ler(entidade, id)
+    if registro is not None:
+        return registro
+
+    marca = cache.marcar()
+
+    async with conexao_assincrona() as cursor:
+        await cursor.execute(f'''
+            SELECT {', '.join(colunas)}
+                FROM {entidade} WHERE id = %s''', (id,))
+        dado = await cursor.fetchone()
+
+        if not dado:
+            return None
+
+        registro = mapeador_do_cursor(cursor)(dado)
+
+    cache.guardar(entidade, id, registro, marca)
+    return registro
+
+
+async def buscar_viagem(requisicao, id):
+    logger.info(f'Buscando viagem com id={id}...')
+    registro = await _buscar('viagens', COLUNAS_VIAGEM, id)
+
+    if registro is None:
+        logger.warning(f'Viagem id={id} não encontrada.')
+        return 404, {'erro': 'Viagem não encontrado!'}
+
+    return 200, registro
+
+
+async def buscar_registro_pagamento(requisicao, id):
+    logger.info(f'Buscando registro de pagamento com id={id}...')
+    registro = await _buscar('registros_pagamento', COLUNAS_REGISTRO, id)
+
+    if registro is None:
+        logger.warning(f'Registro de pagamento id={id} não encontrado.')
+        return 404, {'erro': 'Registro de pagamento não encontrado!'}
+
+    return 200, registro
+
+
+ROTAS = [
+    ('POST', re.compile(r'/viagens/?'), adicionar_viagem,
+     'viagens.adicionar_viagem',
+     'Erro inesperado ao adicionar viagem!'),
+    ('GET', re.compile(r'/viagens/(\d+)'), buscar_viagem,
+     'viagens.buscar_viagem',
+     'Erro inesperado ao buscar viagem!'),
+    ('POST', re.compile(r'/registros-pagamento/?'), adicionar_pagamento,
+     'registros-pagamento.adicionar_pagamento',
+     'Erro inesperado ao adicionar registro de pagamento!'),
+    ('GET', re.compile(r'/registros-pagamento/(\d+)'),
+     buscar_registro_pagamento,
+     'registros-pagamento.buscar_registro_pagamento',
+     'Erro inesperado ao buscar registro de pagamento!')
+]
+
+class ApiAssincrona:
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._ciclo_de_vida(receive, send)
+
+        if scope['type'] != 'http':
+            return
+
+        requisicao = Requisicao(scope, receive)
+        await responder(send, *await self._despachar(requisicao))
+
+    async def _despachar(self, requisicao):
+        caminho_existe = False
+
+        for metodo, padrao, funcao, endpoint, mensagem_erro in ROTAS:
+            casamento = padrao.fullmatch(requisicao.caminho)
+            if not casamento:
+                continue
+
+            caminho_existe = True
+            if requisicao.metodo != metodo:
+                continue
+
+            # Mesma chave do Flask-Limiter (IP e endpoint Flask): com um
+            # LIMITES_STORAGE_URI compartilhado, as duas APIs somam no mesmo
+            # contador da rota.
+            if not await dentro_do_limite(requisicao, endpoint):
+                logger.warning(
+                    f'RATE LIMIT excedido | IP={requisicao.ip} | '
+                    f'rota={requisicao.caminho}')
+                return 429, {'erro': 'Muitas requisições. '
+                                     'Tente novamente mais tarde.'}
+
+            payload, status = autenticar(
+                requisicao.cabecalhos.get('authorization'))
+            if status != 200:
+                return status, payload
+
+            requisicao.id_usuario = payload.get('sub')
+
+            if metodo == 'POST':
+                try:
+                    requisicao.chave = validar_chave(
+                        requisicao.cabecalhos.get(CABECALHO.lower()))
+                except ValueError as erro:
+                    logger.warning(str(erro))
+                    return 400, {'erro': str(erro)}
+
+            try:
+                return await funcao(
+                    requisicao, *(int(g) for g in casamento.groups()))
+            except Exception as erro:
+                logger.error(f'{mensagem_erro} {str(erro)}')
+                return 500, {'erro': mensagem_erro}
+
+        if caminho_existe:
+            logger.warning(
+                f'Método HTTP não permitido nesta rota: {requisicao.caminho}')
+            return 405, {'erro': 'Método HTTP não permitido nesta rota!'}
+
+        logger.warning(f'Rota não encontrada: {requisicao.caminho}')
+        return 404, {'erro': 'Rota não encontrada!'}
+
+    async def _ciclo_de_vida(self, receive, send):
+        while True:
+            mensagem = await receive()
+
+            if mensagem['type'] == 'lifespan.startup':
+                try:
+                    await asyncio.to_thread(inicializador_banco)
+                    await abrir_pool()
+                    iniciar_despachante()
+                except Exception as erro:
+                    logger.error(f'Erro ao iniciar API assíncrona: {str(erro)}')
+                    await send({'type': 'lifespan.startup.failed',
+                                'message': str(erro)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+
+            elif mensagem['type'] == 'lifespan.shutdown':
+                await fechar_pool()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def create_api_asgi():
+    if config.SALDOS_LANCAMENTOS or config.RESERVA_DUAS_FASES:
+        raise ValueError(
+            'API assíncrona não suporta SALDOS_LANCAMENTOS '
+            'nem RESERVA_DUAS_FASES!')
+
+    configurar_logging()
+
+    return ApiAssincrona()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m app.asgi',
+        description='Executa a API assíncrona de viagens e registros '
+                    'de pagamento em um servidor ASGI.')
+    parser.add_argument('--host', default=config.SERVIDOR_HOST)
+    parser.add_argument('--porta', type=int, default=config.ASGI_PORTA)
+    parser.add_argument('--workers', type=int, default=config.ASGI_WORKERS)
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError:
+        parser.error('uvicorn não está instalado!')
+
+    uvicorn.run('app.asgi:create_api_asgi', factory=True, host=args.host,
+                port=args.porta, workers=args.workers, lifespan='on',
+                access_log=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,4 @@
 from datetime import datetime, timedelta, timezone
-from app.log import configurar_logging
 from flask import jsonify, request, g
 from functools import wraps
 import jwt
@@ -7,7 +6,6 @@ import logging
 
 
 
-configurar_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -99,22 +97,24 @@ def validar_token(token: str, token_type: str = 'access'):
         return {'erro': 'Erro inesperado ao válidar token!'}, 500
     
 
+def autenticar(auth):
+    if not auth:
+        logger.warning('Token não enviado.')
+        return {'erro': 'Token não enviado!'}, 401
+
+    partes = auth.split()
+
+    if len(partes) != 2 or partes[0].lower() != 'bearer':
+        logger.warning('JSON malformado. Use Bearer <token>')
+        return {'erro': 'JSON malformado! Use Bearer <token>'}, 401
+
+    return validar_token(partes[1], token_type='access')
+
+
 def rota_protegida(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
-        auth = request.headers.get('Authorization')
-
-        if not auth:
-            logger.warning('Token não enviado.')
-            return jsonify({'erro': 'Token não enviado!'}), 401
-        
-        partes = auth.split()
-
-        if len(partes) != 2 or partes[0].lower() != 'bearer':
-            logger.warning('JSON malformado. Use Bearer <token>')
-            return jsonify({'erro': 'JSON malformado! Use Bearer <token>'}), 401
-        
-        payload, status = validar_token(partes[1], token_type='access')
+        payload, status = autenticar(request.headers.get('Authorization'))
 
         if status != 200:
             return jsonify(payload), status
@@ -1,35 +1,57 @@
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from collections import defaultdict
-import time
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import MovingWindowRateLimiter
+from app import config
+import threading
+import os
 
 
-tentativa_login = defaultdict(list)
-
 MAX_TENTATIVAS = 5
 JANELA_TEMPO = 300
 
+LIMITE_LOGIN = parse(f'{MAX_TENTATIVAS} per {JANELA_TEMPO} seconds')
 
-def ip_bloqueado(ip):
-    agora = time.time()
 
-    tentativa_login[ip] = [
-        t for t in tentativa_login[ip]
-        if agora - t < JANELA_TEMPO
-    ]
+_tentativas = None
+_tentativas_pid = None
+_tentativas_lock = threading.Lock()
+
+
+def _obter_tentativas():
+    global _tentativas, _tentativas_pid
+
+    pid = os.getpid()
+    if _tentativas is not None and _tentativas_pid == pid:
+        return _tentativas
 
-    return len(tentativa_login[ip]) >= MAX_TENTATIVAS
+    # Mesmo armazenamento do limiter: com Redis, os trabalhadores do
+    # app.servidor compartilham o bloqueio em vez de cada um ter o seu.
+    with _tentativas_lock:
+        if _tentativas is None or _tentativas_pid != pid:
+            _tentativas = MovingWindowRateLimiter(
+                storage_from_string(config.LIMITES_STORAGE_URI))
+            _tentativas_pid = pid
+
+    return _tentativas
+
+
+def ip_bloqueado(ip):
+    return not _obter_tentativas().test(LIMITE_LOGIN, 'login', ip)
 
 
 def registrar_falha(ip):
-    tentativa_login[ip].append(time.time())
+    _obter_tentativas().hit(LIMITE_LOGIN, 'login', ip)
 
 
 def limpar_falhas(ip):
-    tentativa_login.pop(ip, None)
+    _obter_tentativas().clear(LIMITE_LOGIN, 'login', ip)
 
 
 limiter = Limiter(
     key_func=get_remote_address,
-    default_limits=['100 per hour']
+    default_limits=['100 per hour'],
+    storage_uri=config.LIMITES_STORAGE_URI,
+    enabled=config.LIMITES_HABILITADOS
 )
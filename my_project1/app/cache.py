@@ -0,0 +1,171 @@
+from collections import OrderedDict
+from app.database import apos_commit
+from app import config
+import threading
+import time
+
+
+class CacheLRU:
+    def __init__(self, max_entradas=10000, ttl=30.0):
+        if max_entradas < 1:
+            raise ValueError('Tamanho de cache inválido!')
+
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._contadores = {
+            'acertos': 0,
+            'falhas': 0,
+            'expiradas': 0,
+            'despejadas': 0,
+            'invalidadas': 0
+        }
+
+    def obter(self, chave):
+        agora = time.monotonic()
+
+        with self._lock:
+            entrada = self._dados.get(chave)
+
+            if entrada is None:
+                self._contadores['falhas'] += 1
+                return None
+
+            valor, expira_em = entrada
+            if agora >= expira_em:
+                del self._dados[chave]
+                self._contadores['expiradas'] += 1
+                self._contadores['falhas'] += 1
+                return None
+
+            self._dados.move_to_end(chave)
+            self._contadores['acertos'] += 1
+            return valor
+
+    def definir(self, chave, valor):
+        expira_em = time.monotonic() + self.ttl
+
+        with self._lock:
+            self._dados[chave] = (valor, expira_em)
+            self._dados.move_to_end(chave)
+
+            while len(self._dados) > self.max_entradas:
+                self._dados.popitem(last=False)
+                self._contadores['despejadas'] += 1
+
+    def remover(self, chave):
+        with self._lock:
+            if self._dados.pop(chave, None) is not None:
+                self._contadores['invalidadas'] += 1
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+
+    def metricas(self):
+        with self._lock:
+            dados = dict(self._contadores)
+            dados['entradas'] = len(self._dados)
+            dados['max_entradas'] = self.max_entradas
+            dados['ttl_s'] = self.ttl
+        return dados
+
+
+_backend = None
+_lock = threading.Lock()
+
+# Última invalidação de cada chave, numa sequência única do processo.
+# Guarda no máximo CACHE_MAX_ENTRADAS chaves; as mais antigas saem e
+# passam a valer pelo piso, que só recusa leituras anteriores a elas.
+_sequencia = 0
+_invalidadas = OrderedDict()
+_piso = 0
+
+
+def obter_backend():
+    global _backend
+
+    if _backend is None and config.CACHE_HABILITADO:
+        with _lock:
+            if _backend is None:
+                _backend = CacheLRU(max_entradas=config.CACHE_MAX_ENTRADAS,
+                                    ttl=config.CACHE_TTL)
+    return _backend
+
+
+def definir_backend(backend):
+    global _backend
+    with _lock:
+        _backend = backend
+
+
+def ler(entidade, id):
+    backend = obter_backend()
+    if backend is None:
+        return None
+
+    registro = backend.obter((entidade, id))
+    return dict(registro) if registro is not None else None
+
+
+def marcar():
+    return _sequencia
+
+
+def guardar(entidade, id, registro, marca):
+    backend = obter_backend()
+    if backend is None:
+        return
+
+    chave = (entidade, id)
+
+    with _lock:
+        if _invalidadas.get(chave, _piso) <= marca:
+            backend.definir(chave, dict(registro))
+
+
+def _remover(chaves):
+    global _sequencia, _piso
+
+    with _lock:
+        for chave in chaves:
+            _sequencia += 1
+            _invalidadas[chave] = _sequencia
+            _invalidadas.move_to_end(chave)
+
+        while len(_invalidadas) > config.CACHE_MAX_ENTRADAS:
+            _, _piso = _invalidadas.popitem(last=False)
+
+    backend = obter_backend()
+    if backend is None:
+        return
+
+    for chave in chaves:
+        backend.remover(chave)
+
+
+def invalidar(entidade, *ids):
+    chaves = [(entidade, id) for id in ids]
+
+    _remover(chaves)
+    apos_commit(lambda: _remover(chaves))
+
+
+def limpar():
+    global _piso
+
+    with _lock:
+        _invalidadas.clear()
+        _piso = _sequencia
+
+    backend = obter_backend()
+    if backend is not None:
+        backend.limpar()
+
+
+def metricas_cache():
+    backend = obter_backend()
+    return backend.metricas() if backend is not None else {}
@@ -0,0 +1,123 @@
+from flask import Response, jsonify, request
+from datetime import timezone
+import hashlib
+
+
+def colunas_com_versao(campos, versionada=False):
+    extras = ('atualizado_em', 'versao') if versionada else ('atualizado_em',)
+    return (*campos, *(c for c in extras if c not in campos))
+
+
+def gerar_etag(id, atualizado_em, campos, versao=None):
+    bruto = f"{id}:{atualizado_em.isoformat()}:{','.join(campos)}"
+    resumo = hashlib.sha1(bruto.encode()).hexdigest()[:20]
+
+    # A versão na frente deixa o mesmo ETag servir de If-Match no PUT.
+    if versao is None:
+        return resumo
+    return f'{versao}.{resumo}'
+
+
+def _em_utc(atualizado_em):
+    return atualizado_em.replace(tzinfo=timezone.utc)
+
+
+def requisicao_condicional():
+    return bool(request.if_none_match) or \
+        request.if_modified_since is not None
+
+
+def nao_modificado(id, atualizado_em, campos, versao=None):
+    if atualizado_em is None:
+        return False
+
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(
+            gerar_etag(id, atualizado_em, campos, versao))
+
+    if request.if_modified_since is not None:
+        return _em_utc(atualizado_em).replace(microsecond=0) <= \
+            request.if_modified_since
+
+    return False
+
+
+def aplicar_validadores(resposta, id, atualizado_em, campos, versao=None):
+    if atualizado_em is None:
+        return resposta
+
+    resposta.set_etag(gerar_etag(id, atualizado_em, campos, versao),
+                      weak=True)
+    resposta.last_modified = _em_utc(atualizado_em)
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    return resposta
+
+
+def resposta_nao_modificada(id, atualizado_em, campos, versao=None):
+    return aplicar_validadores(Response(status=304), id, atualizado_em, campos,
+                               versao)
+
+
+def resposta_com_validadores(registro, campos):
+    if 'atualizado_em' in campos:
+        atualizado_em = registro['atualizado_em']
+    else:
+        atualizado_em = registro.pop('atualizado_em')
+
+    if 'versao' in campos:
+        versao = registro['versao']
+    else:
+        versao = registro.pop('versao', None)
+
+    resposta = jsonify(registro)
+    return aplicar_validadores(resposta, registro['id'], atualizado_em,
+                               campos, versao), 200
+
+
+def ler_versao_esperada(dados):
+    esperada = None
+
+    if request.if_match and not request.if_match.star_tag:
+        # Aceita a versão pura ("3") ou o ETag devolvido pelo GET
+        # (W/"3.<resumo>"); só a versão entra na comparação.
+        tags = request.if_match.as_set(include_weak=True)
+        tag = next(iter(tags)) if len(tags) == 1 else ''
+        versao_tag = tag.split('.', 1)[0]
+        if not versao_tag.isdigit():
+            raise ValueError(
+                'If-Match deve conter a versão do registro ou o ETag do '
+                'GET, ex.: "3"!')
+        esperada = int(versao_tag)
+
+    versao = dados.get('versao')
+    if versao is not None:
+        if isinstance(versao, bool) or not isinstance(versao, int) \
+                or versao < 1:
+            raise ValueError('Valor inválido para versao!')
+
+        if esperada is not None and esperada != versao:
+            raise ValueError('If-Match e versao divergem!')
+        esperada = versao
+
+    return esperada
+
+
+def atualizar_versionado(cursor, tabela, id, campos, esperada=None):
+    # LAST_INSERT_ID(expr) devolve a nova versão no próprio UPDATE; a
+    # consulta extra só acontece em conflito ou registro inexistente.
+    set_sql = ''.join(f'{campo} = %s, ' for campo in campos)
+    sql = (f'UPDATE {tabela} SET {set_sql}'
+           f'versao = LAST_INSERT_ID(versao + 1) WHERE id = %s')
+    valores = [*campos.values(), id]
+
+    if esperada is not None:
+        sql += ' AND versao = %s'
+        valores.append(esperada)
+
+    cursor.execute(sql, valores)
+    if cursor.rowcount == 1:
+        return cursor.lastrowid, None
+
+    cursor.execute(f'SELECT versao FROM {tabela} WHERE id = %s', (id,))
+    atual = cursor.fetchone()
+    return None, atual[0] if atual else None
@@ -0,0 +1,88 @@
+import os
+
+
+DB_HOST = os.getenv('DB_HOST', '127.0.0.1')
+DB_PORTA = int(os.getenv('DB_PORTA', 3306))
+DB_USUARIO = os.getenv('DB_USUARIO', 'root')
+DB_SENHA = os.getenv('DB_SENHA', '')
+DB_NOME = os.getenv('DB_NOME', 'meubanco')
+
+
+POOL_TAMANHO_MIN = int(os.getenv('POOL_TAMANHO_MIN', 2))
+POOL_TAMANHO_MAX = int(os.getenv('POOL_TAMANHO_MAX', 20))
+POOL_TIMEOUT_CHECKOUT = float(os.getenv('POOL_TIMEOUT_CHECKOUT', 5))
+POOL_VIDA_MAXIMA = float(os.getenv('POOL_VIDA_MAXIMA', 1800))
+POOL_TEMPO_OCIOSO = float(os.getenv('POOL_TEMPO_OCIOSO', 300))
+POOL_PING_APOS = float(os.getenv('POOL_PING_APOS', 0))
+
+
+CACHE_HABILITADO = os.getenv('CACHE_HABILITADO', '1') == '1'
+CACHE_TTL = float(os.getenv('CACHE_TTL', 30))
+CACHE_MAX_ENTRADAS = int(os.getenv('CACHE_MAX_ENTRADAS', 10000))
+
+
+TRANSACAO_TENTATIVAS = int(os.getenv('TRANSACAO_TENTATIVAS', 4))
+TRANSACAO_ESPERA_BASE = float(os.getenv('TRANSACAO_ESPERA_BASE', 0.02))
+TRANSACAO_ESPERA_MAX = float(os.getenv('TRANSACAO_ESPERA_MAX', 0.5))
+
+
+IDEMPOTENCIA_TTL = int(os.getenv('IDEMPOTENCIA_TTL', 86400))
+IDEMPOTENCIA_INTERVALO_LIMPEZA = float(
+    os.getenv('IDEMPOTENCIA_INTERVALO_LIMPEZA', 300))
+IDEMPOTENCIA_LOTE_LIMPEZA = int(os.getenv('IDEMPOTENCIA_LOTE_LIMPEZA', 1000))
+
+
+LOG_FILA = int(os.getenv('LOG_FILA', 10000))
+
+
+EVENTOS_HABILITADO = os.getenv('EVENTOS_HABILITADO', '1') == '1'
+EVENTOS_INTERVALO = float(os.getenv('EVENTOS_INTERVALO', 0.5))
+EVENTOS_LOTE = int(os.getenv('EVENTOS_LOTE', 200))
+EVENTOS_ESPERA_LACUNA = float(os.getenv('EVENTOS_ESPERA_LACUNA', 30))
+EVENTOS_RETENCAO = int(os.getenv('EVENTOS_RETENCAO', 3600))
+
+
+PAGAMENTO_AUTOMATICO = os.getenv('PAGAMENTO_AUTOMATICO', '0') == '1'
+PAGAMENTOS_LOTE = int(os.getenv('PAGAMENTOS_LOTE', 200))
+PAGAMENTOS_INTERVALO = float(os.getenv('PAGAMENTOS_INTERVALO', 0.2))
+
+
+GANHOS_ADIADOS = os.getenv('GANHOS_ADIADOS', '0') == '1'
+GANHOS_INTERVALO = float(os.getenv('GANHOS_INTERVALO', 1.0))
+GANHOS_LOTE = int(os.getenv('GANHOS_LOTE', 5000))
+
+
+SALDOS_LANCAMENTOS = os.getenv('SALDOS_LANCAMENTOS', '0') == '1'
+LANCAMENTOS_INTERVALO = float(os.getenv('LANCAMENTOS_INTERVALO', 5.0))
+LANCAMENTOS_LOTE = int(os.getenv('LANCAMENTOS_LOTE', 10000))
+
+
+RESERVA_DUAS_FASES = os.getenv('RESERVA_DUAS_FASES', '0') == '1'
+RESERVA_VALIDADE = float(os.getenv('RESERVA_VALIDADE', 30))
+RESERVA_INTERVALO = float(os.getenv('RESERVA_INTERVALO', 5.0))
+RESERVA_LOTE = int(os.getenv('RESERVA_LOTE', 500))
+
+
+SERVIDOR_HOST = os.getenv('SERVIDOR_HOST', '127.0.0.1')
+SERVIDOR_WORKERS = int(os.getenv('SERVIDOR_WORKERS', 2))
+SERVIDOR_THREADS = int(os.getenv('SERVIDOR_THREADS', 8))
+SERVIDOR_BACKLOG = int(os.getenv('SERVIDOR_BACKLOG', 2048))
+SERVIDOR_MAX_REQUISICOES = int(os.getenv('SERVIDOR_MAX_REQUISICOES', 10000))
+SERVIDOR_VARIACAO_REQUISICOES = int(
+    os.getenv('SERVIDOR_VARIACAO_REQUISICOES', 1000))
+SERVIDOR_TEMPO_DRENAGEM = float(os.getenv('SERVIDOR_TEMPO_DRENAGEM', 30))
+SERVIDOR_REUSEPORT = os.getenv('SERVIDOR_REUSEPORT', '0') == '1'
+
+
+def por_api(nome, api, padrao):
+    return type(padrao)(os.getenv(f'{nome}_{api.upper()}', padrao))
+
+
+LIMITES_HABILITADOS = os.getenv('LIMITES_HABILITADOS', '1') == '1'
+LIMITES_STORAGE_URI = os.getenv('LIMITES_STORAGE_URI', 'memory://')
+
+
+ASGI_PORTA = int(os.getenv('ASGI_PORTA', 5005))
+ASGI_WORKERS = int(os.getenv('ASGI_WORKERS', 1))
+ASGI_POOL_MIN = int(os.getenv('ASGI_POOL_MIN', 2))
+ASGI_POOL_MAX = int(os.getenv('ASGI_POOL_MAX', 20))
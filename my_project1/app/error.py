@@ -1,53 +1,63 @@
 from flask import jsonify, request
 from flask_limiter.errors import RateLimitExceeded
 from mysql.connector import errors
-from app.log import configurar_logging
 import logging
 
 
-configurar_logging()
 logger = logging.getLogger(__name__)
 
 
-def tratamento_erro_mysql(erro):
-    if isinstance(erro, errors.IntegrityError):
-        logger.warning(f'Violação de integridade ou chave duplicada: {str(erro)}')
-        return jsonify({'erro': 'Violação de integridade ou chave duplicada!'}), 409
-    
-    if isinstance(erro, errors.DataError):
-        logger.warning(f'Tipo de dado inválido no banco SQL: {str(erro)}')
-        return jsonify({'erro': 'Tipo de dado inválido no banco SQL!'}), 400
-    
-    if isinstance(erro, errors.OperationalError):
-        logger.error(f'Erro de operação no banco SQL: {str(erro)}')
-        return jsonify({'erro': 'Erro de operação no banco SQL!'}), 500
-    
-    if isinstance(erro, errors.ProgrammingError):
-        logger.error(f'Erro de uso incorreto do cursor ou SQL inválida: {str(erro)}')
-        return jsonify({'erro': 'Erro de uso incorreto do cursor ou SQL inválida!'}), 500
-    
-    if isinstance(erro, errors.InterfaceError):
-        logger.error(f'Erro de comunicação com banco SQL: {str(erro)}')
-        return jsonify({'erro': 'Erro de comunicação com banco SQL!'}), 500
-    
-    if isinstance(erro, errors.NotSupportedError):
-        logger.error(f'Operação SQL não suportada pelo MySQL: {str(erro)}')
-        return jsonify({'erro': 'Operação SQL não suportado pelo MySQL!'}), 500
-    
-    if isinstance(erro, errors.InternalError):
-        logger.critical(f'Erros internos no banco SQL: {str(erro)}')
-        return jsonify({'erro': 'Erros internos no banco SQL!'}), 500
-    
-    if isinstance(erro, errors.PoolError):
-        logger.critical(f'Pool de conexões esgotado: {str(erro)}')
-        return jsonify({'erro': 'Serviço temporariamente indisponível!'}), 503
-    
-    if isinstance(erro, errors.DatabaseError):
-        logger.critical(f'Erro grave no banco SQL: {str(erro)}')
-        return jsonify({'erro': 'Erro grave no banco SQL!'}), 500
+ERROS_MYSQL = (
+    (errors.IntegrityError, logging.WARNING, 409,
+     'Violação de integridade ou chave duplicada',
+     'Violação de integridade ou chave duplicada!'),
+    (errors.DataError, logging.WARNING, 400,
+     'Tipo de dado inválido no banco SQL',
+     'Tipo de dado inválido no banco SQL!'),
+    (errors.OperationalError, logging.ERROR, 500,
+     'Erro de operação no banco SQL',
+     'Erro de operação no banco SQL!'),
+    (errors.ProgrammingError, logging.ERROR, 500,
+     'Erro de uso incorreto do cursor ou SQL inválida',
+     'Erro de uso incorreto do cursor ou SQL inválida!'),
+    (errors.InterfaceError, logging.ERROR, 500,
+     'Erro de comunicação com banco SQL',
+     'Erro de comunicação com banco SQL!'),
+    (errors.NotSupportedError, logging.ERROR, 500,
+     'Operação SQL não suportada pelo MySQL',
+     'Operação SQL não suportado pelo MySQL!'),
+    (errors.InternalError, logging.CRITICAL, 500,
+     'Erros internos no banco SQL',
+     'Erros internos no banco SQL!'),
+    (errors.PoolError, logging.CRITICAL, 503,
+     'Pool de conexões esgotado',
+     'Serviço temporariamente indisponível!'),
+    (errors.DatabaseError, logging.CRITICAL, 500,
+     'Erro grave no banco SQL',
+     'Erro grave no banco SQL!')
+)
 
-    logger.error(f'Erro inesperado no banco SQL: {str(erro)}')
-    return jsonify({'erro': 'Erro inesperado no banco SQL!'}), 500
+
+def _classificar_erro_mysql(erro):
+    for classe, nivel, status, registro, resposta in ERROS_MYSQL:
+        if isinstance(erro, classe):
+            return nivel, status, registro, resposta
+
+    return (logging.ERROR, 500, 'Erro inesperado no banco SQL',
+            'Erro inesperado no banco SQL!')
+
+
+def registrar_erro_mysql(erro):
+    # Só registra: conexao() roda também fora de requisição (trabalhadores
+    # de fundo), onde jsonify não existe e o erro original precisa subir.
+    nivel, _, registro, _ = _classificar_erro_mysql(erro)
+    logger.log(nivel, f'{registro}: {str(erro)}')
+
+
+def tratamento_erro_mysql(erro):
+    nivel, status, registro, resposta = _classificar_erro_mysql(erro)
+    logger.log(nivel, f'{registro}: {str(erro)}')
+    return jsonify({'erro': resposta}), status
 
 
 def register_erro_handlers(app):
@@ -85,6 +95,16 @@ def register_erro_handlers(app):
         logger.warning(f'Dados corretos, mas lógica errada: {str(erro)}')
         return jsonify({'erro': 'Dados corretos, mas lógica errada!'}), 422
     
+    @app.errorhandler(errors.PoolError)
+    def pool_esgotado(erro):
+        # conexao() já registrou o esgotamento; as rotas deixam o erro subir
+        # até aqui para responder 503 em vez do 500 genérico.
+        return jsonify({'erro': 'Serviço temporariamente indisponível!'}), 503
+
+    @app.errorhandler(errors.Error)
+    def erro_mysql(erro):
+        return tratamento_erro_mysql(erro)
+
     @app.errorhandler(Exception)
     def erro_interno(erro):
         logger.error(f'Erro inesperado ao acessar a rota: {str(erro)}')
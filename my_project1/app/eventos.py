@@ -0,0 +1,293 @@
+from collections import defaultdict
+from app.database import conexao
+from app import cache
+from app import config
+import threading
+import logging
+import json
+import time
+import os
+
+
+logger = logging.getLogger(__name__)
+
+
+VIAGEM_CRIADA = 'viagem.criada'
+VIAGEM_CANCELADA = 'viagem.cancelada'
+PAGAMENTO_REGISTRADO = 'pagamento.registrado'
+PAGAMENTO_CANCELADO = 'pagamento.cancelado'
+MOTORISTA_BLOQUEADO = 'motorista.bloqueado'
+
+TODOS = '*'
+LIMITE_LACUNA = 1000
+INTERVALO_PURGA = 60.0
+
+COLUNAS_EVENTO = 'id, tipo, entidade, id_entidade, dados, criado_em'
+
+
+_assinantes = defaultdict(list)
+_publicados = 0
+_publicados_lock = threading.Lock()
+
+
+def assinar(tipo, funcao):
+    _assinantes[tipo].append(funcao)
+    return funcao
+
+
+PUBLICAR_SQL = '''
+        INSERT INTO outbox (tipo, entidade, id_entidade, dados)
+            VALUES (%s, %s, %s, %s)'''
+
+
+def parametros_evento(tipo, entidade, id_entidade, dados):
+    return (tipo, entidade, id_entidade,
+            json.dumps(dados, default=str) if dados else None)
+
+
+def contar_publicado():
+    global _publicados
+
+    with _publicados_lock:
+        _publicados += 1
+
+
+def publicar(cursor, tipo, entidade, id_entidade, **dados):
+    cursor.execute(
+        PUBLICAR_SQL, parametros_evento(tipo, entidade, id_entidade, dados))
+    contar_publicado()
+
+
+def _evento(linha):
+    id, tipo, entidade, id_entidade, dados, criado_em = linha
+    return {
+        'id': id,
+        'tipo': tipo,
+        'entidade': entidade,
+        'id_entidade': id_entidade,
+        'dados': json.loads(dados) if dados else {},
+        'criado_em': criado_em
+    }
+
+
+class Despachante:
+    def __init__(self, assinantes=None, lote=200, intervalo=0.5,
+                 espera_lacuna=30.0, retencao=3600):
+        if lote < 1:
+            raise ValueError('Tamanho de lote inválido!')
+
+        self.assinantes = _assinantes if assinantes is None else assinantes
+        self.lote = lote
+        self.intervalo = intervalo
+        self.espera_lacuna = espera_lacuna
+        self.retencao = retencao
+
+        self.ultimo_id = None
+        self._lacunas = {}
+        self._parar = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self._contadores = {
+            'entregues': 0,
+            'falhas_assinantes': 0,
+            'lacunas_recuperadas': 0,
+            'lacunas_descartadas': 0,
+            'purgados': 0
+        }
+
+    def posicionar(self):
+        with conexao() as cursor:
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM outbox')
+            self.ultimo_id = cursor.fetchone()[0]
+
+    def drenar(self):
+        with self._lock:
+            if self.ultimo_id is None:
+                self.posicionar()
+
+            total = 0
+            while True:
+                recuperados, novos = self._ler()
+                agora = time.monotonic()
+
+                for linha in recuperados:
+                    del self._lacunas[linha[0]]
+                self._contadores['lacunas_recuperadas'] += len(recuperados)
+
+                for linha in novos:
+                    if linha[0] - self.ultimo_id <= LIMITE_LACUNA:
+                        for faltando in range(self.ultimo_id + 1, linha[0]):
+                            self._lacunas[faltando] = agora + self.espera_lacuna
+                    self.ultimo_id = linha[0]
+
+                for linha in sorted(recuperados + novos):
+                    self._entregar(_evento(linha))
+                total += len(recuperados) + len(novos)
+
+                expiradas = [i for i, prazo in self._lacunas.items()
+                             if prazo <= agora]
+                for id in expiradas:
+                    del self._lacunas[id]
+                self._contadores['lacunas_descartadas'] += len(expiradas)
+
+                if len(novos) < self.lote:
+                    return total
+
+    def _ler(self):
+        recuperados = []
+
+        with conexao() as cursor:
+            if self._lacunas:
+                ids = list(self._lacunas)
+                marcadores = ', '.join(['%s'] * len(ids))
+                cursor.execute(f'''
+                    SELECT {COLUNAS_EVENTO} FROM outbox
+                        WHERE id IN ({marcadores})''', ids)
+                recuperados = cursor.fetchall()
+
+            cursor.execute(f'''
+                SELECT {COLUNAS_EVENTO} FROM outbox
+                    WHERE id > %s ORDER BY id LIMIT %s''',
+                (self.ultimo_id, self.lote))
+            novos = cursor.fetchall()
+
+        return recuperados, novos
+
+    def _entregar(self, evento):
+        funcoes = (self.assinantes.get(evento['tipo'], [])
+                   + self.assinantes.get(TODOS, []))
+
+        for funcao in funcoes:
+            try:
+                funcao(evento)
+                self._contadores['entregues'] += 1
+            except Exception as erro:
+                self._contadores['falhas_assinantes'] += 1
+                logger.error(
+                    f'Erro no assinante {funcao.__name__} do evento '
+                    f"{evento['tipo']} id={evento['id']}: {str(erro)}")
+
+    def purgar(self):
+        removidos = 0
+
+        # Em lotes até esvaziar: um lote por ciclo de purga ficaria abaixo
+        # da taxa de inserção e a outbox cresceria sem limite.
+        while True:
+            with conexao() as cursor:
+                cursor.execute('''
+                    DELETE FROM outbox
+                        WHERE criado_em < NOW(6) - INTERVAL %s SECOND
+                        LIMIT %s''', (self.retencao, self.lote))
+                apagados = cursor.rowcount
+
+            removidos += apagados
+            with self._lock:
+                self._contadores['purgados'] += apagados
+
+            if apagados < self.lote or self._parar.is_set():
+                break
+
+        if removidos:
+            logger.info(f'{removidos} eventos antigos removidos da outbox.')
+
+        return removidos
+
+    def iniciar(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._parar.clear()
+        self._thread = threading.Thread(
+            target=self._executar, name='despachante-eventos', daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._thread = None
+
+    def _executar(self):
+        proxima_purga = time.monotonic() + INTERVALO_PURGA
+
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.drenar()
+
+                if time.monotonic() >= proxima_purga:
+                    self.purgar()
+                    proxima_purga = time.monotonic() + INTERVALO_PURGA
+
+            except Exception as erro:
+                logger.error(f'Erro ao despachar eventos: {str(erro)}')
+
+    def metricas(self):
+        with self._lock:
+            dados = dict(self._contadores)
+            dados['ultimo_id'] = self.ultimo_id
+            dados['lacunas_pendentes'] = len(self._lacunas)
+        return dados
+
+
+_despachante = None
+_despachante_pid = None
+_despachante_lock = threading.Lock()
+
+
+def obter_despachante():
+    global _despachante, _despachante_pid
+
+    pid = os.getpid()
+    if _despachante is not None and _despachante_pid == pid:
+        return _despachante
+
+    with _despachante_lock:
+        if _despachante is None or _despachante_pid != pid:
+            _despachante = Despachante(
+                lote=config.EVENTOS_LOTE,
+                intervalo=config.EVENTOS_INTERVALO,
+                espera_lacuna=config.EVENTOS_ESPERA_LACUNA,
+                retencao=config.EVENTOS_RETENCAO
+            )
+            _despachante_pid = pid
+
+    return _despachante
+
+
+def iniciar_despachante():
+    if not config.EVENTOS_HABILITADO:
+        return
+
+    despachante = obter_despachante()
+    try:
+        despachante.posicionar()
+    except Exception as erro:
+        logger.error(f'Erro ao posicionar despachante de eventos: {str(erro)}')
+
+    despachante.iniciar()
+
+
+def metricas_eventos():
+    dados = obter_despachante().metricas()
+    with _publicados_lock:
+        dados['publicados'] = _publicados
+    return dados
+
+
+ENTIDADES_RELACIONADAS = {
+    'id_passageiro': 'passageiros',
+    'id_motorista': 'motoristas',
+    'id_viagem': 'viagens'
+}
+
+
+def invalidar_cache(evento):
+    cache.invalidar(evento['entidade'], evento['id_entidade'])
+
+    for campo, entidade in ENTIDADES_RELACIONADAS.items():
+        if evento['dados'].get(campo) is not None:
+            cache.invalidar(entidade, evento['dados'][campo])
+
+
+assinar(TODOS, invalidar_cache)
@@ -0,0 +1,74 @@
+from flask import request
+from datetime import datetime
+
+
+METODOS_PAGAMENTO = ('pix', 'credito', 'debito', 'boleto')
+
+
+def inteiro_positivo(valor):
+    valor = int(valor)
+    if valor <= 0:
+        raise ValueError
+    return valor
+
+
+def opcao(*valores):
+    def converter(valor):
+        valor = valor.strip().lower()
+        if valor not in valores:
+            raise ValueError
+        return valor
+    return converter
+
+
+def data_hora(valor):
+    return datetime.fromisoformat(valor.strip())
+
+
+def ler_campos(colunas):
+    valor = request.args.get('fields')
+    if valor is None or valor.strip() == '':
+        return colunas
+
+    pedidos = {c.strip() for c in valor.split(',') if c.strip()}
+    invalidos = pedidos - set(colunas)
+
+    if invalidos:
+        raise ValueError(f"Campos inválidos: {', '.join(sorted(invalidos))}")
+
+    return tuple(c for c in colunas if c == 'id' or c in pedidos)
+
+
+INTERVALO_CRIADO_EM = (('criado_desde', '>='),
+                       ('criado_ate', '<'))
+
+
+def ler_filtros(campos):
+    clausulas = []
+    parametros = []
+
+    for campo, converter in campos.items():
+        valor = request.args.get(campo)
+        if valor is None or valor.strip() == '':
+            continue
+
+        try:
+            parametros.append(converter(valor))
+        except (ValueError, TypeError):
+            raise ValueError(f'Filtro {campo} inválido!')
+
+        clausulas.append(f'{campo} = %s')
+
+    for argumento, operador in INTERVALO_CRIADO_EM:
+        valor = request.args.get(argumento)
+        if valor is None or valor.strip() == '':
+            continue
+
+        try:
+            parametros.append(data_hora(valor))
+        except (ValueError, TypeError):
+            raise ValueError(f'Filtro {argumento} deve ser data ISO 8601!')
+
+        clausulas.append(f'criado_em {operador} %s')
+
+    return clausulas, parametros
@@ -0,0 +1,183 @@
+from collections import defaultdict
+from app.database import executar_transacao
+from app.lancamentos import coluna_conta
+from app import cache
+from app import config
+import threading
+import logging
+import os
+
+
+logger = logging.getLogger(__name__)
+
+
+PENDENTES_SQL = '''(SELECT COALESCE(SUM(g.valor), 0) FROM ganhos_pendentes g
+                     WHERE g.id_motorista = motoristas.id)'''
+
+ULTIMO_PENDENTE_SQL = '''(SELECT MAX(g.criado_em) FROM ganhos_pendentes g
+                          WHERE g.id_motorista = motoristas.id)'''
+
+
+def coluna_motorista(campo):
+    if config.SALDOS_LANCAMENTOS:
+        return coluna_conta('motorista', campo)
+
+    if not config.GANHOS_ADIADOS:
+        return campo
+
+    if campo == 'quantia':
+        return f'quantia + {PENDENTES_SQL} AS quantia'
+
+    if campo == 'atualizado_em':
+        return (f'GREATEST(atualizado_em, COALESCE({ULTIMO_PENDENTE_SQL}, '
+                f'atualizado_em)) AS atualizado_em')
+
+    return campo
+
+
+def colunas_motorista(campos):
+    return ', '.join(coluna_motorista(c) for c in campos)
+
+
+GANHO_VIAGEM_SQL = '''
+        INSERT INTO ganhos_pendentes (id_motorista, id_viagem, valor)
+            SELECT id_motorista, id, total_viagem
+                FROM viagens WHERE id = %s'''
+
+
+def registrar_ganho(cursor, id_viagem):
+    cursor.execute(GANHO_VIAGEM_SQL, (id_viagem,))
+
+
+def registrar_estorno(cursor, id_motorista, id_viagem, valor):
+    cursor.execute('''
+        INSERT INTO ganhos_pendentes (id_motorista, id_viagem, valor)
+            VALUES (%s, %s, %s)''', (id_motorista, id_viagem, -valor))
+
+
+def ganhos_pendentes(cursor, id_motorista):
+    cursor.execute('''
+        SELECT COALESCE(SUM(valor), 0) FROM ganhos_pendentes
+            WHERE id_motorista = %s''', (id_motorista,))
+    return cursor.fetchone()[0]
+
+
+class ConsolidadorGanhos:
+    def __init__(self, lote=5000, intervalo=1.0):
+        if lote < 1:
+            raise ValueError('Tamanho de lote inválido!')
+
+        self.lote = lote
+        self.intervalo = intervalo
+
+        self._parar = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self._contadores = {
+            'consolidacoes': 0,
+            'lancamentos': 0,
+            'motoristas': 0
+        }
+
+    def _consolidar(self, cursor):
+        cursor.execute('SET TRANSACTION ISOLATION LEVEL READ COMMITTED')
+        cursor.execute('''
+            SELECT id, id_motorista, valor FROM ganhos_pendentes
+                ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED''', (self.lote,))
+        pendentes = cursor.fetchall()
+
+        if not pendentes:
+            return 0, []
+
+        totais = defaultdict(int)
+        for _, id_motorista, valor in pendentes:
+            totais[id_motorista] += valor
+
+        for id_motorista in sorted(totais):
+            cursor.execute(
+                'UPDATE motoristas SET quantia = quantia + %s WHERE id = %s',
+                (totais[id_motorista], id_motorista))
+
+        ids = [p[0] for p in pendentes]
+        marcadores = ', '.join(['%s'] * len(ids))
+        cursor.execute(
+            f'DELETE FROM ganhos_pendentes WHERE id IN ({marcadores})', ids)
+
+        return len(pendentes), sorted(totais)
+
+    def consolidar(self):
+        lancamentos, motoristas = executar_transacao(self._consolidar)
+
+        if lancamentos:
+            cache.invalidar('motoristas', *motoristas)
+
+            with self._lock:
+                self._contadores['consolidacoes'] += 1
+                self._contadores['lancamentos'] += lancamentos
+                self._contadores['motoristas'] += len(motoristas)
+
+            logger.info(
+                f'{lancamentos} ganhos consolidados em '
+                f'{len(motoristas)} motoristas.')
+
+        return lancamentos
+
+    def iniciar(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._parar.clear()
+        self._thread = threading.Thread(
+            target=self._executar, name='consolidador-ganhos', daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._thread = None
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                while self.consolidar() == self.lote:
+                    pass
+            except Exception as erro:
+                logger.error(f'Erro ao consolidar ganhos: {str(erro)}')
+
+    def metricas(self):
+        with self._lock:
+            return dict(self._contadores)
+
+
+_consolidador = None
+_consolidador_pid = None
+_consolidador_lock = threading.Lock()
+
+
+def obter_consolidador():
+    global _consolidador, _consolidador_pid
+
+    pid = os.getpid()
+    if _consolidador is not None and _consolidador_pid == pid:
+        return _consolidador
+
+    with _consolidador_lock:
+        if _consolidador is None or _consolidador_pid != pid:
+            _consolidador = ConsolidadorGanhos(
+                lote=config.GANHOS_LOTE,
+                intervalo=config.GANHOS_INTERVALO
+            )
+            _consolidador_pid = pid
+
+    return _consolidador
+
+
+def iniciar_consolidador():
+    if config.GANHOS_ADIADOS:
+        obter_consolidador().iniciar()
+
+
+def metricas_ganhos():
+    return obter_consolidador().metricas()
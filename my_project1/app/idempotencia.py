@@ -0,0 +1,238 @@
+from flask import request, g, current_app, make_response
+from mysql.connector import errors
+from app.database import conexao, executar_transacao
+from app import config
+import threading
+import hashlib
+import logging
+import re
+
+
+logger = logging.getLogger(__name__)
+
+
+CABECALHO = 'Idempotency-Key'
+CABECALHO_REPETIDA = 'Idempotent-Replayed'
+PADRAO_CHAVE = re.compile(r'[\x21-\x7e]{1,255}')
+ERRO_CONFLITO = f'{CABECALHO} já usada com outra requisição!'
+
+
+# SQL compartilhado com a API assíncrona (app.asgi).
+APAGAR_EXPIRADA_SQL = '''
+    DELETE FROM chaves_idempotencia
+        WHERE id_usuario = %s AND chave = %s
+        AND expira_em <= NOW()'''
+
+REGISTRAR_CHAVE_SQL = '''
+    INSERT INTO chaves_idempotencia
+        (id_usuario, chave, rota, impressao, expira_em)
+        VALUES (%s, %s, %s, %s, NOW() + INTERVAL %s SECOND)'''
+
+CHAVE_SALVA_SQL = '''
+    SELECT impressao, status, corpo FROM chaves_idempotencia
+        WHERE id_usuario = %s AND chave = %s'''
+
+SALVAR_RESPOSTA_SQL = '''
+    UPDATE chaves_idempotencia SET status = %s, corpo = %s
+        WHERE id_usuario = %s AND chave = %s'''
+
+
+_contadores = {
+    'registradas': 0,
+    'repetidas': 0,
+    'conflitos': 0,
+    'expiradas_removidas': 0
+}
+_contadores_lock = threading.Lock()
+
+
+def _contar(chave, quantidade=1):
+    with _contadores_lock:
+        _contadores[chave] += quantidade
+
+
+def ler_chave():
+    return validar_chave(request.headers.get(CABECALHO))
+
+
+def validar_chave(chave):
+    if chave is None:
+        return None
+
+    chave = chave.strip()
+    if not PADRAO_CHAVE.fullmatch(chave):
+        raise ValueError(
+            f'{CABECALHO} deve ter de 1 a 255 caracteres ASCII visíveis!')
+
+    return chave
+
+
+def calcular_impressao(caminho, corpo):
+    digest = hashlib.sha1(caminho.encode())
+    digest.update(corpo)
+    return digest.hexdigest()
+
+
+def _impressao():
+    return calcular_impressao(request.path, request.get_data())
+
+
+def _resposta_repetida(status, corpo):
+    resposta = current_app.response_class(
+        corpo or '', status=status,
+        mimetype='application/json' if corpo else None)
+    resposta.headers[CABECALHO_REPETIDA] = 'true'
+    return resposta
+
+
+def _conflito():
+    return current_app.response_class(
+        current_app.json.dumps({'erro': ERRO_CONFLITO}),
+        status=422, mimetype='application/json')
+
+
+def repeticao_valida(salva, impressao, id_usuario):
+    if salva[0] != impressao:
+        _contar('conflitos')
+        logger.warning(
+            f'{CABECALHO} reutilizada com outra requisição '
+            f'(usuario={id_usuario}).')
+        return False
+
+    _contar('repetidas')
+    logger.info(
+        f'Resposta repetida para {CABECALHO} (usuario={id_usuario}).')
+    return True
+
+
+def contar_registrada():
+    _contar('registradas')
+
+
+def _repetir(salva, impressao, id_usuario):
+    if not repeticao_valida(salva, impressao, id_usuario):
+        return _conflito()
+
+    return _resposta_repetida(salva[1], salva[2])
+
+
+def resposta_salva(chave):
+    # Consulta sem trava para quem precisa agir antes da transação
+    # idempotente (ex.: a reserva em duas fases não deve segurar saldo só
+    # para devolver uma resposta já registrada).
+    if chave is None:
+        return None
+
+    id_usuario = int(g.id_usuario)
+
+    with conexao() as cursor:
+        cursor.execute(f'{CHAVE_SALVA_SQL} AND expira_em > NOW()',
+                       (id_usuario, chave))
+        salva = cursor.fetchone()
+
+    if salva is None or salva[1] is None:
+        return None
+
+    return _repetir(salva, _impressao(), id_usuario)
+
+
+def executar_idempotente(chave, funcao, *args):
+    if chave is None:
+        return executar_transacao(funcao, *args)
+
+    id_usuario = int(g.id_usuario)
+    rota = request.path[:100]
+    impressao = _impressao()
+
+    def transacao(cursor):
+        cursor.execute(APAGAR_EXPIRADA_SQL, (id_usuario, chave))
+
+        try:
+            cursor.execute(
+                REGISTRAR_CHAVE_SQL,
+                (id_usuario, chave, rota, impressao, config.IDEMPOTENCIA_TTL))
+
+        except errors.IntegrityError as erro:
+            if erro.errno != 1062:
+                raise
+
+            cursor.execute(f'{CHAVE_SALVA_SQL} FOR SHARE', (id_usuario, chave))
+            return _repetir(cursor.fetchone(), impressao, id_usuario)
+
+        resposta = make_response(funcao(cursor, *args))
+
+        cursor.execute(
+            SALVAR_RESPOSTA_SQL,
+            (resposta.status_code, resposta.get_data(as_text=True),
+             id_usuario, chave))
+        contar_registrada()
+
+        return resposta
+
+    return executar_transacao(transacao)
+
+
+def limpar_expiradas():
+    removidas = 0
+
+    while True:
+        with conexao() as cursor:
+            cursor.execute('''
+                DELETE FROM chaves_idempotencia
+                    WHERE expira_em <= NOW() LIMIT %s''',
+                (config.IDEMPOTENCIA_LOTE_LIMPEZA,))
+            apagadas = cursor.rowcount
+
+        removidas += apagadas
+        if apagadas < config.IDEMPOTENCIA_LOTE_LIMPEZA:
+            break
+
+    if removidas:
+        _contar('expiradas_removidas', removidas)
+        logger.info(f'{removidas} chaves de idempotência expiradas removidas.')
+
+    return removidas
+
+
+_limpeza = None
+_limpeza_parar = threading.Event()
+_limpeza_lock = threading.Lock()
+
+
+def _executar_limpeza():
+    while not _limpeza_parar.wait(config.IDEMPOTENCIA_INTERVALO_LIMPEZA):
+        try:
+            limpar_expiradas()
+        except Exception as erro:
+            logger.error(
+                f'Erro ao limpar chaves de idempotência: {str(erro)}')
+
+
+def iniciar_limpeza():
+    global _limpeza
+
+    with _limpeza_lock:
+        if _limpeza is not None and _limpeza.is_alive():
+            return
+
+        _limpeza_parar.clear()
+        _limpeza = threading.Thread(
+            target=_executar_limpeza,
+            name='limpeza-idempotencia',
+            daemon=True)
+        _limpeza.start()
+
+
+def parar_limpeza():
+    global _limpeza
+
+    with _limpeza_lock:
+        _limpeza_parar.set()
+        if _limpeza is not None:
+            _limpeza.join()
+        _limpeza = None
+
+
+def metricas_idempotencia():
+    with _contadores_lock:
+        return dict(_contadores)
@@ -0,0 +1,280 @@
+from flask import jsonify
+from app.database import conexao, executar_transacao
+from app.paginacao import ler_paginacao, resposta_paginada
+from app.serializacao import mapeador_do_cursor
+from app import config
+import threading
+import logging
+import os
+
+
+logger = logging.getLogger(__name__)
+
+
+CONTAS = {
+    'passageiro': ('passageiros', 'saldo'),
+    'motorista': ('motoristas', 'quantia')
+}
+
+CONTA_EXTERNA = ('externo', 0)
+
+
+def _snapshot_da_conta(conta, alias):
+    return f'''(SELECT s.saldo FROM saldos_snapshot s
+                 WHERE s.conta = '{conta}' AND s.id_conta = {alias}.id)'''
+
+
+def _pendentes_da_conta(conta, alias):
+    return f'''(SELECT COALESCE(SUM(l.valor), 0) FROM lancamentos l
+                 WHERE l.conta = '{conta}' AND l.id_conta = {alias}.id
+                 AND l.consolidado = FALSE)'''
+
+
+def _ultimo_lancamento_da_conta(conta, alias):
+    return f'''(SELECT l.criado_em FROM lancamentos l
+                 WHERE l.conta = '{conta}' AND l.id_conta = {alias}.id
+                 ORDER BY l.id DESC LIMIT 1)'''
+
+
+def saldo_sql(conta, alias):
+    _, coluna = CONTAS[conta]
+
+    if not config.SALDOS_LANCAMENTOS:
+        return f'{alias}.{coluna}'
+
+    # A coluna guarda só o saldo de abertura; o livro (snapshot consolidado
+    # mais lançamentos pendentes) carrega todo movimento posterior.
+    snapshot = _snapshot_da_conta(conta, alias)
+    pendentes = _pendentes_da_conta(conta, alias)
+    return f'({alias}.{coluna} + COALESCE({snapshot}, 0) + {pendentes})'
+
+
+def coluna_conta(conta, campo):
+    tabela, coluna = CONTAS[conta]
+
+    if not config.SALDOS_LANCAMENTOS:
+        return campo
+
+    if campo == coluna:
+        return f'{saldo_sql(conta, tabela)} AS {coluna}'
+
+    if campo == 'atualizado_em':
+        ultimo = _ultimo_lancamento_da_conta(conta, tabela)
+        return (f'GREATEST(atualizado_em, COALESCE({ultimo}, '
+                f'atualizado_em)) AS atualizado_em')
+
+    return campo
+
+
+def colunas_conta(conta, campos):
+    return ', '.join(coluna_conta(conta, c) for c in campos)
+
+
+def lancar(cursor, referencia, tipo, partidas):
+    if sum(valor for _, _, valor in partidas) != 0:
+        raise ValueError(f'Partidas de {referencia} não fecham em zero!')
+
+    marcadores = ', '.join(['(%s, %s, %s, %s, %s)'] * len(partidas))
+    valores = [v for conta, id_conta, valor in partidas
+               for v in (referencia, tipo, conta, id_conta, valor)]
+
+    cursor.execute(f'''
+        INSERT INTO lancamentos (referencia, tipo, conta, id_conta, valor)
+            VALUES {marcadores}''', valores)
+
+
+def saldo_lancado(cursor, conta, id_conta):
+    # Leitura com trava só no livro, nunca na linha do cadastro: espera os
+    # lançamentos ainda não confirmados da mesma conta e lê o snapshot e os
+    # pendentes de forma consistente com o consolidador.
+    cursor.execute('''
+        SELECT COALESCE((SELECT saldo FROM saldos_snapshot
+                            WHERE conta = %s AND id_conta = %s
+                            FOR SHARE), 0)
+             + (SELECT COALESCE(SUM(valor), 0) FROM lancamentos
+                    WHERE conta = %s AND id_conta = %s
+                    AND consolidado = FALSE FOR SHARE)''',
+        (conta, id_conta, conta, id_conta))
+    return cursor.fetchone()[0]
+
+
+def saldo_atual(cursor, conta, id_conta):
+    tabela, coluna = CONTAS[conta]
+
+    cursor.execute(
+        f'SELECT {coluna} FROM {tabela} WHERE id = %s', (id_conta,))
+    linha = cursor.fetchone()
+
+    if not linha:
+        return None
+
+    return linha[0] + saldo_lancado(cursor, conta, id_conta)
+
+
+def ajustar_saldo(cursor, conta, id_conta, novo):
+    diferenca = novo - saldo_atual(cursor, conta, id_conta)
+
+    if diferenca:
+        lancar(cursor, f'ajuste:{conta}:{id_conta}', 'ajuste',
+               [(conta, id_conta, diferenca), (*CONTA_EXTERNA, -diferenca)])
+
+    return diferenca
+
+
+def resposta_lancamentos(conta, id_conta):
+    limite, apos = ler_paginacao()
+
+    with conexao() as cursor:
+        cursor.execute('''
+            SELECT id, referencia, tipo, valor, criado_em FROM lancamentos
+                WHERE conta = %s AND id_conta = %s AND id > %s
+                ORDER BY id LIMIT %s''', (conta, id_conta, apos, limite + 1))
+
+        mapear = mapeador_do_cursor(cursor)
+        dados = [mapear(l) for l in cursor.fetchall()]
+
+    if not dados:
+        return jsonify([]), 200
+
+    return resposta_paginada(dados, limite)
+
+
+class ConsolidadorLancamentos:
+    def __init__(self, lote=10000, intervalo=5.0):
+        if lote < 1:
+            raise ValueError('Tamanho de lote inválido!')
+
+        self.lote = lote
+        self.intervalo = intervalo
+
+        self._parar = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self._contadores = {
+            'consolidacoes': 0,
+            'lancamentos': 0,
+            'snapshots': 0
+        }
+
+    def _consolidar(self, cursor):
+        cursor.execute('SET TRANSACTION ISOLATION LEVEL READ COMMITTED')
+
+        # Cada lançamento é marcado ao entrar no snapshot, então um que
+        # confirme fora de ordem de id continua pendente até a próxima
+        # passada; não há marca d'água para ele ficar para trás.
+        cursor.execute('''
+            SELECT id, conta, id_conta, valor FROM lancamentos
+                WHERE consolidado = FALSE
+                ORDER BY id LIMIT %s
+                FOR UPDATE SKIP LOCKED''', (self.lote,))
+        linhas = cursor.fetchall()
+
+        if not linhas:
+            return 0, 0
+
+        somas = {}
+        for id_lancamento, conta, id_conta, valor in linhas:
+            if conta not in CONTAS:
+                continue
+
+            soma, ultimo = somas.get((conta, id_conta), (0, 0))
+            somas[(conta, id_conta)] = (soma + valor,
+                                        max(ultimo, id_lancamento))
+
+        if somas:
+            contas = sorted(somas.items())
+            marcadores = ', '.join(['(%s, %s, %s, %s)'] * len(contas))
+            cursor.execute(f'''
+                INSERT INTO saldos_snapshot
+                    (conta, id_conta, saldo, ate_lancamento)
+                    VALUES {marcadores}
+                    ON DUPLICATE KEY UPDATE
+                        saldo = saldo + VALUES(saldo),
+                        ate_lancamento = GREATEST(
+                            ate_lancamento, VALUES(ate_lancamento))''',
+                [v for (conta, id_conta), (soma, ultimo) in contas
+                 for v in (conta, id_conta, soma, ultimo)])
+
+        ids = [linha[0] for linha in linhas]
+        marcadores = ', '.join(['%s'] * len(ids))
+        cursor.execute(f'''
+            UPDATE lancamentos SET consolidado = TRUE
+                WHERE id IN ({marcadores})''', ids)
+
+        return len(linhas), len(somas)
+
+    def consolidar(self):
+        total, snapshots = executar_transacao(self._consolidar)
+
+        if total:
+            with self._lock:
+                self._contadores['consolidacoes'] += 1
+                self._contadores['lancamentos'] += total
+                self._contadores['snapshots'] += snapshots
+
+            logger.info(
+                f'{total} lançamentos consolidados em '
+                f'{snapshots} snapshots de saldo.')
+
+        return total
+
+    def iniciar(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._parar.clear()
+        self._thread = threading.Thread(
+            target=self._executar, name='consolidador-lancamentos',
+            daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._thread = None
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                while self.consolidar() >= self.lote:
+                    pass
+            except Exception as erro:
+                logger.error(f'Erro ao consolidar lançamentos: {str(erro)}')
+
+    def metricas(self):
+        with self._lock:
+            return dict(self._contadores)
+
+
+_consolidador = None
+_consolidador_pid = None
+_consolidador_lock = threading.Lock()
+
+
+def obter_consolidador():
+    global _consolidador, _consolidador_pid
+
+    pid = os.getpid()
+    if _consolidador is not None and _consolidador_pid == pid:
+        return _consolidador
+
+    with _consolidador_lock:
+        if _consolidador is None or _consolidador_pid != pid:
+            _consolidador = ConsolidadorLancamentos(
+                lote=config.LANCAMENTOS_LOTE,
+                intervalo=config.LANCAMENTOS_INTERVALO
+            )
+            _consolidador_pid = pid
+
+    return _consolidador
+
+
+def iniciar_consolidacao():
+    if config.SALDOS_LANCAMENTOS:
+        obter_consolidador().iniciar()
+
+
+def metricas_lancamentos():
+    return obter_consolidador().metricas()
@@ -1,14 +1,43 @@
-from logging.handlers import RotatingFileHandler
+from logging.handlers import (RotatingFileHandler,
+                               QueueHandler,
+                                QueueListener)
+from app import config
+import threading
+import atexit
+import queue
 import os
 import logging
 
 
-def configurar_logging():
+class ManipuladorFila(QueueHandler):
+    def __init__(self, fila):
+        super().__init__(fila)
+        self.descartados = 0
+
+    def enqueue(self, record):
+        # Nunca bloqueia a thread da requisição: com a fila cheia a mensagem
+        # é descartada e contada. Handler.handle já segura self.lock aqui.
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+class OuvinteFila(QueueListener):
+    def enqueue_sentinel(self):
+        # A fila pode estar cheia no encerramento; espera o ouvinte drenar
+        # em vez de perder o sentinela.
+        self.queue.put(self._sentinel)
+
+
+_manipulador = None
+_ouvinte = None
+_configurado_lock = threading.Lock()
+
+
+def _criar_handlers():
     if not os.path.exists('logs'):
         os.makedirs('logs')
-    
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
 
     file_handler = RotatingFileHandler(
         'logs/app.log',
@@ -27,5 +56,69 @@ def configurar_logging():
         '%(levelname)s: %(message)s'
     ))
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console)
+    return file_handler, console
+
+
+def _iniciar_ouvinte(handlers):
+    global _ouvinte
+
+    fila = queue.Queue(config.LOG_FILA)
+    _manipulador.queue = fila
+
+    _ouvinte = OuvinteFila(fila, *handlers, respect_handler_level=True)
+    _ouvinte.start()
+
+
+def _reiniciar_no_filho():
+    global _configurado_lock
+
+    # A thread do ouvinte não sobrevive ao fork; sem isso os trabalhadores
+    # do app.servidor só encheriam a fila herdada.
+    _configurado_lock = threading.Lock()
+    if _ouvinte is not None:
+        _manipulador.descartados = 0
+        _iniciar_ouvinte(_ouvinte.handlers)
+
+
+def configurar_logging():
+    global _manipulador
+
+    # Chamado por cada fábrica de app; os handlers só podem entrar uma vez,
+    # senão cada linha de log sai repetida.
+    with _configurado_lock:
+        if _manipulador is not None:
+            return
+
+        logger = logging.getLogger()
+        logger.setLevel(logging.INFO)
+
+        # Arquivo, console e rotação ficam na thread do ouvinte; a requisição
+        # só formata a mensagem e a coloca na fila.
+        _manipulador = ManipuladorFila(None)
+        _iniciar_ouvinte(_criar_handlers())
+
+        logger.addHandler(_manipulador)
+
+        atexit.register(encerrar_logging)
+        os.register_at_fork(after_in_child=_reiniciar_no_filho)
+
+
+def encerrar_logging():
+    with _configurado_lock:
+        if _ouvinte is None or _ouvinte._thread is None:
+            return
+
+        _ouvinte.stop()
+        for handler in _ouvinte.handlers:
+            handler.close()
+
+
+def metricas_logging():
+    if _manipulador is None:
+        return {'fila': 0, 'capacidade': config.LOG_FILA, 'descartados': 0}
+
+    return {
+        'fila': _manipulador.queue.qsize(),
+        'capacidade': config.LOG_FILA,
+        'descartados': _manipulador.descartados
+    }
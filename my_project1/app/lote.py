@@ -0,0 +1,211 @@
+from flask import jsonify
+from mysql.connector import errors
+from app.database import conexao
+import logging
+import json
+import time
+import csv
+import io
+
+
+logger = logging.getLogger(__name__)
+
+
+TAMANHO_LOTE = 500
+LIMITE_ITENS_LOTE = 5000
+LIMITE_REJEICOES = 1000
+
+
+def _conflito(coluna):
+    return {'status': 409, 'erro': f'{coluna} já cadastrado!'}
+
+
+def _existentes(cursor, tabela, lote, unicas):
+    marcadores = ', '.join(['%s'] * len(lote))
+    condicoes = ' OR '.join(f'{c} IN ({marcadores})' for c in unicas)
+    parametros = [registro[c] for c in unicas for _, registro in lote]
+
+    cursor.execute(
+        f"SELECT {', '.join(unicas)} FROM {tabela} WHERE {condicoes}",
+        parametros)
+
+    existentes = {c: set() for c in unicas}
+    for linha in cursor.fetchall():
+        for coluna, valor in zip(unicas, linha):
+            existentes[coluna].add(valor)
+    return existentes
+
+
+def _ids(cursor, tabela, chave, inseridos):
+    if not inseridos:
+        return {}
+
+    marcadores = ', '.join(['%s'] * len(inseridos))
+    cursor.execute(
+        f'SELECT {chave}, id FROM {tabela} WHERE {chave} IN ({marcadores})',
+        [registro[chave] for _, registro in inseridos])
+    return dict(cursor.fetchall())
+
+
+def _inserir_um_a_um(cursor, sql, colunas, livres, resultados):
+    inseridos = []
+
+    for indice, registro in livres:
+        try:
+            cursor.execute(sql, tuple(registro[c] for c in colunas))
+            inseridos.append((indice, registro))
+        except errors.IntegrityError as erro:
+            resultados[indice] = {'status': 409, 'erro': str(erro.msg)}
+        except errors.DataError as erro:
+            resultados[indice] = {'status': 400, 'erro': str(erro.msg)}
+
+    return inseridos
+
+
+def _inserir_lote(tabela, colunas, lote, unicas, chave):
+    resultados = {}
+    sql = (f"INSERT INTO {tabela} ({', '.join(colunas)}) "
+           f"VALUES ({', '.join(['%s'] * len(colunas))})")
+
+    with conexao() as cursor:
+        existentes = _existentes(cursor, tabela, lote, unicas)
+
+        livres = []
+        for indice, registro in lote:
+            repetida = next(
+                (c for c in unicas if registro[c] in existentes[c]), None)
+            if repetida:
+                resultados[indice] = _conflito(repetida)
+            else:
+                livres.append((indice, registro))
+
+        if livres:
+            try:
+                cursor.executemany(
+                    sql, [tuple(r[c] for c in colunas) for _, r in livres])
+            except (errors.IntegrityError, errors.DataError) as erro:
+                logger.warning(
+                    f'Lote de {tabela} rejeitado, inserindo item a item: '
+                    f'{str(erro)}')
+                livres = _inserir_um_a_um(
+                    cursor, sql, colunas, livres, resultados)
+
+        ids = _ids(cursor, tabela, chave, livres)
+        for indice, registro in livres:
+            resultados[indice] = {'status': 201, 'id': ids[registro[chave]]}
+
+    return resultados
+
+
+def inserir_em_lotes(tabela, colunas, itens, unicas, chave,
+                     tamanho_lote=TAMANHO_LOTE):
+    resultados = {}
+    vistos = {c: set() for c in unicas}
+    pendentes = []
+
+    for indice, registro in itens:
+        repetida = next(
+            (c for c in unicas if registro[c] in vistos[c]), None)
+        if repetida:
+            resultados[indice] = _conflito(repetida)
+            continue
+
+        for coluna in unicas:
+            vistos[coluna].add(registro[coluna])
+        pendentes.append((indice, registro))
+
+    for inicio in range(0, len(pendentes), tamanho_lote):
+        resultados.update(_inserir_lote(
+            tabela, colunas, pendentes[inicio:inicio + tamanho_lote],
+            unicas, chave))
+
+    return resultados
+
+
+def resposta_lote(resultados, total):
+    itens = [{'indice': indice, **resultados[indice]}
+             for indice in sorted(resultados)]
+    criados = sum(1 for item in itens if item['status'] == 201)
+
+    logger.info(f'Lote processado: {criados} de {total} itens criados.')
+    return jsonify({
+        'criados': criados,
+        'rejeitados': total - criados,
+        'resultados': itens
+    }), 201 if criados == total else 207
+
+
+def _texto(fluxo):
+    return io.TextIOWrapper(fluxo, encoding='utf-8-sig', newline='')
+
+
+def ler_csv(fluxo):
+    leitor = csv.DictReader(_texto(fluxo))
+
+    for linha in leitor:
+        yield leitor.line_num, {
+            k.strip(): (v.strip() or None) if isinstance(v, str) else v
+            for k, v in linha.items() if k is not None}
+
+
+def ler_ndjson(fluxo):
+    for numero, linha in enumerate(_texto(fluxo), start=1):
+        if not linha.strip():
+            continue
+
+        try:
+            yield numero, json.loads(linha)
+        except ValueError:
+            yield numero, ValueError('JSON inválido na linha!')
+
+
+def importar_em_lotes(registros, normalizar, tabela, colunas, unicas, chave,
+                      tamanho_lote=TAMANHO_LOTE):
+    inicio = time.monotonic()
+    resumo = {'processados': 0, 'criados': 0, 'rejeitados': 0}
+    rejeicoes = []
+    lote = []
+
+    def rejeitar(linha, resultado):
+        resumo['rejeitados'] += 1
+        if len(rejeicoes) < LIMITE_REJEICOES:
+            rejeicoes.append({'linha': linha, **resultado})
+
+    def descarregar():
+        resultados = inserir_em_lotes(
+            tabela, colunas, lote, unicas, chave, tamanho_lote)
+
+        for linha in sorted(resultados):
+            if resultados[linha]['status'] == 201:
+                resumo['criados'] += 1
+            else:
+                rejeitar(linha, resultados[linha])
+
+        lote.clear()
+
+    for linha, dados in registros:
+        resumo['processados'] += 1
+
+        try:
+            if isinstance(dados, Exception):
+                raise dados
+            lote.append((linha, normalizar(dados)))
+        except ValueError as erro:
+            rejeitar(linha, {'status': 400, 'erro': str(erro)})
+
+        if len(lote) >= tamanho_lote:
+            descarregar()
+
+    if lote:
+        descarregar()
+
+    duracao = time.monotonic() - inicio
+    resumo['duracao_s'] = round(duracao, 3)
+    resumo['linhas_por_s'] = round(resumo['processados'] / duracao, 1) \
+        if duracao > 0 else None
+    resumo['rejeicoes'] = rejeicoes
+
+    logger.info(
+        f"Importação em {tabela}: {resumo['criados']} criados, "
+        f"{resumo['rejeitados']} rejeitados em {resumo['duracao_s']}s.")
+    return resumo
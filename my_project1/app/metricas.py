@@ -0,0 +1,30 @@
+from flask import jsonify
+from app.auth import rota_protegida
+from app.pool import metricas_pool
+from app.cache import metricas_cache
+from app.database import metricas_transacoes
+from app.idempotencia import metricas_idempotencia
+from app.eventos import metricas_eventos
+from app.pagamentos_automaticos import metricas_pagamentos_automaticos
+from app.ganhos import metricas_ganhos
+from app.lancamentos import metricas_lancamentos
+from app.reservas import metricas_reservas
+from app.log import metricas_logging
+
+
+def register_metricas(app):
+    @app.route('/metricas', methods=['GET'])
+    @rota_protegida
+    def metricas():
+        return jsonify({
+            'pool': metricas_pool(),
+            'cache': metricas_cache(),
+            'transacoes': metricas_transacoes(),
+            'idempotencia': metricas_idempotencia(),
+            'eventos': metricas_eventos(),
+            'pagamentos_automaticos': metricas_pagamentos_automaticos(),
+            'ganhos': metricas_ganhos(),
+            'lancamentos': metricas_lancamentos(),
+            'reservas': metricas_reservas(),
+            'logging': metricas_logging()
+        }), 200
@@ -0,0 +1,148 @@
+from contextlib import closing
+from importlib import import_module
+from mysql.connector import errors
+from app import config
+import mysql.connector
+import pkgutil
+import logging
+import re
+
+
+logger = logging.getLogger(__name__)
+
+
+PACOTE_VERSOES = 'app.migracoes.versoes'
+PADRAO_ARQUIVO = re.compile(r'v(\d{4})_(\w+)')
+LOCK_MIGRACOES = 'meubanco_migracoes'
+
+
+def _conectar(banco=None):
+    return mysql.connector.connect(
+        host=config.DB_HOST,
+        port=config.DB_PORTA,
+        user=config.DB_USUARIO,
+        password=config.DB_SENHA,
+        database=banco,
+        autocommit=True
+    )
+
+
+def listar_migracoes():
+    pacote = import_module(PACOTE_VERSOES)
+    migracoes = []
+
+    for info in pkgutil.iter_modules(pacote.__path__):
+        combinacao = PADRAO_ARQUIVO.fullmatch(info.name)
+        if not combinacao:
+            continue
+
+        modulo = import_module(f'{PACOTE_VERSOES}.{info.name}')
+        migracoes.append((int(combinacao.group(1)), info.name, modulo))
+
+    migracoes.sort(key=lambda m: m[0])
+
+    versoes = [m[0] for m in migracoes]
+    if len(versoes) != len(set(versoes)):
+        raise RuntimeError('Versões de migração duplicadas!')
+
+    return migracoes
+
+
+def ultima_versao():
+    migracoes = listar_migracoes()
+    return migracoes[-1][0] if migracoes else 0
+
+
+def versao_atual(banco=None):
+    banco = banco or config.DB_NOME
+    try:
+        with closing(_conectar()) as con:
+            cursor = con.cursor(buffered=True)
+            cursor.execute(
+                f'SELECT MAX(versao) FROM `{banco}`.schema_version')
+            versao = cursor.fetchone()[0]
+            return versao or 0
+
+    except errors.ProgrammingError as erro:
+        if erro.errno in (1049, 1146):
+            return 0
+        raise
+
+
+def schema_atualizado(banco=None):
+    return versao_atual(banco) >= ultima_versao()
+
+
+def indice_existe(cursor, tabela, nome):
+    cursor.execute('''
+        SELECT 1 FROM information_schema.statistics
+            WHERE table_schema = DATABASE()
+            AND table_name = %s AND index_name = %s
+            LIMIT 1''', (tabela, nome))
+    return cursor.fetchone() is not None
+
+
+def criar_indice(cursor, tabela, nome, colunas):
+    if not indice_existe(cursor, tabela, nome):
+        cursor.execute(f'CREATE INDEX {nome} ON {tabela}({colunas})')
+
+
+def coluna_existe(cursor, tabela, coluna):
+    cursor.execute('''
+        SELECT 1 FROM information_schema.columns
+            WHERE table_schema = DATABASE()
+            AND table_name = %s AND column_name = %s
+            LIMIT 1''', (tabela, coluna))
+    return cursor.fetchone() is not None
+
+
+def aplicar_migracoes(banco=None, alvo=None):
+    banco = banco or config.DB_NOME
+    migracoes = listar_migracoes()
+
+    with closing(_conectar()) as con:
+        cursor = con.cursor(buffered=True)
+        cursor.execute(f'''
+            CREATE DATABASE IF NOT EXISTS `{banco}`
+                DEFAULT CHARSET utf8mb4
+                DEFAULT COLLATE utf8mb4_unicode_ci;''')
+
+    aplicadas = []
+
+    with closing(_conectar(banco)) as con:
+        cursor = con.cursor(buffered=True)
+
+        cursor.execute('SELECT GET_LOCK(%s, 60)', (LOCK_MIGRACOES,))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError('Não foi possível obter o lock de migrações!')
+
+        try:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    versao INT UNSIGNED PRIMARY KEY,
+                    nome VARCHAR(100) NOT NULL,
+                    aplicada_em DATETIME DEFAULT CURRENT_TIMESTAMP
+                ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
+            ''')
+
+            cursor.execute('SELECT MAX(versao) FROM schema_version')
+            atual = cursor.fetchone()[0] or 0
+
+            for versao, nome, modulo in migracoes:
+                if versao <= atual or (alvo is not None and versao > alvo):
+                    continue
+
+                logger.info(f'Aplicando migração {nome}...')
+                modulo.aplicar(cursor)
+
+                cursor.execute('''
+                    INSERT INTO schema_version (versao, nome)
+                        VALUES (%s, %s)''', (versao, nome))
+
+                aplicadas.append(nome)
+                logger.info(f'Migração {nome} aplicada com sucesso.')
+
+        finally:
+            cursor.execute('SELECT RELEASE_LOCK(%s)', (LOCK_MIGRACOES,))
+
+    return aplicadas
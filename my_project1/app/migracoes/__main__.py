@@ -0,0 +1,39 @@
+from app.migracoes import (listar_migracoes,
+                            versao_atual,
+                             aplicar_migracoes)
+from app.log import configurar_logging
+import argparse
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m app.migracoes',
+        description='Migrações de schema do banco MySQL.')
+    parser.add_argument('--banco', help='Nome do banco (padrão: DB_NOME)')
+
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    comandos.add_parser('status', help='Mostra as migrações aplicadas e pendentes')
+    aplicar = comandos.add_parser('aplicar', help='Aplica as migrações pendentes')
+    aplicar.add_argument('--ate', type=int, help='Versão alvo')
+
+    args = parser.parse_args()
+
+    if args.comando == 'status':
+        atual = versao_atual(args.banco)
+        print(f'Versão atual do schema: {atual}')
+        for versao, nome, modulo in listar_migracoes():
+            estado = 'aplicada' if versao <= atual else 'pendente'
+            print(f'  [{estado}] {nome} - {modulo.DESCRICAO}')
+        return
+
+    configurar_logging()
+    aplicadas = aplicar_migracoes(args.banco, alvo=args.ate)
+
+    if not aplicadas:
+        print('Schema já está atualizado.')
+    for nome in aplicadas:
+        print(f'Aplicada: {nome}')
+
+
+if __name__ == '__main__':
+    main()
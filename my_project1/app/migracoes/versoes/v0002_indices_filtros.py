@@ -0,0 +1,24 @@
+from app.migracoes import criar_indice
+
+
+DESCRICAO = 'Índices compostos para os filtros das listagens'
+
+
+def aplicar(cursor):
+    criar_indice(cursor, 'passageiros',
+                 'idx_passa_criado', 'criado_em')
+
+    criar_indice(cursor, 'motoristas',
+                 'idx_moto_status_criado', 'status, criado_em')
+
+    criar_indice(cursor, 'viagens',
+                 'idx_viagens_motorista_criado', 'id_motorista, criado_em')
+    criar_indice(cursor, 'viagens',
+                 'idx_viagens_passageiro_criado', 'id_passageiro, criado_em')
+    criar_indice(cursor, 'viagens',
+                 'idx_viagens_status_criado', 'status, criado_em')
+
+    criar_indice(cursor, 'registros_pagamento',
+                 'idx_registro_status_criado', 'status, criado_em')
+    criar_indice(cursor, 'registros_pagamento',
+                 'idx_registro_pagamento_criado', 'pagamento, criado_em')
@@ -0,0 +1,19 @@
+DESCRICAO = 'Tabela de chaves de idempotência das rotas de escrita'
+
+
+def aplicar(cursor):
+    cursor.execute('''
+            CREATE TABLE IF NOT EXISTS chaves_idempotencia (
+                id_usuario INT UNSIGNED NOT NULL,
+                chave VARCHAR(255) CHARACTER SET ascii COLLATE ascii_bin NOT NULL,
+                rota VARCHAR(100) NOT NULL,
+                impressao CHAR(40) NOT NULL,
+                status SMALLINT UNSIGNED NULL,
+                corpo MEDIUMTEXT NULL,
+                criado_em DATETIME DEFAULT CURRENT_TIMESTAMP,
+                expira_em DATETIME NOT NULL,
+
+                PRIMARY KEY (id_usuario, chave),
+                INDEX idx_idem_expira (expira_em)
+            ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
+        ''')
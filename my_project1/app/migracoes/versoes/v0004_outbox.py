@@ -0,0 +1,16 @@
+DESCRICAO = 'Tabela outbox de eventos publicados pelas rotas de escrita'
+
+
+def aplicar(cursor):
+    cursor.execute('''
+            CREATE TABLE IF NOT EXISTS outbox (
+                id BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT,
+                tipo VARCHAR(50) NOT NULL,
+                entidade VARCHAR(50) NOT NULL,
+                id_entidade INT UNSIGNED NOT NULL,
+                dados JSON NULL,
+                criado_em DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6),
+
+                INDEX idx_outbox_criado (criado_em)
+            ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
+        ''')
@@ -0,0 +1,12 @@
+DESCRICAO = 'Fila de viagens aguardando registro de pagamento automático'
+
+
+def aplicar(cursor):
+    cursor.execute('''
+            CREATE TABLE IF NOT EXISTS fila_pagamentos (
+                id_viagem INT UNSIGNED PRIMARY KEY,
+                criado_em DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6),
+
+                INDEX idx_fila_criado (criado_em)
+            ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
+        ''')
@@ -0,0 +1,12 @@
+from app.migracoes import coluna_existe
+
+
+DESCRICAO = 'Coluna versao para controle de concorrência otimista'
+
+
+def aplicar(cursor):
+    for tabela in ('passageiros', 'motoristas'):
+        if not coluna_existe(cursor, tabela, 'versao'):
+            cursor.execute(f'''
+                ALTER TABLE {tabela}
+                    ADD COLUMN versao INT UNSIGNED NOT NULL DEFAULT 1''')
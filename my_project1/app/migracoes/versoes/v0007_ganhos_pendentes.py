@@ -0,0 +1,15 @@
+DESCRICAO = 'Ganhos de motoristas pendentes de consolidação em quantia'
+
+
+def aplicar(cursor):
+    cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ganhos_pendentes (
+                id BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT,
+                id_motorista INT UNSIGNED NOT NULL,
+                id_viagem INT UNSIGNED NULL,
+                valor DECIMAL(10, 2) NOT NULL,
+                criado_em DATETIME DEFAULT CURRENT_TIMESTAMP,
+
+                INDEX idx_ganhos_motorista (id_motorista, criado_em, valor)
+            ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
+        ''')
@@ -0,0 +1,51 @@
+from app.migracoes import coluna_existe
+
+
+DESCRICAO = 'Livro de lançamentos em partidas dobradas e snapshots de saldo'
+
+
+def aplicar(cursor):
+    cursor.execute('''
+            CREATE TABLE IF NOT EXISTS lancamentos (
+                id BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT,
+                referencia VARCHAR(40) NOT NULL,
+                tipo ENUM('reserva', 'estorno', 'ajuste') NOT NULL,
+                conta ENUM('passageiro', 'motorista', 'externo') NOT NULL,
+                id_conta INT UNSIGNED NOT NULL,
+                valor DECIMAL(12, 2) NOT NULL,
+                criado_em DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6),
+
+                INDEX idx_lanc_conta (conta, id_conta, id, valor),
+                INDEX idx_lanc_referencia (referencia),
+                INDEX idx_lanc_criado (criado_em)
+            ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
+        ''')
+
+    cursor.execute('''
+            CREATE TABLE IF NOT EXISTS saldos_snapshot (
+                conta ENUM('passageiro', 'motorista') NOT NULL,
+                id_conta INT UNSIGNED NOT NULL,
+                ate_lancamento BIGINT UNSIGNED NOT NULL,
+                saldo DECIMAL(12, 2) NOT NULL,
+                criado_em DATETIME DEFAULT CURRENT_TIMESTAMP,
+
+                PRIMARY KEY (conta, id_conta, ate_lancamento)
+            ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
+        ''')
+
+    cursor.execute('''
+            CREATE TABLE IF NOT EXISTS consolidacao_lancamentos (
+                id TINYINT UNSIGNED PRIMARY KEY,
+                ate_lancamento BIGINT UNSIGNED NOT NULL DEFAULT 0,
+                atualizado_em DATETIME DEFAULT CURRENT_TIMESTAMP
+                ON UPDATE CURRENT_TIMESTAMP
+            ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
+        ''')
+    cursor.execute(
+        'INSERT IGNORE INTO consolidacao_lancamentos (id) VALUES (1)')
+
+    for tabela in ('passageiros', 'motoristas'):
+        if not coluna_existe(cursor, tabela, 'lancamento_consolidado'):
+            cursor.execute(f'''
+                ALTER TABLE {tabela} ADD COLUMN lancamento_consolidado
+                    BIGINT UNSIGNED NOT NULL DEFAULT 0''')
@@ -0,0 +1,24 @@
+from app.migracoes import coluna_existe
+
+
+DESCRICAO = 'Saldo reservado e reservas de saldo com validade'
+
+
+def aplicar(cursor):
+    if not coluna_existe(cursor, 'passageiros', 'saldo_reservado'):
+        cursor.execute('''
+            ALTER TABLE passageiros
+                ADD COLUMN saldo_reservado DECIMAL(10, 2) NOT NULL DEFAULT 0''')
+
+    cursor.execute('''
+            CREATE TABLE IF NOT EXISTS reservas_saldo (
+                id BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT,
+                id_passageiro INT UNSIGNED NOT NULL,
+                id_motorista INT UNSIGNED NOT NULL,
+                valor DECIMAL(10, 2) NOT NULL,
+                expira_em DATETIME(6) NOT NULL,
+                criado_em DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6),
+
+                INDEX idx_reservas_expira_em (expira_em)
+            ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
+        ''')
@@ -0,0 +1,58 @@
+from app.migracoes import coluna_existe, criar_indice
+
+
+DESCRICAO = 'Marcador de consolidação por lançamento e snapshot único por conta'
+
+
+def aplicar(cursor):
+    if not coluna_existe(cursor, 'lancamentos', 'consolidado'):
+        cursor.execute('''
+            ALTER TABLE lancamentos
+                ADD COLUMN consolidado BOOLEAN NOT NULL DEFAULT FALSE''')
+
+    criar_indice(cursor, 'lancamentos', 'idx_lanc_pendentes',
+                 'consolidado, id')
+    criar_indice(cursor, 'lancamentos', 'idx_lanc_saldo',
+                 'conta, id_conta, consolidado, valor')
+
+    # O que a marca d'água antiga já somou em saldo/quantia continua lá;
+    # só os lançamentos acima dela ficam pendentes.
+    for conta, tabela in (('passageiro', 'passageiros'),
+                          ('motorista', 'motoristas')):
+        if not coluna_existe(cursor, tabela, 'lancamento_consolidado'):
+            continue
+
+        cursor.execute(f'''
+            UPDATE lancamentos l
+                JOIN {tabela} t ON t.id = l.id_conta
+                SET l.consolidado = TRUE
+                WHERE l.conta = '{conta}'
+                AND l.id <= t.lancamento_consolidado''')
+
+        cursor.execute(
+            f'ALTER TABLE {tabela} DROP COLUMN lancamento_consolidado')
+
+    if coluna_existe(cursor, 'consolidacao_lancamentos', 'ate_lancamento'):
+        cursor.execute('''
+            UPDATE lancamentos SET consolidado = TRUE
+                WHERE conta = 'externo' AND id <= (
+                    SELECT ate_lancamento FROM consolidacao_lancamentos
+                        WHERE id = 1)''')
+
+    cursor.execute('DROP TABLE IF EXISTS consolidacao_lancamentos')
+
+    if not coluna_existe(cursor, 'saldos_snapshot', 'atualizado_em'):
+        cursor.execute('DROP TABLE IF EXISTS saldos_snapshot')
+
+    cursor.execute('''
+            CREATE TABLE IF NOT EXISTS saldos_snapshot (
+                conta ENUM('passageiro', 'motorista') NOT NULL,
+                id_conta INT UNSIGNED NOT NULL,
+                saldo DECIMAL(12, 2) NOT NULL DEFAULT 0,
+                ate_lancamento BIGINT UNSIGNED NOT NULL DEFAULT 0,
+                atualizado_em DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6)
+                ON UPDATE CURRENT_TIMESTAMP(6),
+
+                PRIMARY KEY (conta, id_conta)
+            ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
+        ''')
@@ -0,0 +1,10 @@
+from app.migracoes import coluna_existe
+
+
+DESCRICAO = 'Remove saldo_reservado; as reservas ficam só em reservas_saldo'
+
+
+def aplicar(cursor):
+    if coluna_existe(cursor, 'passageiros', 'saldo_reservado'):
+        cursor.execute(
+            'ALTER TABLE passageiros DROP COLUMN saldo_reservado')
@@ -0,0 +1,187 @@
+from app.database import executar_transacao
+from app import eventos
+from app import config
+import threading
+import logging
+import os
+
+
+logger = logging.getLogger(__name__)
+
+
+ENFILEIRAR_SQL = 'INSERT INTO fila_pagamentos (id_viagem) VALUES (%s)'
+
+
+def enfileirar(cursor, id_viagem):
+    cursor.execute(ENFILEIRAR_SQL, (id_viagem,))
+
+
+def situacao_fila(cursor, id_viagem=None):
+    cursor.execute('''
+        SELECT COUNT(*), TIMESTAMPDIFF(MICROSECOND, MIN(criado_em), NOW(6))
+            FROM fila_pagamentos''')
+    pendentes, atraso = cursor.fetchone()
+
+    situacao = {
+        'pendentes': pendentes,
+        'atraso_s': round(atraso / 1e6, 3) if atraso is not None else 0.0
+    }
+
+    if id_viagem is not None:
+        cursor.execute(
+            'SELECT 1 FROM fila_pagamentos WHERE id_viagem = %s', (id_viagem,))
+        situacao['id_viagem'] = id_viagem
+        situacao['pendente'] = cursor.fetchone() is not None
+
+    return situacao
+
+
+class TrabalhadorPagamentos:
+    def __init__(self, lote=200, intervalo=0.2):
+        if lote < 1:
+            raise ValueError('Tamanho de lote inválido!')
+
+        self.lote = lote
+        self.intervalo = intervalo
+
+        self._parar = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self._contadores = {
+            'lotes': 0,
+            'criados': 0,
+            'descartados': 0,
+            'atraso_ultimo_ms': 0.0,
+            'atraso_max_ms': 0.0
+        }
+
+    def _criar_registros(self, cursor):
+        cursor.execute('''
+            SELECT id_viagem, TIMESTAMPDIFF(MICROSECOND, criado_em, NOW(6))
+                FROM fila_pagamentos ORDER BY id_viagem
+                LIMIT %s FOR UPDATE SKIP LOCKED''', (self.lote,))
+        fila = cursor.fetchall()
+
+        if not fila:
+            return 0, 0, 0.0
+
+        ids = [f[0] for f in fila]
+        marcadores = ', '.join(['%s'] * len(ids))
+
+        cursor.execute(f'''
+            SELECT id_viagem FROM registros_pagamento
+                WHERE id_viagem IN ({marcadores}) FOR SHARE''', ids)
+        registrados = {r[0] for r in cursor.fetchall()}
+
+        cursor.execute(f'''
+            SELECT id, status FROM viagens
+                WHERE id IN ({marcadores}) ORDER BY id FOR UPDATE''', ids)
+        qualificadas = [v[0] for v in cursor.fetchall()
+                        if v[1] == 'confirmada' and v[0] not in registrados]
+
+        if qualificadas:
+            marcadores_q = ', '.join(['%s'] * len(qualificadas))
+
+            cursor.execute(f'''
+                INSERT INTO registros_pagamento
+                    (id_viagem, remetente, recebedor,
+                     metodo_pagamento, valor_viagem)
+                SELECT id, nome_passageiro, nome_motorista,
+                       metodo_pagamento, total_viagem
+                    FROM viagens WHERE id IN ({marcadores_q})''',
+                qualificadas)
+
+            cursor.execute(f'''
+                SELECT id, id_viagem FROM registros_pagamento
+                    WHERE id_viagem IN ({marcadores_q})''', qualificadas)
+
+            for id_registro, id_viagem in cursor.fetchall():
+                eventos.publicar(cursor, eventos.PAGAMENTO_REGISTRADO,
+                                 'registros_pagamento', id_registro,
+                                 id_viagem=id_viagem)
+
+        cursor.execute(f'''
+            DELETE FROM fila_pagamentos
+                WHERE id_viagem IN ({marcadores})''', ids)
+
+        atraso_ms = max(f[1] for f in fila) / 1000
+        return len(fila), len(qualificadas), atraso_ms
+
+    def processar_lote(self):
+        retirados, criados, atraso_ms = executar_transacao(
+            self._criar_registros)
+
+        if retirados:
+            with self._lock:
+                self._contadores['lotes'] += 1
+                self._contadores['criados'] += criados
+                self._contadores['descartados'] += retirados - criados
+                self._contadores['atraso_ultimo_ms'] = round(atraso_ms, 1)
+                self._contadores['atraso_max_ms'] = max(
+                    self._contadores['atraso_max_ms'], round(atraso_ms, 1))
+
+            logger.info(
+                f'{criados} registros de pagamento criados pela fila '
+                f'({retirados - criados} descartados).')
+
+        return retirados
+
+    def iniciar(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._parar.clear()
+        self._thread = threading.Thread(
+            target=self._executar, name='pagamentos-automaticos', daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._thread = None
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                while self.processar_lote() == self.lote:
+                    pass
+            except Exception as erro:
+                logger.error(
+                    f'Erro ao criar registros de pagamento da fila: {str(erro)}')
+
+    def metricas(self):
+        with self._lock:
+            return dict(self._contadores)
+
+
+_trabalhador = None
+_trabalhador_pid = None
+_trabalhador_lock = threading.Lock()
+
+
+def obter_trabalhador():
+    global _trabalhador, _trabalhador_pid
+
+    pid = os.getpid()
+    if _trabalhador is not None and _trabalhador_pid == pid:
+        return _trabalhador
+
+    with _trabalhador_lock:
+        if _trabalhador is None or _trabalhador_pid != pid:
+            _trabalhador = TrabalhadorPagamentos(
+                lote=config.PAGAMENTOS_LOTE,
+                intervalo=config.PAGAMENTOS_INTERVALO
+            )
+            _trabalhador_pid = pid
+
+    return _trabalhador
+
+
+def iniciar_trabalhador():
+    obter_trabalhador().iniciar()
+
+
+def metricas_pagamentos_automaticos():
+    return obter_trabalhador().metricas()
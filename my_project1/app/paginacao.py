@@ -0,0 +1,70 @@
+from flask import jsonify, request
+from urllib.parse import urlencode
+import base64
+import json
+
+
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 500
+
+
+def codificar_cursor(ultimo_id):
+    bruto = json.dumps({'id': int(ultimo_id)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(token):
+    token = token.strip()
+
+    if token.isdigit():
+        ultimo_id = int(token)
+    else:
+        try:
+            preenchimento = '=' * (-len(token) % 4)
+            bruto = base64.urlsafe_b64decode(token + preenchimento)
+            ultimo_id = int(json.loads(bruto)['id'])
+        except (ValueError, TypeError, KeyError):
+            raise ValueError('Cursor de paginação inválido!')
+
+    if ultimo_id < 0:
+        raise ValueError('Cursor de paginação inválido!')
+
+    return ultimo_id
+
+
+def ler_paginacao():
+    limite = request.args.get('limit', LIMITE_PADRAO)
+    try:
+        limite = int(limite)
+    except (ValueError, TypeError):
+        raise ValueError('Parâmetro limit deve ser inteiro!')
+
+    if limite <= 0:
+        raise ValueError('Parâmetro limit deve ser positivo!')
+
+    limite = min(limite, LIMITE_MAXIMO)
+
+    apos = request.args.get('after')
+    apos = decodificar_cursor(apos) if apos else 0
+
+    return limite, apos
+
+
+def resposta_paginada(dados, limite):
+    proximo = None
+
+    if len(dados) > limite:
+        dados = dados[:limite]
+        proximo = codificar_cursor(dados[-1]['id'])
+
+    resposta = jsonify(dados)
+
+    if proximo:
+        args = request.args.to_dict()
+        args['after'] = proximo
+        args['limit'] = limite
+        resposta.headers['X-Proximo-Cursor'] = proximo
+        resposta.headers['Link'] = (
+            f'<{request.base_url}?{urlencode(args)}>; rel="next"')
+
+    return resposta, 200
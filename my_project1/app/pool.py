@@ -0,0 +1,262 @@
+from collections import deque
+from mysql.connector import errors
+from app import config
+import mysql.connector
+import threading
+import logging
+import time
+import os
+
+
+logger = logging.getLogger(__name__)
+
+
+class _ConexaoPool:
+    __slots__ = ('con', 'criada_em', 'usada_em')
+
+    def __init__(self, con):
+        self.con = con
+        self.criada_em = time.monotonic()
+        self.usada_em = self.criada_em
+
+
+class PoolConexoes:
+    def __init__(self, fabrica, tamanho_min=1, tamanho_max=5,
+                 timeout_checkout=5.0, vida_maxima=1800.0,
+                 tempo_ocioso=300.0, ping_apos=0.0):
+        if tamanho_max < 1 or tamanho_min < 0 or tamanho_min > tamanho_max:
+            raise ValueError('Tamanhos de pool inválidos!')
+
+        self.fabrica = fabrica
+        self.tamanho_min = tamanho_min
+        self.tamanho_max = tamanho_max
+        self.timeout_checkout = timeout_checkout
+        self.vida_maxima = vida_maxima
+        self.tempo_ocioso = tempo_ocioso
+        self.ping_apos = ping_apos
+
+        self._ociosas = deque()
+        self._total = 0
+        self._lock = threading.Condition()
+
+        self._contadores = {
+            'checkouts': 0,
+            'criadas': 0,
+            'descartadas': 0,
+            'pings_falhos': 0,
+            'esgotamentos': 0,
+            'esperas': 0,
+            'espera_total_s': 0.0,
+            'espera_max_s': 0.0
+        }
+
+    def preencher(self):
+        while True:
+            with self._lock:
+                if self._total >= self.tamanho_min:
+                    return
+                self._total += 1
+
+            try:
+                item = self._criar()
+            except Exception:
+                with self._lock:
+                    self._total -= 1
+                    self._lock.notify()
+                raise
+
+            with self._lock:
+                self._ociosas.append(item)
+                self._lock.notify()
+
+    def obter(self):
+        inicio = time.monotonic()
+        limite = inicio + self.timeout_checkout
+        esperou = False
+
+        while True:
+            item = None
+            criar = False
+
+            with self._lock:
+                while True:
+                    item = self._retirar_ociosa()
+                    if item:
+                        break
+
+                    if self._total < self.tamanho_max:
+                        self._total += 1
+                        criar = True
+                        break
+
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._contadores['esgotamentos'] += 1
+                        logger.critical(
+                            f'Pool esgotado: {self._total} conexões em uso.')
+                        raise errors.PoolError(
+                            'Pool de conexões esgotado!')
+
+                    esperou = True
+                    self._lock.wait(restante)
+
+            if criar:
+                try:
+                    item = self._criar()
+                except Exception:
+                    with self._lock:
+                        self._total -= 1
+                        self._lock.notify()
+                    raise
+
+            elif not self._validar(item):
+                continue
+
+            espera = time.monotonic() - inicio
+            with self._lock:
+                self._contadores['checkouts'] += 1
+                self._contadores['espera_total_s'] += espera
+                if espera > self._contadores['espera_max_s']:
+                    self._contadores['espera_max_s'] = espera
+                if esperou:
+                    self._contadores['esperas'] += 1
+
+            return item
+
+    def devolver(self, item, descartar=False):
+        agora = time.monotonic()
+
+        if not descartar and agora - item.criada_em < self.vida_maxima:
+            item.usada_em = agora
+            with self._lock:
+                self._ociosas.append(item)
+                self._lock.notify()
+            return
+
+        self._fechar(item)
+
+    def metricas(self):
+        with self._lock:
+            dados = dict(self._contadores)
+            dados['total'] = self._total
+            dados['ociosas'] = len(self._ociosas)
+            dados['em_uso'] = self._total - len(self._ociosas)
+            dados['tamanho_min'] = self.tamanho_min
+            dados['tamanho_max'] = self.tamanho_max
+        return dados
+
+    def fechar(self):
+        with self._lock:
+            ociosas = list(self._ociosas)
+            self._ociosas.clear()
+
+        for item in ociosas:
+            self._fechar(item)
+
+    def _retirar_ociosa(self):
+        agora = time.monotonic()
+
+        while self._ociosas:
+            item = self._ociosas.pop()
+
+            expirada = agora - item.criada_em >= self.vida_maxima
+            ociosa_demais = (agora - item.usada_em >= self.tempo_ocioso
+                             and self._total > self.tamanho_min)
+
+            if expirada or ociosa_demais:
+                self._total -= 1
+                self._contadores['descartadas'] += 1
+                self._fechar_silencioso(item)
+                continue
+
+            return item
+
+        return None
+
+    def _validar(self, item):
+        if time.monotonic() - item.usada_em < self.ping_apos:
+            return True
+
+        try:
+            item.con.ping(reconnect=False)
+            return True
+        except Exception as erro:
+            logger.warning(f'Conexão do pool falhou no ping: {str(erro)}')
+            with self._lock:
+                self._contadores['pings_falhos'] += 1
+            self._fechar(item)
+            return False
+
+    def _criar(self):
+        item = _ConexaoPool(self.fabrica())
+        with self._lock:
+            self._contadores['criadas'] += 1
+        return item
+
+    def _fechar(self, item):
+        with self._lock:
+            self._total -= 1
+            self._contadores['descartadas'] += 1
+            self._lock.notify()
+        self._fechar_silencioso(item)
+
+    @staticmethod
+    def _fechar_silencioso(item):
+        try:
+            item.con.close()
+        except Exception:
+            pass
+
+
+def _nova_conexao():
+    return mysql.connector.connect(
+        host=config.DB_HOST,
+        port=config.DB_PORTA,
+        user=config.DB_USUARIO,
+        password=config.DB_SENHA,
+        database=config.DB_NOME,
+        autocommit=False
+    )
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def obter_pool():
+    global _pool, _pool_pid
+
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = PoolConexoes(
+                _nova_conexao,
+                tamanho_min=config.POOL_TAMANHO_MIN,
+                tamanho_max=config.POOL_TAMANHO_MAX,
+                timeout_checkout=config.POOL_TIMEOUT_CHECKOUT,
+                vida_maxima=config.POOL_VIDA_MAXIMA,
+                tempo_ocioso=config.POOL_TEMPO_OCIOSO,
+                ping_apos=config.POOL_PING_APOS
+            )
+            _pool_pid = pid
+            logger.info(
+                f'Pool de conexões criado (min={config.POOL_TAMANHO_MIN}, '
+                f'max={config.POOL_TAMANHO_MAX}, pid={pid}).')
+
+    return _pool
+
+
+def preencher_pool():
+    pool = obter_pool()
+    try:
+        pool.preencher()
+    except Exception as erro:
+        logger.error(f'Erro ao pré-preencher pool de conexões: {str(erro)}')
+
+
+def metricas_pool():
+    return obter_pool().metricas()
@@ -0,0 +1,187 @@
+from collections import defaultdict
+from app.database import executar_transacao
+from app import cache
+from app import config
+import threading
+import logging
+import os
+
+
+logger = logging.getLogger(__name__)
+
+
+def em_duas_fases():
+    return config.RESERVA_DUAS_FASES
+
+
+def validar_configuracao():
+    if config.RESERVA_DUAS_FASES and config.SALDOS_LANCAMENTOS:
+        raise ValueError(
+            'RESERVA_DUAS_FASES não pode ser usada com SALDOS_LANCAMENTOS!')
+
+
+def criar_reserva(cursor, id_passageiro, id_motorista, total_sql):
+    cursor.execute(f'''
+        INSERT INTO reservas_saldo
+            (id_passageiro, id_motorista, valor, expira_em)
+        SELECT p.id, m.id, {total_sql},
+               NOW(6) + INTERVAL %s MICROSECOND
+            FROM passageiros p
+            JOIN motoristas m ON m.id = %s
+            WHERE p.id = %s''',
+        (int(config.RESERVA_VALIDADE * 1e6), id_motorista, id_passageiro))
+    return cursor.lastrowid
+
+
+def travar_reserva(cursor, id_reserva):
+    cursor.execute('''
+        SELECT id_passageiro, id_motorista, valor FROM reservas_saldo
+            WHERE id = %s AND expira_em > NOW(6) FOR UPDATE''', (id_reserva,))
+    return cursor.fetchone()
+
+
+def remover_reserva(cursor, id_reserva):
+    cursor.execute('DELETE FROM reservas_saldo WHERE id = %s', (id_reserva,))
+
+
+def _devolver(cursor, reservas):
+    totais = defaultdict(int)
+    for _, id_passageiro, valor in reservas:
+        totais[id_passageiro] += valor
+
+    for id_passageiro in sorted(totais):
+        cursor.execute(
+            'UPDATE passageiros SET saldo = saldo + %s WHERE id = %s',
+            (totais[id_passageiro], id_passageiro))
+
+    ids = [r[0] for r in reservas]
+    marcadores = ', '.join(['%s'] * len(ids))
+    cursor.execute(
+        f'DELETE FROM reservas_saldo WHERE id IN ({marcadores})', ids)
+
+    return sorted(totais)
+
+
+def liberar_reserva(cursor, id_reserva):
+    cursor.execute('''
+        SELECT id, id_passageiro, valor FROM reservas_saldo
+            WHERE id = %s FOR UPDATE''', (id_reserva,))
+    reserva = cursor.fetchone()
+
+    if not reserva:
+        return 0
+
+    for id_passageiro in _devolver(cursor, [reserva]):
+        cache.invalidar('passageiros', id_passageiro)
+
+    logger.info(f'Reserva de saldo id={id_reserva} liberada.')
+    return 1
+
+
+class LiberadorReservas:
+    def __init__(self, lote=500, intervalo=5.0):
+        if lote < 1:
+            raise ValueError('Tamanho de lote inválido!')
+
+        self.lote = lote
+        self.intervalo = intervalo
+
+        self._parar = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self._contadores = {
+            'varreduras': 0,
+            'liberadas': 0,
+            'passageiros': 0
+        }
+
+    def _liberar(self, cursor):
+        cursor.execute('SET TRANSACTION ISOLATION LEVEL READ COMMITTED')
+        cursor.execute('''
+            SELECT id, id_passageiro, valor FROM reservas_saldo
+                WHERE expira_em <= NOW(6)
+                ORDER BY expira_em LIMIT %s FOR UPDATE SKIP LOCKED''',
+            (self.lote,))
+        expiradas = cursor.fetchall()
+
+        if not expiradas:
+            return 0, []
+
+        return len(expiradas), _devolver(cursor, expiradas)
+
+    def liberar(self):
+        liberadas, passageiros = executar_transacao(self._liberar)
+
+        if liberadas:
+            cache.invalidar('passageiros', *passageiros)
+
+            with self._lock:
+                self._contadores['varreduras'] += 1
+                self._contadores['liberadas'] += liberadas
+                self._contadores['passageiros'] += len(passageiros)
+
+            logger.warning(
+                f'{liberadas} reservas de saldo expiradas liberadas para '
+                f'{len(passageiros)} passageiros.')
+
+        return liberadas
+
+    def iniciar(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._parar.clear()
+        self._thread = threading.Thread(
+            target=self._executar, name='liberador-reservas', daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._thread = None
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                while self.liberar() == self.lote:
+                    pass
+            except Exception as erro:
+                logger.error(f'Erro ao liberar reservas de saldo: {str(erro)}')
+
+    def metricas(self):
+        with self._lock:
+            return dict(self._contadores)
+
+
+_liberador = None
+_liberador_pid = None
+_liberador_lock = threading.Lock()
+
+
+def obter_liberador():
+    global _liberador, _liberador_pid
+
+    pid = os.getpid()
+    if _liberador is not None and _liberador_pid == pid:
+        return _liberador
+
+    with _liberador_lock:
+        if _liberador is None or _liberador_pid != pid:
+            _liberador = LiberadorReservas(
+                lote=config.RESERVA_LOTE,
+                intervalo=config.RESERVA_INTERVALO
+            )
+            _liberador_pid = pid
+
+    return _liberador
+
+
+def iniciar_liberador():
+    if config.RESERVA_DUAS_FASES:
+        obter_liberador().iniciar()
+
+
+def metricas_reservas():
+    return obter_liberador().metricas()
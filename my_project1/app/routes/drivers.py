@@ -1,56 +1,89 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
+from mysql.connector import errors
 from app.auth import rota_protegida
 from app.database import conexao
+from app import cache
+from app import eventos
+from app.ganhos import coluna_motorista, colunas_motorista
+from app.lote import ler_csv, ler_ndjson, importar_em_lotes
+from app.paginacao import ler_paginacao, resposta_paginada
+from app.streaming import ler_streaming, resposta_streaming
+from app.serializacao import mapeador_do_cursor
+from app.filtros import ler_filtros, ler_campos, opcao
+from app.condicional import (colunas_com_versao,
+                              requisicao_condicional,
+                               nao_modificado,
+                                resposta_nao_modificada,
+                                 resposta_com_validadores,
+                                  ler_versao_esperada,
+                                   atualizar_versionado)
 from app.validation import validar_json, formatar_nome
-from app.log import configurar_logging
+from app.lancamentos import ajustar_saldo, resposta_lancamentos
+from app import config
 from app.brute_force import limiter
 from decimal import Decimal, InvalidOperation
 import logging
 import re
 
 
-configurar_logging
 logger = logging.getLogger(__name__)
 
 
 motoristas_bp = Blueprint('motoristas', __name__)
 
 
+COLUNAS_MOTORISTA = (
+    'id', 'nome', 'cnh', 'telefone', 'categoria_cnh', 'placa',
+    'modelo_carro', 'ano_carro', 'status', 'valor_passagem', 'quantia',
+    'versao', 'criado_em', 'atualizado_em')
+
+FILTROS_MOTORISTA = {
+    'status': opcao('ativo', 'suspenso', 'bloqueado')
+}
+
+
 @motoristas_bp.route('/', methods=['GET'])
 @limiter.limit('100 per hour')
 @rota_protegida
 def listar_motoristas():
     try:
         logger.info('Listando motoristas...')
+
+        try:
+            limite, apos = ler_paginacao()
+            campos = ler_campos(COLUNAS_MOTORISTA)
+            filtros, parametros = ler_filtros(FILTROS_MOTORISTA)
+        except ValueError as erro:
+            logger.warning(f'Parâmetros de listagem inválidos: {str(erro)}')
+            return jsonify({'erro': str(erro)}), 400
+
+        condicoes = ' AND '.join(['id > %s'] + filtros)
+        parametros = [apos] + parametros
+
+        sql = f'''
+            SELECT {colunas_motorista(campos)}
+                FROM motoristas
+                WHERE {condicoes} ORDER BY id'''
+
+        if ler_streaming():
+            logger.info('Listagem de motoristas em streaming.')
+            return resposta_streaming(sql, parametros)
+
         with conexao() as cursor:
-            cursor.execute('''
-                SELECT id, nome, cnh, telefone, categoria_cnh, placa,
-                       modelo_carro, ano_carro, status, valor_passagem,
-                       quantia, criado_em, atualizado_em
-                    FROM motoristas''')
-            dados = [{
-                'id': m[0],
-                'nome': m[1],
-                'cnh': m[2],
-                'telefone': m[3],
-                'categoria_cnh': m[4],
-                'placa': m[5],
-                'modelo_carro': m[6],
-                'ano_carro': m[7],
-                'status': m[8],
-                'valor_passagem': m[9],
-                'quantia': m[10],
-                'criado_em': m[11],
-                'atualizado_em': m[12]
-            } for m in cursor.fetchall()]
+            cursor.execute(f'{sql} LIMIT %s', (*parametros, limite + 1))
+
+            mapear = mapeador_do_cursor(cursor)
+            dados = [mapear(m) for m in cursor.fetchall()]
 
             if not dados:
                 logger.warning('Nenhum motorista registrado ainda.')
                 return jsonify([]), 200
 
             logger.info('Listagem de motoristas bem-sucedida.')
-            return jsonify(dados), 200
+            return resposta_paginada(dados, limite)
 
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado ao listar motoristas: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado ao listar motoristas!'}), 500
@@ -62,11 +95,42 @@ def listar_motoristas():
 def buscar_motorista(id):
     try:
         logger.info(f'Buscando motorista com id={id}...')
+        try:
+            campos = ler_campos(COLUNAS_MOTORISTA)
+        except ValueError as erro:
+            logger.warning(f'Campos inválidos: {str(erro)}')
+            return jsonify({'erro': str(erro)}), 400
+
+        selecionadas = colunas_com_versao(campos, versionada=True)
+
+        registro = cache.ler('motoristas', id)
+        if registro is not None:
+            logger.info(f'Motorista {id} servido do cache.')
+            if nao_modificado(id, registro['atualizado_em'], campos,
+                              registro['versao']):
+                return resposta_nao_modificada(
+                    id, registro['atualizado_em'], campos, registro['versao'])
+
+            return resposta_com_validadores(
+                {c: registro[c] for c in selecionadas}, campos)
+
+        marca = cache.marcar()
+
         with conexao() as cursor:
-            cursor.execute('''
-                SELECT id, nome, cnh, telefone, categoria_cnh, placa,
-                       modelo_carro, ano_carro, status, valor_passagem,
-                       quantia, criado_em, atualizado_em
+            if requisicao_condicional():
+                cursor.execute(f'''
+                    SELECT {coluna_motorista('atualizado_em')}, versao
+                        FROM motoristas WHERE id = %s''', (id,))
+                versao = cursor.fetchone()
+
+                if versao and nao_modificado(id, versao[0], campos,
+                                             versao[1]):
+                    logger.info(f'Motorista {id} não modificado.')
+                    return resposta_nao_modificada(
+                        id, versao[0], campos, versao[1])
+
+            cursor.execute(f'''
+                SELECT {colunas_motorista(selecionadas)}
                     FROM motoristas WHERE id = %s''', (id,))
             dado = cursor.fetchone()
 
@@ -75,86 +139,113 @@ def buscar_motorista(id):
                 return jsonify({'erro': 'Motorista não encontrado!'}), 404
 
             logger.info('Busca de motorista bem-sucedida.')
-            return jsonify({
-                'id': dado[0],
-                'nome': dado[1],
-                'cnh': dado[2],
-                'telefone': dado[3],
-                'categoria_cnh': dado[4],
-                'placa': dado[5],
-                'modelo_carro': dado[6],
-                'ano_carro': dado[7],
-                'status': dado[8],
-                'valor_passagem': dado[9],
-                'quantia': dado[10],
-                'criado_em': dado[11],
-                'atualizado_em': dado[12]
-            }), 200
+            registro = mapeador_do_cursor(cursor)(dado)
+            if campos == COLUNAS_MOTORISTA:
+                cache.guardar('motoristas', id, registro, marca)
+
+            return resposta_com_validadores(registro, campos)
 
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado ao buscar motorista: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado ao buscar motorista!'}), 500
 
 
-@motoristas_bp.route('/', methods=['POST'])
+@motoristas_bp.route('/<int:id>/lancamentos', methods=['GET'])
 @limiter.limit('100 per hour')
 @rota_protegida
-def adicionar_motorista():
+def listar_lancamentos_motorista(id):
     try:
-        logger.info('Adicionando motorista...')
+        logger.info(f'Listando lançamentos do motorista id={id}...')
 
-        dados = validar_json()
+        try:
+            return resposta_lancamentos('motorista', id)
+        except ValueError as erro:
+            logger.warning(f'Parâmetros de listagem inválidos: {str(erro)}')
+            return jsonify({'erro': str(erro)}), 400
 
-        REGRAS = {
-            'nome': lambda v: isinstance(v, str) and v.strip() != '',
-            'cnh': lambda v: isinstance(v, str) and len(v.strip()) == 11,
-            'telefone': lambda v: isinstance(v, str) and len(v.strip()) >= 8,
-            'categoria_cnh': lambda v: isinstance(
-                v, str) and v.strip().upper() in ('A', 'B', 'C', 'D', 'E'),
-            'placa': lambda v: isinstance(v, str) and re.fullmatch(
-                r'[A-Z]{3}-?\d{4}|[A-Z]{3}\d[A-Z]\d{2}', v.upper()) is not None,
-            'modelo_carro': lambda v: isinstance(v, str) and v.strip() != '',
-            'ano_carro': lambda v: isinstance(v, int) and v >= 1980,
-            'valor_passagem': lambda v: isinstance(v, Decimal) and v > 0
-        }
+    except errors.PoolError:
+        raise
+    except Exception as erro:
+        logger.error(f'Erro inesperado ao listar lançamentos: {str(erro)}')
+        return jsonify({'erro': 'Erro inesperado ao listar lançamentos!'}), 500
 
-        faltando = [c for c in REGRAS if c not in dados or dados[c] is None]
 
-        if faltando:
-            logger.warning(f"Campos obrigatórios: {', '.join(faltando)}")
-            return jsonify({'erro': f"Campos obrigatórios: {', '.join(faltando)}"}), 400
+REGRAS_MOTORISTA = {
+    'nome': lambda v: isinstance(v, str) and v.strip() != '',
+    'cnh': lambda v: isinstance(v, str) and len(v.strip()) == 11,
+    'telefone': lambda v: isinstance(v, str) and len(v.strip()) >= 8,
+    'categoria_cnh': lambda v: isinstance(
+        v, str) and v.strip().upper() in ('A', 'B', 'C', 'D', 'E'),
+    'placa': lambda v: isinstance(v, str) and re.fullmatch(
+        r'[A-Z]{3}-?\d{4}|[A-Z]{3}\d[A-Z]\d{2}', v.upper()) is not None,
+    'modelo_carro': lambda v: isinstance(v, str) and v.strip() != '',
+    'ano_carro': lambda v: isinstance(v, int) and v >= 1980,
+    'valor_passagem': lambda v: isinstance(v, Decimal) and v > 0
+}
 
-        for campo, regra in REGRAS.items():
-            try:
-                valor = dados[campo]
+COLUNAS_INSERCAO_MOTORISTA = tuple(REGRAS_MOTORISTA)
 
-                if campo in ('cnh', 'telefone', 'placa', 'modelo_carro'):
-                    valor = str(valor).strip()
 
-                elif campo == 'nome':
-                    valor = formatar_nome(valor)
-                
-                elif campo == 'categoria_cnh':
-                    valor = str(valor).strip().upper()
-                
-                elif campo == 'valor_passagem':
-                    try:
-                        valor = Decimal(str(valor)).quantize(Decimal('0.01'))
-                    except InvalidOperation:
-                        raise ValueError
+def normalizar_motorista(dados):
+    if not isinstance(dados, dict):
+        raise ValueError('Motorista deve ser um objeto JSON!')
 
-                elif campo == 'ano_carro':
-                    valor = int(valor)
+    faltando = [c for c in REGRAS_MOTORISTA
+                if c not in dados or dados[c] is None]
+
+    if faltando:
+        raise ValueError(f"Campos obrigatórios: {', '.join(faltando)}")
+
+    registro = {}
+    for campo, regra in REGRAS_MOTORISTA.items():
+        try:
+            valor = dados[campo]
+
+            if campo in ('cnh', 'telefone', 'placa', 'modelo_carro'):
+                valor = str(valor).strip()
 
-                if not regra(valor):
+            elif campo == 'nome':
+                valor = formatar_nome(valor)
+
+            elif campo == 'categoria_cnh':
+                valor = str(valor).strip().upper()
+
+            elif campo == 'valor_passagem':
+                try:
+                    valor = Decimal(str(valor)).quantize(Decimal('0.01'))
+                except InvalidOperation:
                     raise ValueError
 
-                dados[campo] = valor
+            elif campo == 'ano_carro':
+                valor = int(valor)
+
+            if not regra(valor):
+                raise ValueError
+
+            registro[campo] = valor
+
+        except Exception:
+            raise ValueError(f'Valor inválido para {campo}!')
+
+    return registro
 
-            except Exception:
-                logger.warning(
-                    f'Valor inválido para {campo}: {dados.get(campo)}')
-                return jsonify({'erro': f'Valor inválido para {campo}!'}), 400
+
+@motoristas_bp.route('/', methods=['POST'])
+@limiter.limit('100 per hour')
+@rota_protegida
+def adicionar_motorista():
+    try:
+        logger.info('Adicionando motorista...')
+
+        dados = validar_json()
+
+        try:
+            dados = normalizar_motorista(dados)
+        except ValueError as erro:
+            logger.warning(f'Motorista inválido: {str(erro)}')
+            return jsonify({'erro': str(erro)}), 400
 
         with conexao() as cursor:
             cursor.execute('''
@@ -171,11 +262,45 @@ def adicionar_motorista():
             return jsonify({'mensagem': 'Motorista adicionado!',
                             'id': novo_id}), 201
 
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado ao adicionar motorista: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado ao adicionar motorista!'}), 500
 
 
+@motoristas_bp.route('/import', methods=['POST'])
+@limiter.limit('10 per hour')
+@rota_protegida
+def importar_motoristas():
+    try:
+        logger.info('Importando motoristas...')
+
+        if request.mimetype in ('text/csv', 'application/csv'):
+            registros = ler_csv(request.stream)
+        elif request.mimetype in ('application/x-ndjson',
+                                  'application/ndjson',
+                                  'application/jsonl'):
+            registros = ler_ndjson(request.stream)
+        else:
+            logger.warning(f'Formato de importação inválido: {request.mimetype}')
+            return jsonify(
+                {'erro': 'Envie text/csv ou application/x-ndjson!'}), 415
+
+        resumo = importar_em_lotes(
+            registros, normalizar_motorista, 'motoristas',
+            COLUNAS_INSERCAO_MOTORISTA,
+            unicas=('cnh', 'telefone', 'placa'), chave='cnh')
+
+        return jsonify(resumo), 200
+
+    except errors.PoolError:
+        raise
+    except Exception as erro:
+        logger.error(f'Erro inesperado ao importar motoristas: {str(erro)}')
+        return jsonify({'erro': 'Erro inesperado ao importar motoristas!'}), 500
+
+
 @motoristas_bp.route('/<int:id>', methods=['PUT'])
 @limiter.limit('100 per hour')
 @rota_protegida
@@ -185,6 +310,12 @@ def atualizar_motorista(id):
 
         dados = validar_json()
 
+        try:
+            esperada = ler_versao_esperada(dados)
+        except ValueError as erro:
+            logger.warning(f'Versão inválida: {str(erro)}')
+            return jsonify({'erro': str(erro)}), 400
+
         REGRAS = {
             'nome': lambda v: isinstance(v, str) and v.strip() != '',
             'telefone': lambda v: isinstance(v, str) and len(v.strip()) >= 8,
@@ -240,22 +371,42 @@ def atualizar_motorista(id):
                 return jsonify({'erro': f'Valor inválido para {campo}!'}), 400
 
 
-        set_sql = ", ".join(f"{campo} = %s" for campo in enviados.keys())
-        valores = list(enviados.values())
-        valores.append(id)
+        colunas = dict(enviados)
+        novo_saldo = None
+        if config.SALDOS_LANCAMENTOS:
+            novo_saldo = colunas.pop('quantia', None)
 
-        query = f"UPDATE motoristas SET {set_sql} WHERE id = %s"
         with conexao() as cursor:
-            cursor.execute(query, valores)
+            versao, atual = atualizar_versionado(
+                cursor, 'motoristas', id, colunas, esperada)
+            cache.invalidar('motoristas', id)
 
-            if cursor.rowcount == 0:
+            if versao is None and atual is None:
                 logger.warning(f'Motorista id={id} não encontrado.')
                 return jsonify({'erro': 'Motorista não encontrado!'}), 404
 
+            if versao is None:
+                logger.warning(
+                    f'Conflito de versão no motorista id={id}: '
+                    f'esperada={esperada}, atual={atual}.')
+                return jsonify({
+                    'erro': 'Motorista foi alterado por outra requisição!',
+                    'versao_atual': atual}), 409
+
+            if novo_saldo is not None:
+                ajustar_saldo(cursor, 'motorista', id, novo_saldo)
+
+            if enviados.get('status') == 'bloqueado':
+                eventos.publicar(cursor, eventos.MOTORISTA_BLOQUEADO,
+                                 'motoristas', id)
+
             logger.info(f'Motorista id={id} atualizado com sucesso.')
             return jsonify({'mensagem': 'Motorista atualizado!',
-                            'atualizado': enviados}), 200
+                            'atualizado': enviados,
+                            'versao': versao}), 200
 
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado ao atualizar motorista: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado ao atualizar motorista!'}), 500
@@ -281,12 +432,18 @@ def deletar_motorista(id):
             
             cursor.execute('''
                 UPDATE motoristas SET
-                     status = 'bloqueado' WHERE id = %s''',
+                     status = 'bloqueado', versao = versao + 1
+                     WHERE id = %s''',
                      (id,))
+            cache.invalidar('motoristas', id)
+            eventos.publicar(cursor, eventos.MOTORISTA_BLOQUEADO,
+                             'motoristas', id)
 
             logger.info('Motorista bloqueado com sucesso.')
             return '', 204
         
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado ao deletar motorista: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado ao deletar motorista!'}), 500
\ No newline at end of file
@@ -1,4 +1,5 @@
 from flask import Blueprint, jsonify, request
+from mysql.connector import errors
 from app.auth import (rota_protegida,
                         gerar_tokens,
                          validar_token,)
@@ -8,8 +9,27 @@ from app.refresh_tokens import (criar_usuario,
                                     revogar_refresh,
                                     revogar_todos_refresh)
 from app.database import conexao
+from app.lote import (inserir_em_lotes,
+                       resposta_lote,
+                        LIMITE_ITENS_LOTE)
+from app import cache
+from app.paginacao import ler_paginacao, resposta_paginada
+from app.streaming import ler_streaming, resposta_streaming
+from app.serializacao import mapeador_do_cursor
+from app.filtros import ler_filtros, ler_campos, opcao, METODOS_PAGAMENTO
+from app.condicional import (colunas_com_versao,
+                              requisicao_condicional,
+                               nao_modificado,
+                                resposta_nao_modificada,
+                                 resposta_com_validadores,
+                                  ler_versao_esperada,
+                                   atualizar_versionado)
 from app.validation import validar_json, formatar_nome
-from app.log import configurar_logging
+from app.lancamentos import (ajustar_saldo,
+                              colunas_conta,
+                               coluna_conta,
+                                resposta_lancamentos)
+from app import config
 from app.brute_force import (ip_bloqueado,
                                registrar_falha,
                                 limpar_falhas,
@@ -20,51 +40,64 @@ import bcrypt
 import re
 
 
-configurar_logging()
 logger = logging.getLogger(__name__)
 
 
 passageiros_bp = Blueprint('passageiros', __name__)
 
 
+COLUNAS_PASSAGEIRO = (
+    'id', 'nome', 'cpf', 'telefone', 'saldo', 'endereco_rua',
+    'endereco_numero', 'endereco_bairro', 'endereco_cidade',
+    'endereco_estado', 'endereco_cep', 'km', 'metodo_pagamento',
+    'versao', 'criado_em', 'atualizado_em')
+
+FILTROS_PASSAGEIRO = {
+    'metodo_pagamento': opcao(*METODOS_PAGAMENTO)
+}
+
+
 @passageiros_bp.route('/', methods=['GET'])
 @limiter.limit('100 per hour')
 @rota_protegida
 def listar_passageiros():
     try:
         logger.info('Listando passageiros...')
+
+        try:
+            limite, apos = ler_paginacao()
+            campos = ler_campos(COLUNAS_PASSAGEIRO)
+            filtros, parametros = ler_filtros(FILTROS_PASSAGEIRO)
+        except ValueError as erro:
+            logger.warning(f'Parâmetros de listagem inválidos: {str(erro)}')
+            return jsonify({'erro': str(erro)}), 400
+
+        condicoes = ' AND '.join(['id > %s'] + filtros)
+        parametros = [apos] + parametros
+
+        sql = f'''
+            SELECT {colunas_conta('passageiro', campos)}
+                FROM passageiros
+                WHERE {condicoes} ORDER BY id'''
+
+        if ler_streaming():
+            logger.info('Listagem de passageiros em streaming.')
+            return resposta_streaming(sql, parametros)
+
         with conexao() as cursor:
-            cursor.execute('''
-                SELECT id, nome, cpf, telefone, saldo, endereco_rua,
-                       endereco_numero, endereco_bairro, endereco_cidade, 
-                       endereco_estado, endereco_cep, km, metodo_pagamento,
-                       criado_em, atualizado_em
-                    FROM passageiros''')
-
-            dados = [{
-                'id': p[0],
-                'nome': p[1],
-                'cpf': p[2],
-                'telefone': p[3],
-                'saldo': p[4],
-                'endereco_rua': p[5],
-                'endereco_numero': p[6],
-                'endereco_bairro': p[7],
-                'endereco_cidade': p[8],
-                'endereco_estado': p[9],
-                'endereco_cep': p[10],
-                'km': p[11],
-                'metodo_pagamento': p[12],
-                'criado_em': p[13],
-                'atualizado_em': p[14]
-            } for p in cursor.fetchall()]
+            cursor.execute(f'{sql} LIMIT %s', (*parametros, limite + 1))
+
+            mapear = mapeador_do_cursor(cursor)
+            dados = [mapear(p) for p in cursor.fetchall()]
 
             if not dados:
                 logger.warning(f'Nenhum passageiro cadastrado ainda.')
                 return jsonify([]), 200
 
             logger.info('Listagem de passageiros bem-sucedida.')
-            return jsonify(dados), 200
+            return resposta_paginada(dados, limite)
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado ao listar passageiros: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado ao listar passageiros!'}), 500
@@ -76,12 +109,42 @@ def listar_passageiros():
 def buscar_passageiro(id):
     try:
         logger.info(f'Buscando passageiro com id={id}...')
+        try:
+            campos = ler_campos(COLUNAS_PASSAGEIRO)
+        except ValueError as erro:
+            logger.warning(f'Campos inválidos: {str(erro)}')
+            return jsonify({'erro': str(erro)}), 400
+
+        selecionadas = colunas_com_versao(campos, versionada=True)
+
+        registro = cache.ler('passageiros', id)
+        if registro is not None:
+            logger.info(f'Passageiro {id} servido do cache.')
+            if nao_modificado(id, registro['atualizado_em'], campos,
+                              registro['versao']):
+                return resposta_nao_modificada(
+                    id, registro['atualizado_em'], campos, registro['versao'])
+
+            return resposta_com_validadores(
+                {c: registro[c] for c in selecionadas}, campos)
+
+        marca = cache.marcar()
+
         with conexao() as cursor:
-            cursor.execute('''
-                SELECT id, nome, cpf, telefone, saldo, endereco_rua,
-                       endereco_numero, endereco_bairro, endereco_cidade, 
-                       endereco_estado, endereco_cep, km, metodo_pagamento,
-                       criado_em, atualizado_em
+            if requisicao_condicional():
+                cursor.execute(f'''
+                    SELECT {coluna_conta('passageiro', 'atualizado_em')}, versao
+                        FROM passageiros WHERE id = %s''', (id,))
+                versao = cursor.fetchone()
+
+                if versao and nao_modificado(id, versao[0], campos,
+                                             versao[1]):
+                    logger.info(f'Passageiro {id} não modificado.')
+                    return resposta_nao_modificada(
+                        id, versao[0], campos, versao[1])
+
+            cursor.execute(f'''
+                SELECT {colunas_conta('passageiro', selecionadas)}
                     FROM passageiros WHERE id = %s''', (id,))
             dado = cursor.fetchone()
 
@@ -90,28 +153,38 @@ def buscar_passageiro(id):
                 return jsonify({'erro': 'Passageiro não encontrado!'}), 404
 
             logger.info(f'Busca de passageiro com id={id} bem-sucedida.')
-            return jsonify({
-                'id': dado[0],
-                'nome': dado[1],
-                'cpf': dado[2],
-                'telefone': dado[3],
-                'saldo': dado[4],
-                'endereco_rua': dado[5],
-                'endereco_numero': dado[6],
-                'endereco_bairro': dado[7],
-                'endereco_cidade': dado[8],
-                'endereco_estado': dado[9],
-                'endereco_cep': dado[10],
-                'km': dado[11],
-                'metodo_pagamento': dado[12],
-                'criado_em': dado[13],
-                'atualizado_em': dado[14]
-            }), 200
+            registro = mapeador_do_cursor(cursor)(dado)
+            if campos == COLUNAS_PASSAGEIRO:
+                cache.guardar('passageiros', id, registro, marca)
+
+            return resposta_com_validadores(registro, campos)
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado ao buscar passageiros: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado ao buscar passageiros!'}), 500
 
 
+@passageiros_bp.route('/<int:id>/lancamentos', methods=['GET'])
+@limiter.limit('100 per hour')
+@rota_protegida
+def listar_lancamentos_passageiro(id):
+    try:
+        logger.info(f'Listando lançamentos do passageiro id={id}...')
+
+        try:
+            return resposta_lancamentos('passageiro', id)
+        except ValueError as erro:
+            logger.warning(f'Parâmetros de listagem inválidos: {str(erro)}')
+            return jsonify({'erro': str(erro)}), 400
+
+    except errors.PoolError:
+        raise
+    except Exception as erro:
+        logger.error(f'Erro inesperado ao listar lançamentos: {str(erro)}')
+        return jsonify({'erro': 'Erro inesperado ao listar lançamentos!'}), 500
+
+
 @passageiros_bp.route('/register', methods=['POST'])
 @limiter.limit('3 per minute')
 def register():
@@ -160,6 +233,8 @@ def register():
             logger.info('Usuário criado.')
             return jsonify({'mensagem': 'Usuário criado com sucesso.'}), 201
         
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado ao registrar usuário: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado ao registrar usuário!'}), 500
@@ -257,6 +332,8 @@ def login():
 
             return response, 200
 
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado ao gerar token: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado ao gerar token!'}), 500
@@ -330,6 +407,8 @@ def refresh():
 
             return response, 200
 
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado ao renovar token: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado ao renovar token!'}), 500
@@ -364,11 +443,80 @@ def logout():
 
         return response, 200
     
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado no logout: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado no logout!'}), 500
 
 
+REGRAS_PASSAGEIRO = {
+    'nome': lambda v: isinstance(v, str) and v.strip() != '',
+    'cpf': lambda v: isinstance(
+        v, str) and re.fullmatch(r'\d{11}', v) is not None,
+    'telefone': lambda v: isinstance(
+        v, str) and re.fullmatch(r'\d{10,11}', v) is not None,
+    'saldo': lambda v: isinstance(v, Decimal) and v >= 0,
+    'endereco_rua': lambda v: isinstance(v, str) and v.strip() != '',
+    'endereco_numero': lambda v: isinstance(v, str) and v.strip() != '',
+    'endereco_bairro': lambda v: isinstance(v, str) and v.strip() != '',
+    'endereco_cidade': lambda v: isinstance(v, str) and v.strip() != '',
+    'endereco_estado': lambda v: isinstance(v, str) and len(v.strip()) == 2,
+    'endereco_cep': lambda v: isinstance(
+        v, str) and re.fullmatch(r'\d{5}-?\d{3}', v) is not None,
+    'km': lambda v: isinstance(v, Decimal) and v > 0,
+    'metodo_pagamento': lambda v: isinstance(
+        v, str) and v.strip().lower() in ('pix', 'credito', 'debito', 'boleto')
+}
+
+COLUNAS_INSERCAO_PASSAGEIRO = tuple(REGRAS_PASSAGEIRO)
+
+
+def normalizar_passageiro(dados):
+    if not isinstance(dados, dict):
+        raise ValueError('Passageiro deve ser um objeto JSON!')
+
+    faltando = [c for c in REGRAS_PASSAGEIRO
+                if c not in dados or dados[c] is None]
+
+    if faltando:
+        raise ValueError(f"Campos obrigatórios: {', '.join(faltando)}")
+
+    registro = {}
+    for campo, regra in REGRAS_PASSAGEIRO.items():
+        try:
+            valor = dados[campo]
+
+            if campo in ('cpf', 'telefone', 'endereco_rua', 'endereco_numero',
+                         'endereco_bairro', 'endereco_cep'):
+                valor = str(valor).strip()
+
+            elif campo in ('nome', 'endereco_cidade'):
+                valor = formatar_nome(valor)
+
+            elif campo == 'metodo_pagamento':
+                valor = str(valor).strip().lower()
+
+            elif campo == 'endereco_estado':
+                valor = str(valor).strip().upper()
+
+            elif campo in ('saldo', 'km'):
+                try:
+                    valor = Decimal(str(valor)).quantize(Decimal('0.01'))
+                except InvalidOperation:
+                    raise ValueError
+
+            if not regra(valor):
+                raise ValueError
+
+            registro[campo] = valor
+
+        except Exception:
+            raise ValueError(f'Valor inválido para {campo}')
+
+    return registro
+
+
 @passageiros_bp.route('/', methods=['POST'])
 @limiter.limit('100 per hour')
 @rota_protegida
@@ -378,63 +526,11 @@ def adicionar_passageiro():
 
         dados = validar_json()
 
-        REGRAS = {
-            'nome': lambda v: isinstance(v, str) and v.strip() != '',
-            'cpf': lambda v: isinstance(
-                v, str) and re.fullmatch(r'\d{11}', v) is not None,
-            'telefone': lambda v: isinstance(
-                v, str) and re.fullmatch(r'\d{10,11}', v) is not None,
-            'saldo': lambda v: isinstance(v, Decimal) and v >= 0,
-            'endereco_rua': lambda v: isinstance(v, str) and v.strip() != '',
-            'endereco_numero': lambda v: isinstance(v, str) and v.strip() != '',
-            'endereco_bairro': lambda v: isinstance(v, str) and v.strip() != '',
-            'endereco_cidade': lambda v: isinstance(v, str) and v.strip() != '',
-            'endereco_estado': lambda v: isinstance(v, str) and len(v.strip()) == 2,
-            'endereco_cep': lambda v: isinstance(
-                v, str) and re.fullmatch(r'\d{5}-?\d{3}', v) is not None,
-            'km': lambda v: isinstance(v, Decimal) and v > 0,
-            'metodo_pagamento': lambda v: isinstance(
-                v, str) and v.strip().lower() in ('pix', 'credito', 'debito', 'boleto')
-        }
-
-        faltando = [c for c in REGRAS if c not in dados or dados[c] is None]
-
-        if faltando:
-            logger.warning(f"Campos obrigatórios: {', '.join(faltando)}")
-            return jsonify({'erro': f"Campos obrigatórios: {', '.join(faltando)}"}), 400
-
-        for campo, regra in REGRAS.items():
-            try:
-                valor = dados[campo]
-
-                if campo in ('cpf', 'telefone', 'endereco_rua', 'endereco_numero',
-                             'endereco_bairro', 'endereco_cep'):
-                    valor = str(valor).strip()
-                
-                elif campo in ('nome', 'endereco_cidade'):
-                    valor = formatar_nome(valor)
-                
-                elif campo in ('metodo_pagamento'):
-                    valor = str(valor).strip().lower()
-                
-                elif campo == 'endereco_estado':
-                    valor = str(valor).strip().upper()
-
-                elif campo in ('saldo', 'km'):
-                    try:
-                        valor = Decimal(str(valor)).quantize(Decimal('0.01'))
-                    except InvalidOperation:
-                        raise ValueError
-
-                if not regra(valor):
-                    raise ValueError
-
-                dados[campo] = valor
-
-            except Exception:
-                logger.warning(
-                    f'Valor inválido para {campo}: {dados.get(campo)}')
-                return jsonify({'erro': f'Valor inválido para {campo}'}), 400
+        try:
+            dados = normalizar_passageiro(dados)
+        except ValueError as erro:
+            logger.warning(f'Passageiro inválido: {str(erro)}')
+            return jsonify({'erro': str(erro)}), 400
 
         with conexao() as cursor:
             cursor.execute('''
@@ -456,11 +552,55 @@ def adicionar_passageiro():
             return jsonify({'mensagem': 'Passageiro adicionado com sucesso!',
                             'id': novo_id}), 201
 
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado ao adicionar passageiro: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado ao adicionar passageiro!'}), 500
 
 
+@passageiros_bp.route('/bulk', methods=['POST'])
+@limiter.limit('20 per hour')
+@rota_protegida
+def adicionar_passageiros_em_lote():
+    try:
+        logger.info('Adicionando passageiros em lote...')
+
+        dados = validar_json()
+
+        if not isinstance(dados, list):
+            logger.warning('Corpo do lote deve ser uma lista JSON.')
+            return jsonify({'erro': 'Envie uma lista de passageiros!'}), 400
+
+        if len(dados) > LIMITE_ITENS_LOTE:
+            logger.warning(f'Lote com {len(dados)} itens excede o limite.')
+            return jsonify(
+                {'erro': f'Máximo de {LIMITE_ITENS_LOTE} passageiros por lote!'}), 413
+
+        resultados = {}
+        validos = []
+
+        for indice, item in enumerate(dados):
+            try:
+                validos.append((indice, normalizar_passageiro(item)))
+            except ValueError as erro:
+                resultados[indice] = {'status': 400, 'erro': str(erro)}
+
+        resultados.update(inserir_em_lotes(
+            'passageiros', COLUNAS_INSERCAO_PASSAGEIRO, validos,
+            unicas=('cpf', 'telefone'), chave='cpf'))
+
+        return resposta_lote(resultados, len(dados))
+
+    except errors.PoolError:
+        raise
+    except Exception as erro:
+        logger.error(
+            f'Erro inesperado ao adicionar passageiros em lote: {str(erro)}')
+        return jsonify(
+            {'erro': 'Erro inesperado ao adicionar passageiros em lote!'}), 500
+
+
 @passageiros_bp.route('/<int:id>', methods=['PUT'])
 @limiter.limit('100 per hour')
 @rota_protegida
@@ -469,6 +609,12 @@ def atualizar_passageiro(id):
         logger.info(f'Atualizando passageiro com id={id}...')
         dados = validar_json()
 
+        try:
+            esperada = ler_versao_esperada(dados)
+        except ValueError as erro:
+            logger.warning(f'Versão inválida: {str(erro)}')
+            return jsonify({'erro': str(erro)}), 400
+
         REGRAS = {
             'nome': lambda v: isinstance(v, str) and v.strip() != '',
             'telefone': lambda v: isinstance(
@@ -526,22 +672,38 @@ def atualizar_passageiro(id):
                 return jsonify({'erro': f'Valor inválido para {campo}!'}), 400
 
 
-        set_sql = ", ".join(f"{campo} = %s" for campo in enviados.keys())
-        valores = list(enviados.values())
-        valores.append(id)
+        colunas = dict(enviados)
+        novo_saldo = None
+        if config.SALDOS_LANCAMENTOS:
+            novo_saldo = colunas.pop('saldo', None)
 
-        query = f"UPDATE passageiros SET {set_sql} WHERE id = %s"
         with conexao() as cursor:
-            cursor.execute(query, valores)
+            versao, atual = atualizar_versionado(
+                cursor, 'passageiros', id, colunas, esperada)
+            cache.invalidar('passageiros', id)
 
-            if cursor.rowcount == 0:
+            if versao is None and atual is None:
                 logger.warning(f'Passageiro id={id} não encontrado.')
                 return jsonify({'erro': 'Passageiro não encontrado!'}), 404
 
+            if versao is None:
+                logger.warning(
+                    f'Conflito de versão no passageiro id={id}: '
+                    f'esperada={esperada}, atual={atual}.')
+                return jsonify({
+                    'erro': 'Passageiro foi alterado por outra requisição!',
+                    'versao_atual': atual}), 409
+
+            if novo_saldo is not None:
+                ajustar_saldo(cursor, 'passageiro', id, novo_saldo)
+
             logger.info(f'Passageiro id={id} atualizado com sucesso.')
             return jsonify({'mensagem': 'Passageiro atualizado!',
-                            'atualizado': enviados}), 200
+                            'atualizado': enviados,
+                            'versao': versao}), 200
 
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado ao atualizar passageiro: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado ao atualizar passageiro!'}), 500
@@ -555,6 +717,7 @@ def deletar_passageiro(id):
         logger.info(f'Deletando passageiro com id={id}...')
         with conexao() as cursor:
             cursor.execute('DELETE FROM passageiros WHERE id = %s', (id,))
+            cache.invalidar('passageiros', id)
 
             if cursor.rowcount == 0:
                 logger.warning(f'Passageiro {id} não encontrado.')
@@ -563,6 +726,8 @@ def deletar_passageiro(id):
             logger.info('Recurso deletado com sucesso.')
             return '', 204
         
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado ao deletar passageiro: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado ao deletar passageiro!'}), 500
\ No newline at end of file
@@ -1,53 +1,93 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
+from mysql.connector import errors
 from app.auth import rota_protegida
-from app.database import conexao
+from app.database import conexao, executar_transacao
+from app.idempotencia import ler_chave, executar_idempotente
+from app.pagamentos_automaticos import situacao_fila
+from app.ganhos import ganhos_pendentes, registrar_estorno
+from app.lancamentos import lancar, saldo_atual
+from app import config
+from app import cache
+from app import eventos
+from app.paginacao import ler_paginacao, resposta_paginada
+from app.streaming import ler_streaming, resposta_streaming
+from app.serializacao import mapeador_do_cursor
+from app.filtros import (ler_filtros,
+                          ler_campos,
+                           opcao,
+                            inteiro_positivo,
+                             METODOS_PAGAMENTO)
+from app.condicional import (colunas_com_versao,
+                              requisicao_condicional,
+                               nao_modificado,
+                                resposta_nao_modificada,
+                                 resposta_com_validadores)
 from app.validation import validar_json, formatar_nome
-from app.log import configurar_logging
 from app.brute_force import limiter
 from decimal import Decimal, InvalidOperation
 import logging
 
 
-configurar_logging()
 logger = logging.getLogger(__name__)
 
 
 registros_pagamento_bp = Blueprint('registros-pagamento', __name__)
 
 
+COLUNAS_REGISTRO = (
+    'id', 'id_viagem', 'remetente', 'recebedor', 'metodo_pagamento',
+    'pagamento', 'status', 'valor_viagem', 'criado_em', 'atualizado_em')
+
+FILTROS_REGISTRO = {
+    'status': opcao('concluido', 'cancelado'),
+    'pagamento': opcao('pago', 'cancelado', 'pendente'),
+    'id_viagem': inteiro_positivo,
+    'metodo_pagamento': opcao(*METODOS_PAGAMENTO)
+}
+
+
 @registros_pagamento_bp.route('/', methods=['GET'])
 @limiter.limit('100 per hour')
 @rota_protegida
 def listar_registros_pagamento():
     try:
         logger.info('Listando registros de pagamentos...')
+
+        try:
+            limite, apos = ler_paginacao()
+            campos = ler_campos(COLUNAS_REGISTRO)
+            filtros, parametros = ler_filtros(FILTROS_REGISTRO)
+        except ValueError as erro:
+            logger.warning(f'Parâmetros de listagem inválidos: {str(erro)}')
+            return jsonify({'erro': str(erro)}), 400
+
+        condicoes = ' AND '.join(['id > %s'] + filtros)
+        parametros = [apos] + parametros
+
+        sql = f'''
+            SELECT {', '.join(campos)}
+                FROM registros_pagamento
+                WHERE {condicoes} ORDER BY id'''
+
+        if ler_streaming():
+            logger.info('Listagem de registros de pagamento em streaming.')
+            return resposta_streaming(sql, parametros)
+
         with conexao() as cursor:
-            cursor.execute('''
-                SELECT id, id_viagem, remetente, recebedor,
-                       metodo_pagamento, pagamento, status,
-                       valor_viagem, criado_em, atualizado_em
-                    FROM registros_pagamento''')
-            
-            dados = [{
-                'id': rg[0],
-                'id_viagem': rg[1],
-                'remetente': rg[2],
-                'recebedor': rg[3],
-                'metodo_pagamento': rg[4],
-                'pagamento': rg[5],
-                'status': rg[6],
-                'valor_viagem': rg[7],
-                'criado_em': rg[8],
-                'atualizado_em': rg[9]
-            } for rg in cursor.fetchall()]
+            cursor.execute(f'{sql} LIMIT %s', (*parametros, limite + 1))
+
+            mapear = mapeador_do_cursor(cursor)
+            dados = [mapear(rg) for rg in cursor.fetchall()]
 
             if not dados:
                 logger.warning('Nenhum registro de pagamento registrado ainda.')
                 return jsonify([]), 200
 
             logger.info('Listagem de registros de pagamento bem-sucedida.')
-            return jsonify(dados), 200
+            return resposta_paginada(dados, limite)
 
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado ao listar registros de pagamento: {str(erro)}')
         return jsonify(
@@ -60,13 +100,39 @@ def listar_registros_pagamento():
 def buscar_registro_pagamento(id):
     try:
         logger.info(f'Buscando registro de pagamento com id={id}...')
+        try:
+            campos = ler_campos(COLUNAS_REGISTRO)
+        except ValueError as erro:
+            logger.warning(f'Campos inválidos: {str(erro)}')
+            return jsonify({'erro': str(erro)}), 400
+
+        selecionadas = colunas_com_versao(campos)
+
+        registro = cache.ler('registros_pagamento', id)
+        if registro is not None:
+            logger.info(f'Registro de pagamento id={id} servido do cache.')
+            if nao_modificado(id, registro['atualizado_em'], campos):
+                return resposta_nao_modificada(
+                    id, registro['atualizado_em'], campos)
+
+            return resposta_com_validadores(
+                {c: registro[c] for c in selecionadas}, campos)
+
+        marca = cache.marcar()
+
         with conexao() as cursor:
-            cursor.execute('''
-                SELECT id, id_viagem, remetente, recebedor,
-                       metodo_pagamento, pagamento, status,
-                       valor_viagem, criado_em, atualizado_em
-                    FROM registros_pagamento WHERE id = %s''',
-                    (id,))
+            if requisicao_condicional():
+                cursor.execute(
+                    'SELECT atualizado_em FROM registros_pagamento WHERE id = %s', (id,))
+                versao = cursor.fetchone()
+
+                if versao and nao_modificado(id, versao[0], campos):
+                    logger.info(f'Registro de pagamento id={id} não modificado.')
+                    return resposta_nao_modificada(id, versao[0], campos)
+
+            cursor.execute(f'''
+                SELECT {', '.join(selecionadas)}
+                    FROM registros_pagamento WHERE id = %s''', (id,))
             dado = cursor.fetchone()
 
             if not dado:
@@ -74,191 +140,285 @@ def buscar_registro_pagamento(id):
                 return jsonify({'erro': 'Registro de pagamento não encontrado!'}), 404
 
             logger.info('Busca de registro de pagamento bem-sucedida.')
-            return jsonify({
-                'id': dado[0],
-                'id_viagem': dado[1],
-                'remetente': dado[2],
-                'recebedor': dado[3],
-                'metodo_pagamento': dado[4],
-                'pagamento': dado[5],
-                'status': dado[6],
-                'valor_viagem': dado[7],
-                'criado_em': dado[8],
-                'atualizado_em': dado[9]
-            }), 200
+            registro = mapeador_do_cursor(cursor)(dado)
+            if campos == COLUNAS_REGISTRO:
+                cache.guardar('registros_pagamento', id, registro, marca)
 
+            return resposta_com_validadores(registro, campos)
+
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(
             f'Erro inesperado ao buscar registro de pagamento: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado ao buscar registro de pagamento!'}), 500
 
 
-@registros_pagamento_bp.route('/', methods=['POST'])
+@registros_pagamento_bp.route('/fila', methods=['GET'])
 @limiter.limit('100 per hour')
 @rota_protegida
-def adicionar_pagamento():
+def consultar_fila_pagamentos():
     try:
-        logger.info('Adicionando registro de pagamentos...')
+        logger.info('Consultando fila de pagamentos automáticos...')
 
-        dados = validar_json()
+        try:
+            id_viagem = request.args.get('id_viagem')
+            if id_viagem is not None:
+                id_viagem = inteiro_positivo(id_viagem)
+        except ValueError:
+            logger.warning(
+                f"Parâmetro id_viagem inválido: {request.args.get('id_viagem')}")
+            return jsonify({'erro': 'Parâmetro id_viagem inválido!'}), 400
 
-        REGRAS = {
-            'id_viagem': lambda v: isinstance(v, int) and v > 0
-        }
+        with conexao() as cursor:
+            situacao = situacao_fila(cursor, id_viagem)
 
-        faltando = [c for c in REGRAS if c not in dados or dados[c] is None]
+        logger.info('Consulta da fila de pagamentos bem-sucedida.')
+        return jsonify(situacao), 200
 
-        if faltando:
-            logger.warning(f"Campo obrigatório: {''.join(faltando)}")
-            return jsonify({'erro': f"Campo obrigatório: {''.join(faltando)}"}), 400
+    except errors.PoolError:
+        raise
+    except Exception as erro:
+        logger.error(
+            f'Erro inesperado ao consultar fila de pagamentos: {str(erro)}')
+        return jsonify(
+            {'erro': 'Erro inesperado ao consultar fila de pagamentos!'}), 500
 
-        for campo, regra in REGRAS.items():
-            try:
-                valor = int(dados[campo])
 
-                if not regra(valor):
-                    raise ValueError
+VIAGEM_REGISTRO_SQL = '''
+        SELECT nome_passageiro, nome_motorista,
+               metodo_pagamento, total_viagem, status
+            FROM viagens WHERE id = %s FOR UPDATE'''
 
-                dados[campo] = valor
-            except Exception:
-                logger.warning(f'Valor inválido para {campo}: {dados.get(campo)}')
-                return jsonify({'erro': f'Valor inválido para {campo}!'}), 400
+REGISTRO_EXISTENTE_SQL = '''
+        SELECT id FROM registros_pagamento
+            WHERE id_viagem = %s'''
 
-        with conexao() as cursor:
-            cursor.execute('''
-                SELECT nome_passageiro, nome_motorista,
-                       metodo_pagamento, total_viagem, status
-                    FROM viagens WHERE id = %s FOR UPDATE''',
-                (dados['id_viagem'],))
-
-            viagem = cursor.fetchone()
-
-            if not viagem:
-                logger.warning(
-                    f"Viagem id={dados['id_viagem']} não encontrada.")
-                return jsonify({'erro': 'Viagem não encontrada!'}), 404
-            
-            cursor.execute('''
-                SELECT id FROM registros_pagamento
-                    WHERE id_viagem = %s''', (dados['id_viagem'],))
-            
-            if cursor.fetchone():
-                logger.warning(f"Pagamento id={dados['id_viagem']} já existe.")
-                return jsonify({'erro': 'Pagamento de viagem já está registrado!'}), 409
-
-            try:
-                remetente = formatar_nome(viagem[0])
-                recebedor = formatar_nome(viagem[1])
-                metodo_pagamento = str(viagem[2]).strip().lower()
-                valor_viagem = Decimal(str(viagem[3])).quantize(Decimal('0.01'))
-                status_viagem = str(viagem[4]).strip().lower()
-            except (ValueError, TypeError, InvalidOperation) as erro:
-                logger.warning(f'Erro ao coletar dados em banco: {str(erro)}')
-                return jsonify({'erro': 'Erro ao coletar dados em banco SQL!'}), 400
-            
-            if status_viagem != 'confirmada':
-                logger.warning('Viagem cancelada.')
-                return jsonify({'erro': 'Viagem cancelada não pode ser registrada!'}), 400
-
-            cursor.execute('''
-                    INSERT INTO registros_pagamento
-                        (id_viagem, remetente, recebedor,
-                         metodo_pagamento, valor_viagem
-                        ) VALUES (%s, %s, %s, %s, %s)
-                    ''', (dados['id_viagem'], remetente, recebedor,
-                          metodo_pagamento, valor_viagem))
-
-            novo_id = cursor.lastrowid
-            logger.info(
-                f'Registro de pagamento id={novo_id} adicionado com sucesso.')
-            return jsonify(
-                {'mensagem': 'Registro de pagamento adicionado com sucesso!',
-                 'id': novo_id}), 201
+INSERIR_REGISTRO_SQL = '''
+            INSERT INTO registros_pagamento
+                (id_viagem, remetente, recebedor,
+                 metodo_pagamento, valor_viagem
+                ) VALUES (%s, %s, %s, %s, %s)
+            '''
 
-    except Exception as erro:
-        logger.error(
-            f'Erro inesperado ao adicionar registro de pagamento: {str(erro)}')
-        return jsonify(
-            {'erro': 'Erro inesperado ao adicionar registro de pagamento!'}), 500
 
+def avaliar_viagem(id_viagem, viagem, registrada):
+    if not viagem:
+        logger.warning(
+            f"Viagem id={id_viagem} não encontrada.")
+        return None, ('Viagem não encontrada!', 404)
 
-@registros_pagamento_bp.route('/<int:id>/cancelar', methods=['PATCH'])
+    if registrada:
+        logger.warning(f"Pagamento id={id_viagem} já existe.")
+        return None, ('Pagamento de viagem já está registrado!', 409)
+
+    try:
+        remetente = formatar_nome(viagem[0])
+        recebedor = formatar_nome(viagem[1])
+        metodo_pagamento = str(viagem[2]).strip().lower()
+        valor_viagem = Decimal(str(viagem[3])).quantize(Decimal('0.01'))
+        status_viagem = str(viagem[4]).strip().lower()
+    except (ValueError, TypeError, InvalidOperation) as erro:
+        logger.warning(f'Erro ao coletar dados em banco: {str(erro)}')
+        return None, ('Erro ao coletar dados em banco SQL!', 400)
+
+    if status_viagem != 'confirmada':
+        logger.warning('Viagem cancelada.')
+        return None, ('Viagem cancelada não pode ser registrada!', 400)
+
+    return (id_viagem, remetente, recebedor,
+            metodo_pagamento, valor_viagem), None
+
+
+def corpo_registro(novo_id):
+    return {'mensagem': 'Registro de pagamento adicionado com sucesso!',
+            'id': novo_id}
+
+
+def registrar_pagamento(cursor, id_viagem):
+    cursor.execute(VIAGEM_REGISTRO_SQL, (id_viagem,))
+    viagem = cursor.fetchone()
+
+    registrada = False
+    if viagem:
+        cursor.execute(REGISTRO_EXISTENTE_SQL, (id_viagem,))
+        registrada = cursor.fetchone() is not None
+
+    valores, falha = avaliar_viagem(id_viagem, viagem, registrada)
+
+    if falha:
+        mensagem, status = falha
+        return jsonify({'erro': mensagem}), status
+
+    cursor.execute(INSERIR_REGISTRO_SQL, valores)
+
+    novo_id = cursor.lastrowid
+    eventos.publicar(cursor, eventos.PAGAMENTO_REGISTRADO,
+                     'registros_pagamento', novo_id, id_viagem=id_viagem)
+    logger.info(
+        f'Registro de pagamento id={novo_id} adicionado com sucesso.')
+    return jsonify(corpo_registro(novo_id)), 201
+
+
+def validar_registro(dados):
+    REGRAS = {
+        'id_viagem': lambda v: isinstance(v, int) and v > 0
+    }
+
+    faltando = [c for c in REGRAS if c not in dados or dados[c] is None]
+
+    if faltando:
+        raise ValueError(f"Campo obrigatório: {''.join(faltando)}")
+
+    for campo, regra in REGRAS.items():
+        try:
+            valor = int(dados[campo])
+
+            if not regra(valor):
+                raise ValueError
+
+            dados[campo] = valor
+        except Exception:
+            raise ValueError(f'Valor inválido para {campo}!')
+
+    return dados['id_viagem']
+
+
+@registros_pagamento_bp.route('/', methods=['POST'])
 @limiter.limit('100 per hour')
 @rota_protegida
-def cancelar_registro_pagamento(id):
+def adicionar_pagamento():
     try:
-        logger.info(f'Cancelando registro com id={id}...')
-
-        with conexao() as cursor:
-            cursor.execute('''
-                SELECT id_viagem, status FROM registros_pagamento
-                    WHERE id = %s FOR UPDATE''', (id,))
-            registro = cursor.fetchone()
-
-            if not registro:
-                logger.warning(f'Registro id={id} não encontrado.')
-                return jsonify({'erro': 'Registro não encontrado!'}), 404
-            
-            if registro[1] == 'cancelado':
-                logger.warning(f'Registro id={id} já foi cancelado.')
-                return jsonify({'erro': 'Registro já está cancelado!'}), 409
+        logger.info('Adicionando registro de pagamentos...')
 
-            cursor.execute(
-                '''SELECT id_passageiro, id_motorista, total_viagem, status
-                        FROM viagens WHERE id = %s FOR UPDATE''',
-                  (registro[0],))
-            viagem = cursor.fetchone()
-
-            if not viagem:
-                logger.warning(f'Viagem id={registro[0]} não encontrado.')
-                return jsonify({'erro': 'Viagem não encontrada!'}), 404
-            
-            if viagem[3] != 'cancelada':
-                logger.warning(f'Viagem não foi cancelada.')
-                return '', 204
-           
-            cursor.execute(
-                'SELECT saldo FROM passageiros WHERE id = %s FOR UPDATE',
-                            (viagem[0],))
+        try:
+            chave = ler_chave()
+        except ValueError as erro:
+            logger.warning(f'Chave de idempotência inválida: {str(erro)}')
+            return jsonify({'erro': str(erro)}), 400
 
-            passageiro = cursor.fetchone()
+        dados = validar_json()
 
-            if not passageiro:
-                logger.warning(
-                    f"Passageiro id={viagem[0]} não encontrado.")
-                return jsonify({'erro': 'Passageiro não encontrado!'}), 404
+        try:
+            id_viagem = validar_registro(dados)
+        except ValueError as erro:
+            logger.warning(str(erro))
+            return jsonify({'erro': str(erro)}), 400
 
-            cursor.execute(
-                'SELECT quantia FROM motoristas WHERE id = %s FOR UPDATE',
-                (viagem[1],))
+        return executar_idempotente(chave, registrar_pagamento, id_viagem)
 
-            motorista = cursor.fetchone()
+    except errors.PoolError:
+        raise
+    except Exception as erro:
+        logger.error(
+            f'Erro inesperado ao adicionar registro de pagamento: {str(erro)}')
+        return jsonify(
+            {'erro': 'Erro inesperado ao adicionar registro de pagamento!'}), 500
 
-            if not motorista:
-                logger.warning(
-                    f"Motorista id={viagem[1]} não encontrado.")
-                return jsonify({'erro': 'Motorista não encontrado!'}), 404
-            
-            if viagem[2] > motorista[0]:
-                logger.warning('Incosistência financeira detectada.')
-                return jsonify({'erro': 'Incosistência financeira!'}), 400
 
+def estornar_registro(cursor, id):
+    cursor.execute('''
+        SELECT id_viagem, status FROM registros_pagamento
+            WHERE id = %s FOR UPDATE''', (id,))
+    registro = cursor.fetchone()
+
+    if not registro:
+        logger.warning(f'Registro id={id} não encontrado.')
+        return jsonify({'erro': 'Registro não encontrado!'}), 404
+
+    if registro[1] == 'cancelado':
+        logger.warning(f'Registro id={id} já foi cancelado.')
+        return jsonify({'erro': 'Registro já está cancelado!'}), 409
+
+    cursor.execute(
+        '''SELECT id_passageiro, id_motorista, total_viagem, status
+                FROM viagens WHERE id = %s FOR UPDATE''',
+          (registro[0],))
+    viagem = cursor.fetchone()
+
+    if not viagem:
+        logger.warning(f'Viagem id={registro[0]} não encontrado.')
+        return jsonify({'erro': 'Viagem não encontrada!'}), 404
+
+    if viagem[3] != 'cancelada':
+        logger.warning(f'Viagem não foi cancelada.')
+        return '', 204
+
+    cursor.execute(
+        'SELECT saldo FROM passageiros WHERE id = %s FOR UPDATE',
+                    (viagem[0],))
+
+    passageiro = cursor.fetchone()
+
+    if not passageiro:
+        logger.warning(
+            f"Passageiro id={viagem[0]} não encontrado.")
+        return jsonify({'erro': 'Passageiro não encontrado!'}), 404
+
+    cursor.execute(
+        'SELECT quantia FROM motoristas WHERE id = %s FOR UPDATE',
+        (viagem[1],))
+
+    motorista = cursor.fetchone()
+
+    if not motorista:
+        logger.warning(
+            f"Motorista id={viagem[1]} não encontrado.")
+        return jsonify({'erro': 'Motorista não encontrado!'}), 404
+
+    quantia = motorista[0]
+    if config.SALDOS_LANCAMENTOS:
+        quantia = saldo_atual(cursor, 'motorista', viagem[1])
+    elif config.GANHOS_ADIADOS:
+        quantia += ganhos_pendentes(cursor, viagem[1])
+
+    if viagem[2] > quantia:
+        logger.warning('Incosistência financeira detectada.')
+        return jsonify({'erro': 'Incosistência financeira!'}), 400
+
+    if config.SALDOS_LANCAMENTOS:
+        lancar(cursor, f'estorno:{id}', 'estorno',
+               [('passageiro', viagem[0], viagem[2]),
+                ('motorista', viagem[1], -viagem[2])])
+    else:
+        if config.GANHOS_ADIADOS:
+            registrar_estorno(cursor, viagem[1], registro[0], viagem[2])
+        else:
             cursor.execute(
                 'UPDATE motoristas SET quantia = quantia - %s WHERE id = %s',
                             (viagem[2], viagem[1]))
 
-            cursor.execute(
-                '''UPDATE passageiros SET saldo = saldo + %s WHERE id = %s''',
-                    (viagem[2], viagem[0]))
-            
-            cursor.execute('''
-                UPDATE registros_pagamento SET status = 'cancelado',
-                    pagamento = 'cancelado' WHERE id = %s''',
-                    (id,))
+        cursor.execute(
+            '''UPDATE passageiros SET saldo = saldo + %s WHERE id = %s''',
+                (viagem[2], viagem[0]))
+
+    cursor.execute('''
+        UPDATE registros_pagamento SET status = 'cancelado',
+            pagamento = 'cancelado' WHERE id = %s''',
+            (id,))
+
+    cache.invalidar('registros_pagamento', id)
+    cache.invalidar('passageiros', viagem[0])
+    cache.invalidar('motoristas', viagem[1])
+    eventos.publicar(cursor, eventos.PAGAMENTO_CANCELADO,
+                     'registros_pagamento', id, id_viagem=registro[0],
+                     id_passageiro=viagem[0], id_motorista=viagem[1])
+
+    logger.info('Estorno realizado com sucesso!')
+    return '', 204
+
+
+@registros_pagamento_bp.route('/<int:id>/cancelar', methods=['PATCH'])
+@limiter.limit('100 per hour')
+@rota_protegida
+def cancelar_registro_pagamento(id):
+    try:
+        logger.info(f'Cancelando registro com id={id}...')
 
-            logger.info('Estorno realizado com sucesso!')
-            return '', 204
+        return executar_transacao(estornar_registro, id)
 
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado ao atualizar viagem: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado ao atualizar viagem!'}), 500
\ No newline at end of file
@@ -1,63 +1,103 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, make_response
+from mysql.connector import errors
 from app.auth import rota_protegida
-from app.database import conexao
-from app.validation import validar_json, formatar_nome
-from app.log import configurar_logging
+from app.database import conexao, executar_transacao
+from app.idempotencia import (ler_chave,
+                               executar_idempotente,
+                                resposta_salva,
+                                 CABECALHO_REPETIDA)
+from app.pagamentos_automaticos import enfileirar
+from app.ganhos import registrar_ganho
+from app.lancamentos import lancar, saldo_sql
+from app.reservas import (em_duas_fases,
+                           criar_reserva,
+                            travar_reserva,
+                             remover_reserva,
+                              liberar_reserva)
+from app import config
+from app import cache
+from app import eventos
+from app.paginacao import ler_paginacao, resposta_paginada
+from app.streaming import ler_streaming, resposta_streaming
+from app.serializacao import mapeador_do_cursor
+from app.filtros import (ler_filtros,
+                          ler_campos,
+                           opcao,
+                            inteiro_positivo,
+                             METODOS_PAGAMENTO)
+from app.condicional import (colunas_com_versao,
+                              requisicao_condicional,
+                               nao_modificado,
+                                resposta_nao_modificada,
+                                 resposta_com_validadores)
+from app.validation import validar_json
 from app.brute_force import limiter
-from decimal import Decimal, InvalidOperation
 import logging
 
 
-configurar_logging()
 logger = logging.getLogger(__name__)
 
 
 viagens_bp = Blueprint('viagens', __name__)
 
 
+COLUNAS_VIAGEM = (
+    'id', 'id_passageiro', 'id_motorista', 'nome_passageiro',
+    'nome_motorista', 'endereco_rua', 'endereco_numero', 'endereco_bairro',
+    'endereco_cidade', 'endereco_estado', 'endereco_cep', 'valor_por_km',
+    'total_viagem', 'metodo_pagamento', 'status', 'criado_em',
+    'atualizado_em')
+
+FILTROS_VIAGEM = {
+    'status': opcao('confirmada', 'cancelada'),
+    'id_passageiro': inteiro_positivo,
+    'id_motorista': inteiro_positivo,
+    'metodo_pagamento': opcao(*METODOS_PAGAMENTO)
+}
+
+
 @viagens_bp.route('/', methods=['GET'])
 @limiter.limit('100 per hour')
 @rota_protegida
 def listar_viagens():
     try:
         logger.info('Listando viagens...')
+
+        try:
+            limite, apos = ler_paginacao()
+            campos = ler_campos(COLUNAS_VIAGEM)
+            filtros, parametros = ler_filtros(FILTROS_VIAGEM)
+        except ValueError as erro:
+            logger.warning(f'Parâmetros de listagem inválidos: {str(erro)}')
+            return jsonify({'erro': str(erro)}), 400
+
+        condicoes = ' AND '.join(['id > %s'] + filtros)
+        parametros = [apos] + parametros
+
+        sql = f'''
+            SELECT {', '.join(campos)}
+                FROM viagens
+                WHERE {condicoes} ORDER BY id'''
+
+        if ler_streaming():
+            logger.info('Listagem de viagens em streaming.')
+            return resposta_streaming(sql, parametros)
+
         with conexao() as cursor:
-            cursor.execute('''
-                SELECT id, id_passageiro, id_motorista, nome_passageiro,
-                       nome_motorista, endereco_rua, endereco_numero,
-                       endereco_bairro, endereco_cidade, endereco_estado,
-                       endereco_cep, valor_por_km, total_viagem,
-                       metodo_pagamento, status, criado_em,
-                       atualizado_em
-                    FROM viagens''')
-            
-            dados = [{
-                'id': v[0],
-                'id_passageiro': v[1],
-                'id_motorista': v[2],
-                'nome_passageiro': v[3],
-                'nome_motorista': v[4],
-                'endereco_rua': v[5],
-                'endereco_numero': v[6],
-                'endereco_bairro':  v[7],
-                'endereco_cidade': v[8],
-                'endereco_estado': v[9],
-                'endereco_cep': v[10],
-                'valor_por_km': v[11],
-                'total_viagem': v[12],
-                'metodo_pagamento': v[13],
-                'status': v[14],
-                'criado_em': v[15],
-                'atualizado_em': v[16]
-            } for v in cursor.fetchall()]
+            cursor.execute(f'{sql} LIMIT %s', (*parametros, limite + 1))
+
+            mapear = mapeador_do_cursor(cursor)
+            dados = [mapear(v) for v in cursor.fetchall()]
 
             if not dados:
                 logger.warning(f'Nenhum viagem cadastrada ainda.')
                 return jsonify([]), 200
 
             logger.info(f'Listagem de viagens bem-sucedida.')
-            return jsonify(dados), 200
+            return resposta_paginada(dados, limite)
 
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado ao listar viagens: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado ao listar viagens!'}), 500
@@ -69,14 +109,38 @@ def listar_viagens():
 def buscar_viagem(id):
     try:
         logger.info(f'Buscando viagem com id={id}...')
+        try:
+            campos = ler_campos(COLUNAS_VIAGEM)
+        except ValueError as erro:
+            logger.warning(f'Campos inválidos: {str(erro)}')
+            return jsonify({'erro': str(erro)}), 400
+
+        selecionadas = colunas_com_versao(campos)
+
+        registro = cache.ler('viagens', id)
+        if registro is not None:
+            logger.info(f'Viagem id={id} servida do cache.')
+            if nao_modificado(id, registro['atualizado_em'], campos):
+                return resposta_nao_modificada(
+                    id, registro['atualizado_em'], campos)
+
+            return resposta_com_validadores(
+                {c: registro[c] for c in selecionadas}, campos)
+
+        marca = cache.marcar()
+
         with conexao() as cursor:
-            cursor.execute('''
-                SELECT id, id_passageiro, id_motorista, nome_passageiro,
-                       nome_motorista, endereco_rua, endereco_numero,
-                       endereco_bairro, endereco_cidade, endereco_estado,
-                       endereco_cep, valor_por_km, total_viagem,
-                       metodo_pagamento, status, criado_em,
-                       atualizado_em
+            if requisicao_condicional():
+                cursor.execute(
+                    'SELECT atualizado_em FROM viagens WHERE id = %s', (id,))
+                versao = cursor.fetchone()
+
+                if versao and nao_modificado(id, versao[0], campos):
+                    logger.info(f'Viagem id={id} não modificada.')
+                    return resposta_nao_modificada(id, versao[0], campos)
+
+            cursor.execute(f'''
+                SELECT {', '.join(selecionadas)}
                     FROM viagens WHERE id = %s''', (id,))
 
             dado = cursor.fetchone()
@@ -86,156 +150,347 @@ def buscar_viagem(id):
                 return jsonify({'erro': 'Viagem não encontrado!'}), 404
 
             logger.info(f'Busca de viagem bem-sucedida.')
-            return jsonify({
-                'id': dado[0],
-                'id_passageiro': dado[1],
-                'id_motorista': dado[2],
-                'nome_passageiro': dado[3],
-                'nome_motorista': dado[4],
-                'endereco_rua': dado[5],
-                'endereco_numero': dado[6],
-                'endereco_bairro': dado[7],
-                'endereco_cidade': dado[8],
-                'endereco_estado': dado[9],
-                'endereco_cep': dado[10],
-                'valor_por_km': dado[11],
-                'total_viagem': dado[12],
-                'metodo_pagamento': dado[13],
-                'status': dado[14],
-                'criado_em': dado[15],
-                'atualizado_em': dado[16]
-            }), 200
+            registro = mapeador_do_cursor(cursor)(dado)
+            if campos == COLUNAS_VIAGEM:
+                cache.guardar('viagens', id, registro, marca)
+
+            return resposta_com_validadores(registro, campos)
 
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado ao buscar viagem: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado ao buscar viagem!'}), 500
 
 
-@viagens_bp.route('/', methods=['POST'])
-@limiter.limit('100 per hour')
-@rota_protegida
-def adicionar_viagem():
-    try:
-        logger.info('Adicionando viagem...')
+# ROUND() do MySQL leva o meio centavo para longe do zero; a reserva em Python
+# usava Decimal.quantize, que leva para o par. O CASE mantém o meio para o par
+# (tarifa e km são positivos): resto .5 com centavo par trunca.
+TOTAL_VIAGEM_SQL = '''(CASE WHEN MOD(m.valor_passagem * p.km * 100, 2) = 0.5
+                 THEN TRUNCATE(m.valor_passagem * p.km, 2)
+                 ELSE ROUND(m.valor_passagem * p.km, 2) END)'''
 
-        dados = validar_json()
 
-        REGRAS = {
-            'id_passageiro': lambda v: isinstance(v, int) and v > 0,
-            'id_motorista': lambda v: isinstance(v, int) and v > 0
+def diagnostico_sql():
+    return f'''
+        SELECT {saldo_sql('passageiro', 'p')}, p.km, m.valor_passagem,
+               m.status, {TOTAL_VIAGEM_SQL}
+            FROM passageiros p
+            LEFT JOIN motoristas m ON m.id = %s
+            WHERE p.id = %s'''
+
+
+def diagnosticar_reserva(cursor, id_passageiro, id_motorista):
+    cursor.execute(diagnostico_sql(), (id_motorista, id_passageiro))
+    return avaliar_reserva(cursor.fetchone())
+
+
+def avaliar_reserva(linha):
+    if not linha:
+        return 'Passageiro não encontrado!', 404
+
+    saldo, km, valor_passagem, status_moto, total_viagem = linha
+
+    if status_moto is None:
+        return 'Motorista não encontrado!', 404
+
+    if valor_passagem <= 0:
+        return 'Valor da passagem não pode ser negativo!', 400
+
+    if km <= 0:
+        return 'Km deve ser positivo!', 400
+
+    if status_moto != 'ativo':
+        return 'Motorista suspenso ou bloqueado não pode fazer viagens!', 409
+
+    if saldo < total_viagem:
+        return 'Saldo insuficiente!', 400
+
+    return 'Não foi possível reservar a viagem!', 409
+
+
+CREDITO_MOTORISTA_SQL = f''',
+                m.quantia = m.quantia + {TOTAL_VIAGEM_SQL}'''
+
+
+INSERIR_VIAGEM_SQL = f'''
+        INSERT INTO viagens
+            (id_passageiro, id_motorista, nome_passageiro,
+             nome_motorista, endereco_rua, endereco_numero, endereco_bairro,
+             endereco_cidade, endereco_estado, endereco_cep, valor_por_km,
+             total_viagem, metodo_pagamento)
+        SELECT p.id, m.id, p.nome, m.nome, p.endereco_rua, p.endereco_numero,
+               p.endereco_bairro, p.endereco_cidade, p.endereco_estado,
+               p.endereco_cep, m.valor_passagem, {TOTAL_VIAGEM_SQL},
+               p.metodo_pagamento
+            FROM passageiros p
+            JOIN motoristas m ON m.id = %s
+            WHERE p.id = %s'''
+
+
+RESERVA_LANCAMENTOS_SQL = f'''
+        SELECT {saldo_sql('passageiro', 'p')}, p.km, m.valor_passagem,
+               m.status, {TOTAL_VIAGEM_SQL}, p.nome, m.nome,
+               p.endereco_rua, p.endereco_numero, p.endereco_bairro,
+               p.endereco_cidade, p.endereco_estado, p.endereco_cep,
+               p.metodo_pagamento
+            FROM passageiros p
+            LEFT JOIN motoristas m ON m.id = %s
+            WHERE p.id = %s'''
+
+INSERIR_VIAGEM_VALORES_SQL = '''
+        INSERT INTO viagens
+            (id_passageiro, id_motorista, nome_passageiro,
+             nome_motorista, endereco_rua, endereco_numero, endereco_bairro,
+             endereco_cidade, endereco_estado, endereco_cep, valor_por_km,
+             total_viagem, metodo_pagamento)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)'''
+
+
+def registrar_viagem_lancamentos(cursor, id_passageiro, id_motorista):
+    # Uma reserva por passageiro de cada vez: a trava vem antes de qualquer
+    # leitura, então a leitura consistente abaixo (a primeira da transação)
+    # já enxerga os lançamentos de quem reservou antes. Sem ela, reservas
+    # do mesmo passageiro inseriam e depois disputavam a mesma faixa de
+    # lançamentos, sempre em deadlock. Motorista e lançamentos seguem sem
+    # trava: o crédito do motorista é só um INSERT.
+    cursor.execute('SELECT id FROM passageiros WHERE id = %s FOR UPDATE',
+                   (id_passageiro,))
+    cursor.fetchall()
+
+    cursor.execute(RESERVA_LANCAMENTOS_SQL, (id_motorista, id_passageiro))
+    linha = cursor.fetchone()
+
+    if (not linha or linha[3] != 'ativo' or linha[4] <= 0
+            or linha[0] < linha[4]):
+        return None, avaliar_reserva(linha[:5] if linha else None)
+
+    total = linha[4]
+    nome_passageiro, nome_motorista, *endereco, metodo = linha[5:]
+
+    cursor.execute(INSERIR_VIAGEM_VALORES_SQL,
+                   (id_passageiro, id_motorista, nome_passageiro,
+                    nome_motorista, *endereco, linha[2], total, metodo))
+    novo_id = cursor.lastrowid
+
+    lancar(cursor, f'viagem:{novo_id}', 'reserva',
+           [('passageiro', id_passageiro, -total),
+            ('motorista', id_motorista, total)])
+
+    return novo_id, None
+
+
+def reserva_sql(creditar=True):
+    # Sem crédito, só o saldo do passageiro sai: é a reserva em duas fases,
+    # que credita o motorista na liquidação.
+    credito = ('' if not creditar or config.GANHOS_ADIADOS
+               else CREDITO_MOTORISTA_SQL)
+
+    return f'''
+        UPDATE passageiros p
+            STRAIGHT_JOIN motoristas m ON m.id = %s
+            SET p.saldo = p.saldo - {TOTAL_VIAGEM_SQL}{credito}
+            WHERE p.id = %s
+              AND m.status = 'ativo'
+              AND {TOTAL_VIAGEM_SQL} > 0
+              AND p.saldo >= {TOTAL_VIAGEM_SQL}'''
+
+
+def registrar_viagem(cursor, id_passageiro, id_motorista):
+    if config.SALDOS_LANCAMENTOS:
+        return registrar_viagem_lancamentos(
+            cursor, id_passageiro, id_motorista)
+
+    cursor.execute(reserva_sql(), (id_motorista, id_passageiro))
+
+    if cursor.rowcount == 0:
+        return None, diagnosticar_reserva(cursor, id_passageiro, id_motorista)
+
+    cursor.execute(INSERIR_VIAGEM_SQL, (id_motorista, id_passageiro))
+    novo_id = cursor.lastrowid
+
+    if config.GANHOS_ADIADOS:
+        registrar_ganho(cursor, novo_id)
+
+    return novo_id, None
+
+
+def reservar_saldo(cursor, id_passageiro, id_motorista):
+    cursor.execute(reserva_sql(creditar=False),
+                   (id_motorista, id_passageiro))
+
+    if cursor.rowcount == 0:
+        return None, diagnosticar_reserva(cursor, id_passageiro, id_motorista)
+
+    return criar_reserva(
+        cursor, id_passageiro, id_motorista, TOTAL_VIAGEM_SQL), None
+
+
+def liquidar_reserva(cursor, id_reserva):
+    reserva = travar_reserva(cursor, id_reserva)
+
+    if not reserva:
+        return None, ('Reserva de saldo expirada!', 409)
+
+    id_passageiro, id_motorista, valor = reserva
+
+    # Passageiro em leitura consistente: o saldo já saiu na reserva, então
+    # a linha dele não é travada de novo. Só o motorista é lido com trava,
+    # porque pode ter sido suspenso depois da reserva; nesse caso a reserva
+    # continua de pé e quem chamou a libera.
+    trava = 'SHARE' if config.GANHOS_ADIADOS else 'UPDATE'
+    cursor.execute(f'''
+        SELECT p.nome, m.nome, p.endereco_rua, p.endereco_numero,
+               p.endereco_bairro, p.endereco_cidade, p.endereco_estado,
+               p.endereco_cep, m.valor_passagem, p.metodo_pagamento, m.status
+            FROM passageiros p
+            JOIN motoristas m ON m.id = %s
+            WHERE p.id = %s FOR {trava} OF m''', (id_motorista, id_passageiro))
+    linha = cursor.fetchone()
+
+    if not linha or linha[-1] != 'ativo':
+        return None, diagnosticar_reserva(cursor, id_passageiro, id_motorista)
+
+    nome_passageiro, nome_motorista, *endereco, valor_km, metodo, _ = linha
+    cursor.execute(INSERIR_VIAGEM_VALORES_SQL,
+                   (id_passageiro, id_motorista, nome_passageiro,
+                    nome_motorista, *endereco, valor_km, valor, metodo))
+
+    novo_id = cursor.lastrowid
+    remover_reserva(cursor, id_reserva)
+
+    if config.GANHOS_ADIADOS:
+        registrar_ganho(cursor, novo_id)
+    else:
+        cursor.execute(
+            'UPDATE motoristas SET quantia = quantia + %s WHERE id = %s',
+            (valor, id_motorista))
+
+    return novo_id, None
+
+
+def reservar_viagem(cursor, id_passageiro, id_motorista,
+                    pagamento_automatico=False, reserva=None):
+    if reserva is None:
+        novo_id, falha = registrar_viagem(cursor, id_passageiro, id_motorista)
+    else:
+        id_reserva, falha = reserva
+        if not falha:
+            novo_id, falha = liquidar_reserva(cursor, id_reserva)
+
+    if falha:
+        mensagem, status = falha
+        logger.warning(mensagem)
+        return jsonify({'erro': mensagem}), status
+
+    cache.invalidar('passageiros', id_passageiro)
+    cache.invalidar('motoristas', id_motorista)
+    eventos.publicar(cursor, eventos.VIAGEM_CRIADA, 'viagens', novo_id,
+                     id_passageiro=id_passageiro, id_motorista=id_motorista)
+
+    if pagamento_automatico:
+        enfileirar(cursor, novo_id)
+
+    logger.info(f'Viagem id={novo_id} adicionada com sucesso.')
+    return jsonify(corpo_reserva(novo_id, pagamento_automatico)), 201
+
+
+def corpo_reserva(novo_id, pagamento_automatico):
+    resposta = {
+        'mensagem': 'Viagem adicionada com sucesso!',
+        'id': novo_id
         }
 
-        faltando = [c for c in REGRAS if c not in dados or dados[c] is None]
+    if pagamento_automatico:
+        resposta['registro_pagamento'] = 'pendente'
 
-        if faltando:
-            logger.warning(f"Campos obrigatórios: {', '.join(faltando)}")
-            return jsonify({'erro': f"Campos obrigatórios: {', '.join(faltando)}"}), 400
+    return resposta
 
-        for campo, regra in REGRAS.items():
-            try:
-                valor = int(dados[campo])
 
-                if not regra(valor):
-                    raise ValueError
+def validar_reserva(dados):
+    REGRAS = {
+        'id_passageiro': lambda v: isinstance(v, int) and v > 0,
+        'id_motorista': lambda v: isinstance(v, int) and v > 0
+    }
 
-                dados[campo] = valor
+    faltando = [c for c in REGRAS if c not in dados or dados[c] is None]
 
-            except Exception:
-                logger.warning(
-                    f'Valor inválido para {campo}: {dados.get(campo)}')
-                return jsonify({'erro': f'Valor inválido para {campo}!'}), 400
+    if faltando:
+        raise ValueError(f"Campos obrigatórios: {', '.join(faltando)}")
 
-        with conexao() as cursor:
-            cursor.execute('''
-                SELECT nome, saldo, endereco_rua, endereco_numero,
-                       endereco_bairro, endereco_cidade, endereco_estado,
-                       endereco_cep, km, metodo_pagamento
-                    FROM passageiros WHERE id = %s FOR UPDATE''',
-                           (dados['id_passageiro'],))
-
-            passageiro = cursor.fetchone()
-            if not passageiro:
-                logger.warning(
-                    f"Passageiro {dados['id_passageiro']} não encontrado.")
-                return jsonify({'erro': 'Passageiro não encontrado!'}), 404
-
-            cursor.execute('''
-                SELECT nome, valor_passagem, status
-                    FROM motoristas WHERE id = %s''',
-                    (dados['id_motorista'],))
-            
-            motorista = cursor.fetchone()
-
-            if not motorista:
-                logger.warning(
-                    f"Motorista {dados['id_motorista']} não encontrado.")
-                return jsonify({'erro': 'Motorista não encontrado!'}), 404
-
-            try:
-                nome_passageiro = formatar_nome(passageiro[0])
-                nome_motorista = formatar_nome(motorista[0])
-                endereco_rua = str(passageiro[2]).strip()
-                endereco_numero = str(passageiro[3])
-                endereco_bairro = str(passageiro[4])
-                endereco_cidade = formatar_nome(passageiro[5])
-                endereco_estado = str(passageiro[6]).strip().upper()
-                endereco_cep = str(passageiro[7]).strip()
-                saldo = Decimal(str(passageiro[1])).quantize(Decimal('0.01'))
-                km = Decimal(str(passageiro[8])).quantize(Decimal('0.01'))
-                valor_passagem = Decimal(str(motorista[1])).quantize(Decimal('0.01'))
-                metodo_pagamento = str(passageiro[9]).strip().lower()
-                status_moto = str(motorista[2]).strip().lower()
-            except (ValueError, TypeError, InvalidOperation) as erro:
-                logger.warning(f'Erro ao coletar dados em banco: {str(erro)}')
-                return jsonify({'erro': 'Erro ao coletar dados em banco SQL!'}), 400
-
-            if valor_passagem <= 0:
-                logger.warning(f'Valor da passagem não pode ser negativo.')
-                return jsonify({'erro': 'Valor da passagem não pode ser negativo!'}), 400
-
-            if km <= 0:
-                logger.warning(f'Km deve ser positivo.')
-                return jsonify({'erro': 'Km deve ser positivo!'}), 400
-
-            if status_moto != 'ativo':
-                logger.warning(
-                    f'Motorista suspenso ou bloqueado não pode fazer viagens.')
-                return jsonify(
-                    {'erro': 'Motorista suspenso ou bloqueado não pode fazer viagens!'}), 409
-
-            total_viagem = (valor_passagem * km).quantize(Decimal('0.01'))
-
-            if saldo < total_viagem:
-                logger.warning('Saldo insuficiente.')
-                return jsonify({'erro': 'Saldo insuficiente!'}), 400
-
-            cursor.execute('UPDATE passageiros SET saldo = saldo - %s WHERE id = %s',
-                           (total_viagem, dados['id_passageiro']))
-
-            cursor.execute('UPDATE motoristas SET quantia = quantia + %s WHERE id = %s',
-                           (total_viagem, dados['id_motorista']))
-
-            cursor.execute('''
-                    INSERT INTO viagens 
-                        (id_passageiro, id_motorista, nome_passageiro,
-                         nome_motorista, endereco_rua, endereco_numero, endereco_bairro,
-                         endereco_cidade, endereco_estado, endereco_cep, valor_por_km,
-                         total_viagem, metodo_pagamento) 
-                         VALUES (%s, %s, %s, %s, %s, %s, %s,
-                                 %s, %s, %s, %s, %s, %s)
-                    ''', (dados['id_passageiro'], dados['id_motorista'], nome_passageiro,
-                          nome_motorista, endereco_rua, endereco_numero, endereco_bairro,
-                          endereco_cidade, endereco_estado, endereco_cep, valor_passagem,
-                          total_viagem, metodo_pagamento))
-            
-            novo_id = cursor.lastrowid
+    for campo, regra in REGRAS.items():
+        try:
+            valor = int(dados[campo])
+
+            if not regra(valor):
+                raise ValueError
+
+            dados[campo] = valor
+
+        except Exception:
+            raise ValueError(f'Valor inválido para {campo}!')
+
+    pagamento_automatico = dados.get(
+        'registrar_pagamento', config.PAGAMENTO_AUTOMATICO)
+
+    if not isinstance(pagamento_automatico, bool):
+        raise ValueError('Valor inválido para registrar_pagamento!')
+
+    return dados['id_passageiro'], dados['id_motorista'], pagamento_automatico
 
-            logger.info(f'Viagem id={novo_id} adicionada com sucesso.')
-            return jsonify({
-                'mensagem': 'Viagem adicionada com sucesso!',
-                'id': novo_id
-                }), 201
 
+@viagens_bp.route('/', methods=['POST'])
+@limiter.limit('100 per hour')
+@rota_protegida
+def adicionar_viagem():
+    try:
+        logger.info('Adicionando viagem...')
+
+        try:
+            chave = ler_chave()
+        except ValueError as erro:
+            logger.warning(f'Chave de idempotência inválida: {str(erro)}')
+            return jsonify({'erro': str(erro)}), 400
+
+        dados = validar_json()
+
+        try:
+            id_passageiro, id_motorista, pagamento_automatico = \
+                validar_reserva(dados)
+        except ValueError as erro:
+            logger.warning(str(erro))
+            return jsonify({'erro': str(erro)}), 400
+
+        if not em_duas_fases():
+            return executar_idempotente(
+                chave, reservar_viagem,
+                id_passageiro, id_motorista, pagamento_automatico)
+
+        # Chave já respondida: repete sem segurar saldo de ninguém.
+        repetida = resposta_salva(chave)
+        if repetida is not None:
+            return repetida
+
+        reserva = executar_transacao(
+            reservar_saldo, id_passageiro, id_motorista)
+        cache.invalidar('passageiros', id_passageiro)
+
+        liquidada = False
+        try:
+            resposta = make_response(executar_idempotente(
+                chave, reservar_viagem,
+                id_passageiro, id_motorista, pagamento_automatico, reserva))
+            liquidada = (resposta.status_code == 201
+                         and CABECALHO_REPETIDA not in resposta.headers)
+            return resposta
+        finally:
+            # Liquidada, a reserva já saiu na mesma transação da viagem; só
+            # falhas e repetições concorrentes precisam devolver o saldo.
+            if reserva[0] is not None and not liquidada:
+                executar_transacao(liberar_reserva, reserva[0])
+
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado ao adicionar viagem: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado ao adicionar viagem!'}), 500
@@ -250,7 +505,8 @@ def cancelar_viagem(id):
 
         with conexao() as cursor:
             cursor.execute(
-                '''SELECT status FROM viagens WHERE id = %s''',
+                '''SELECT status, id_passageiro, id_motorista
+                        FROM viagens WHERE id = %s''',
                   (id,))
             viagem = cursor.fetchone()
 
@@ -261,14 +517,20 @@ def cancelar_viagem(id):
             cursor.execute("UPDATE viagens SET status = 'cancelada'"\
                     "WHERE id = %s AND status != 'cancelada'",
                     (id,))
+            cache.invalidar('viagens', id)
             
             if cursor.rowcount == 0:
                 logger.warning(f'Viagem já foi cancelada.')
                 return jsonify({'erro': 'Viagem já está cancelada!'}), 409
 
+            eventos.publicar(cursor, eventos.VIAGEM_CANCELADA, 'viagens', id,
+                             id_passageiro=viagem[1], id_motorista=viagem[2])
+
             logger.info('Viagem cancelada com sucesso!')
             return '', 204
 
+    except errors.PoolError:
+        raise
     except Exception as erro:
         logger.error(f'Erro inesperado ao atualizar viagem: {str(erro)}')
         return jsonify({'erro': 'Erro inesperado ao atualizar viagem!'}), 500
\ No newline at end of file
@@ -0,0 +1,94 @@
+from flask.json.provider import DefaultJSONProvider
+from functools import lru_cache
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from uuid import UUID
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+@lru_cache(maxsize=256)
+def compilar_mapeador(colunas):
+    # dict(zip()) roda em C e fica no mesmo patamar do literal gerado, sem
+    # precisar montar código a partir dos nomes das colunas.
+    def mapear(linha):
+        return dict(zip(colunas, linha))
+
+    return mapear
+
+
+def mapeador_do_cursor(cursor):
+    return compilar_mapeador(tuple(d[0] for d in cursor.description))
+
+
+_DIAS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MESES = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+          'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def data_http(valor):
+    if isinstance(valor, datetime):
+        if valor.tzinfo is not None:
+            valor = valor.astimezone(timezone.utc)
+        hora = f'{valor.hour:02d}:{valor.minute:02d}:{valor.second:02d}'
+    else:
+        hora = '00:00:00'
+
+    return (f'{_DIAS[valor.weekday()]}, {valor.day:02d} '
+            f'{_MESES[valor.month - 1]} {valor.year:04d} {hora} GMT')
+
+
+def _padrao(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+
+    if isinstance(obj, date):
+        return data_http(obj)
+
+    if isinstance(obj, UUID):
+        return str(obj)
+
+    raise TypeError(f'Objeto do tipo {type(obj).__name__} não é serializável')
+
+
+class ProvedorJSONRapido(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+
+        opcoes = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+        # response()/jsonify sempre passam separators compactos, ou indent=2
+        # em debug. O orjson já gera a saída compacta e indenta com 2
+        # espaços; só argumentos que ele não cobre caem no encoder padrão.
+        restantes = dict(kwargs)
+        if restantes.get('separators') == (',', ':'):
+            del restantes['separators']
+        if restantes.get('indent') == 2:
+            del restantes['indent']
+            opcoes |= orjson.OPT_INDENT_2
+
+        if restantes:
+            return super().dumps(obj, **kwargs)
+
+        if self.sort_keys:
+            opcoes |= orjson.OPT_SORT_KEYS
+
+        return orjson.dumps(obj, default=_padrao, option=opcoes).decode()
+
+
+def serializar(obj):
+    if orjson is None:
+        return json.dumps(obj, default=_padrao).encode()
+
+    return orjson.dumps(
+        obj, default=_padrao,
+        option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+
+
+def register_json(app):
+    app.json = ProvedorJSONRapido(app)
@@ -0,0 +1,346 @@
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+from app import (create_api1,
+                  create_api2,
+                   create_api3,
+                    create_api4,
+                     create_api_unica,
+                      inicializar_app)
+from app.database import inicializador_banco
+from app.log import configurar_logging, encerrar_logging
+from app import config
+import threading
+import argparse
+import logging
+import random
+import signal
+import socket
+import time
+import os
+
+
+logger = logging.getLogger(__name__)
+
+
+APIS = {
+    'api1': (create_api1, 5001),
+    'api2': (create_api2, 5002),
+    'api3': (create_api3, 5003),
+    'api4': (create_api4, 5004),
+    'unica': (create_api_unica, 5000)
+}
+
+PADRAO = ('api1', 'api2', 'api3', 'api4')
+
+ESPERA_REINICIO_MAX = 30.0
+VIDA_MINIMA = 1.0
+
+
+class _Requisicao(WSGIRequestHandler):
+    # Sem keep-alive: uma conexão ociosa não pode prender uma das threads.
+    protocol_version = 'HTTP/1.0'
+
+
+class ServidorTrabalhador(BaseWSGIServer):
+    multithread = True
+    multiprocess = True
+
+    def __init__(self, host, porta, app, fd, threads=8, max_requisicoes=0):
+        if threads < 1:
+            raise ValueError('Número de threads inválido!')
+
+        super().__init__(host, porta, app, handler=_Requisicao, fd=fd)
+
+        self.max_requisicoes = max_requisicoes
+        self.atendidas = 0
+        self._vagas = threading.BoundedSemaphore(threads)
+        self._executor = ThreadPoolExecutor(
+            threads, thread_name_prefix='requisicao')
+        self._encerrando = threading.Event()
+
+    def get_request(self):
+        # Só aceita uma conexão quando há thread livre; as demais ficam
+        # na fila do socket para outro processo aceitar.
+        self._vagas.acquire()
+        try:
+            return super().get_request()
+        except BaseException:
+            self._vagas.release()
+            raise
+
+    def process_request(self, requisicao, endereco):
+        self.atendidas += 1
+        self._executor.submit(self._atender, requisicao, endereco)
+
+        if self.max_requisicoes and self.atendidas >= self.max_requisicoes:
+            logger.info(
+                f'Trabalhador pid={os.getpid()} atingiu {self.atendidas} '
+                f'requisições, reciclando.')
+            self.encerrar()
+
+    def _atender(self, requisicao, endereco):
+        try:
+            self.finish_request(requisicao, endereco)
+        except Exception:
+            self.handle_error(requisicao, endereco)
+        finally:
+            self.shutdown_request(requisicao)
+            self._vagas.release()
+
+    def encerrar(self):
+        if not self._encerrando.is_set():
+            self._encerrando.set()
+            threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def drenar(self):
+        self._executor.shutdown(wait=True)
+        self.server_close()
+
+
+def _abrir_socket(host, porta, reuseport):
+    familia = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(familia, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+    if reuseport:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+
+    sock.bind((host, porta))
+    sock.listen(config.SERVIDOR_BACKLOG)
+    # Vários processos esperam no mesmo socket; quem perder o accept volta
+    # ao laço em vez de ficar bloqueado.
+    sock.setblocking(False)
+    return sock
+
+
+def _executar_trabalhador(nome, host, porta, sock, threads, max_requisicoes):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    fabrica, _ = APIS[nome]
+    # Sobe banco, pool e threads de fundo antes de aceitar conexões, para a
+    # primeira requisição de cada trabalhador não pagar a inicialização.
+    app = inicializar_app(fabrica())
+
+    servidor = ServidorTrabalhador(
+        host, porta, app, sock.fileno(), threads, max_requisicoes)
+
+    signal.signal(signal.SIGTERM, lambda *_: servidor.encerrar())
+
+    logger.info(
+        f'Trabalhador {nome} pid={os.getpid()} atendendo em '
+        f'{host}:{porta} ({threads} threads).')
+
+    servidor.serve_forever()
+    servidor.drenar()
+
+    logger.info(
+        f'Trabalhador {nome} pid={os.getpid()} encerrado após '
+        f'{servidor.atendidas} requisições.')
+
+
+class Supervisor:
+    def __init__(self, apis, host='127.0.0.1', workers=None, threads=None,
+                 max_requisicoes=0, variacao_requisicoes=0,
+                 tempo_drenagem=30.0, reuseport=False):
+        if not apis:
+            raise ValueError('Nenhuma API informada!')
+
+        self.apis = apis
+        self.host = host
+        self.workers = workers or {}
+        self.threads = threads or {}
+        self.max_requisicoes = max_requisicoes
+        self.variacao_requisicoes = variacao_requisicoes
+        self.tempo_drenagem = tempo_drenagem
+        self.reuseport = reuseport and hasattr(socket, 'SO_REUSEPORT')
+
+        self._sockets = {}
+        self._filhos = {}
+        self._falhas = {}
+        self._reinicios = {}
+        self._encerrar = False
+
+    def _limite_requisicoes(self):
+        if not self.max_requisicoes:
+            return 0
+
+        return self.max_requisicoes + random.randint(
+            0, self.variacao_requisicoes)
+
+    def _socket(self, nome, vaga):
+        # O supervisor é dono de todos os sockets e os mantém abertos entre
+        # reciclagens. Com SO_REUSEPORT cada vaga tem a própria fila de
+        # accept; se o trabalhador a fechasse ao sair, o kernel resetaria
+        # as conexões ainda na fila. Assim o substituto herda a mesma fila.
+        chave = (nome, vaga) if self.reuseport else nome
+
+        if chave not in self._sockets:
+            _, porta = APIS[nome]
+            self._sockets[chave] = _abrir_socket(
+                self.host, porta, reuseport=self.reuseport)
+
+        return self._sockets[chave]
+
+    def _iniciar_filho(self, nome, vaga):
+        _, porta = APIS[nome]
+        sock = self._socket(nome, vaga)
+        pid = os.fork()
+
+        if pid == 0:
+            codigo = 0
+            try:
+                _executar_trabalhador(
+                    nome, self.host, porta, sock,
+                    self.threads.get(nome, 8),
+                    self._limite_requisicoes())
+            except BaseException as erro:
+                logger.error(
+                    f'Erro no trabalhador {nome} pid={os.getpid()}: {str(erro)}')
+                codigo = 1
+            finally:
+                encerrar_logging()
+                logging.shutdown()
+                os._exit(codigo)
+
+        self._filhos[pid] = (nome, vaga, time.monotonic())
+
+    def _sinal_encerrar(self, sinal, _):
+        if not self._encerrar:
+            logger.info(f'Sinal {sinal} recebido, drenando trabalhadores...')
+        self._encerrar = True
+
+    def _recolher(self):
+        while self._filhos:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+            nome, vaga, inicio = self._filhos.pop(pid)
+            if self._encerrar:
+                continue
+
+            if time.monotonic() - inicio < VIDA_MINIMA:
+                self._falhas[nome] = self._falhas.get(nome, 0) + 1
+                espera = min(ESPERA_REINICIO_MAX, 2 ** self._falhas[nome])
+                logger.error(
+                    f'Trabalhador {nome} pid={pid} terminou logo após iniciar '
+                    f'(status={status}), reiniciando em {espera}s.')
+                # Sem dormir aqui: o laço principal segue recolhendo as
+                # outras APIs e atendendo o SIGTERM enquanto o prazo corre.
+                self._reinicios[(nome, vaga)] = time.monotonic() + espera
+            else:
+                self._falhas[nome] = 0
+                logger.info(f'Trabalhador {nome} pid={pid} saiu, substituindo.')
+                self._iniciar_filho(nome, vaga)
+
+    def _reiniciar_pendentes(self):
+        agora = time.monotonic()
+
+        for (nome, vaga), prazo in list(self._reinicios.items()):
+            if prazo <= agora and not self._encerrar:
+                del self._reinicios[(nome, vaga)]
+                self._iniciar_filho(nome, vaga)
+
+    def _drenar(self):
+        for pid in list(self._filhos):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        limite = time.monotonic() + self.tempo_drenagem
+        while self._filhos and time.monotonic() < limite:
+            self._recolher()
+            time.sleep(0.1)
+
+        for pid, (nome, _, _) in list(self._filhos.items()):
+            logger.warning(
+                f'Trabalhador {nome} pid={pid} não drenou em '
+                f'{self.tempo_drenagem}s, finalizando.')
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+            del self._filhos[pid]
+
+    def executar(self):
+        signal.signal(signal.SIGTERM, self._sinal_encerrar)
+        signal.signal(signal.SIGINT, self._sinal_encerrar)
+
+        # Migra antes do fork para os trabalhadores não disputarem o schema.
+        inicializador_banco()
+
+        for nome in self.apis:
+            for vaga in range(self.workers.get(nome, 1)):
+                self._iniciar_filho(nome, vaga)
+
+        logger.info(
+            f'Supervisor pid={os.getpid()} com {len(self._filhos)} '
+            f'trabalhadores.')
+
+        while not self._encerrar:
+            self._recolher()
+            self._reiniciar_pendentes()
+            time.sleep(0.2)
+
+        self._drenar()
+
+        for sock in self._sockets.values():
+            sock.close()
+
+        logger.info('Supervisor encerrado.')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m app.servidor',
+        description='Executa as APIs em processos trabalhadores pré-criados.')
+    parser.add_argument('apis', nargs='*', metavar='api',
+                        help=f"APIs a executar: {', '.join(APIS)} "
+                             f"(padrão: {' '.join(PADRAO)})")
+    parser.add_argument('--host', default=config.SERVIDOR_HOST)
+    parser.add_argument('--workers', type=int,
+                        help='Processos por API (padrão: SERVIDOR_WORKERS)')
+    parser.add_argument('--threads', type=int,
+                        help='Threads por processo (padrão: SERVIDOR_THREADS)')
+
+    args = parser.parse_args(argv)
+    apis = args.apis or list(PADRAO)
+
+    configurar_logging()
+
+    invalidas = [a for a in apis if a not in APIS]
+    if invalidas:
+        parser.error(f"APIs desconhecidas: {', '.join(invalidas)}")
+
+    workers = {nome: args.workers or config.por_api(
+                   'SERVIDOR_WORKERS', nome, config.SERVIDOR_WORKERS)
+               for nome in apis}
+
+    if (config.LIMITES_STORAGE_URI.startswith('memory://')
+            and max(workers.values()) > 1):
+        logger.warning(
+            'LIMITES_STORAGE_URI em memória: limites de requisição e '
+            'bloqueio de login valem por trabalhador, não por API.')
+
+    Supervisor(
+        apis,
+        host=args.host,
+        workers=workers,
+        threads={nome: args.threads or config.por_api(
+                    'SERVIDOR_THREADS', nome, config.SERVIDOR_THREADS)
+                 for nome in apis},
+        max_requisicoes=config.SERVIDOR_MAX_REQUISICOES,
+        variacao_requisicoes=config.SERVIDOR_VARIACAO_REQUISICOES,
+        tempo_drenagem=config.SERVIDOR_TEMPO_DRENAGEM,
+        reuseport=config.SERVIDOR_REUSEPORT
+    ).executar()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+from flask import Response, current_app, request, stream_with_context
+from app.pool import obter_pool
+from app.serializacao import mapeador_do_cursor
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+TAMANHO_LOTE = 500
+
+
+def ler_streaming():
+    valor = request.args.get('stream', '').strip().lower()
+    return valor in ('1', 'true', 'sim')
+
+
+def resposta_streaming(sql, parametros, tamanho_lote=TAMANHO_LOTE):
+    json = current_app.json
+
+    def gerar():
+        total = 0
+        limpa = False
+        pool = item = None
+        yield '['
+
+        try:
+            pool = obter_pool()
+            item = pool.obter()
+            cursor = item.con.cursor(dictionary=False)
+            cursor.execute(sql, parametros)
+            mapear = mapeador_do_cursor(cursor)
+
+            while True:
+                linhas = cursor.fetchmany(tamanho_lote)
+                if not linhas:
+                    break
+
+                pedaco = ','.join(
+                    json.dumps(mapear(linha)) for linha in linhas)
+
+                yield (',' if total else '') + pedaco
+                total += len(linhas)
+
+            cursor.close()
+            item.con.commit()
+            limpa = True
+
+        except Exception as erro:
+            logger.error(
+                f'Erro durante streaming após {total} linhas: {str(erro)}')
+
+            # O status 200 já foi enviado: o último elemento avisa o cliente
+            # de que a lista veio truncada.
+            yield (',' if total else '') + json.dumps(
+                {'erro': 'Listagem interrompida!', 'linhas': total})
+
+        finally:
+            # Cliente desconectado (GeneratorExit) ou erro no meio: pode haver
+            # linhas não lidas no cursor, então a conexão é descartada em vez
+            # de voltar suja ao pool.
+            if item is not None:
+                pool.devolver(item, descartar=not limpa)
+
+        yield ']'
+        if limpa:
+            logger.info(f'Streaming concluído com {total} linhas.')
+
+    return Response(stream_with_context(gerar()),
+                    mimetype='application/json')
@@ -1,10 +1,8 @@
 from flask import jsonify, request
-from app.log import configurar_logging
 from werkzeug.exceptions import BadRequest
 import logging
 
 
-configurar_logging()
 logger = logging.getLogger(__name__)
 
 
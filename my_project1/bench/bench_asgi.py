@@ -0,0 +1,153 @@
+from app.auth import gerar_tokens
+from app.database import conexao, inicializador_banco
+from app import config
+from bench.bench_reserva import preparar, limpar, percentil
+from urllib.parse import urlsplit
+import argparse
+import asyncio
+import random
+import uuid
+import json
+import time
+
+
+async def requisitar(host, porta, metodo, caminho, corpo, token, chave=None):
+    conteudo = json.dumps(corpo).encode() if corpo is not None else b''
+    idempotencia = f'Idempotency-Key: {chave}\r\n' if chave else ''
+    cabecalho = (
+        f'{metodo} {caminho} HTTP/1.0\r\n'
+        f'Host: {host}:{porta}\r\n'
+        f'Authorization: Bearer {token}\r\n'
+        f'{idempotencia}'
+        f'Content-Type: application/json\r\n'
+        f'Content-Length: {len(conteudo)}\r\n\r\n').encode()
+
+    leitor, escritor = await asyncio.open_connection(host, porta)
+    try:
+        escritor.write(cabecalho + conteudo)
+        await escritor.drain()
+        resposta = await leitor.read()
+    finally:
+        escritor.close()
+
+    return int(resposta.split(b' ', 2)[1])
+
+
+async def cliente(alvo, cenario, ids, token, fim, latencias, status,
+                  idempotencia):
+    host, porta = alvo
+    ids_passageiros, ids_motoristas, ids_viagens = ids
+
+    while time.perf_counter() < fim:
+        chave = None
+        if cenario == 'reserva':
+            metodo, caminho = 'POST', '/viagens/'
+            corpo = {'id_passageiro': random.choice(ids_passageiros),
+                     'id_motorista': random.choice(ids_motoristas)}
+            if idempotencia:
+                chave = uuid.uuid4().hex
+        else:
+            metodo, caminho = 'GET', f'/viagens/{random.choice(ids_viagens)}'
+            corpo = None
+
+        inicio = time.perf_counter()
+        try:
+            codigo = await requisitar(
+                host, porta, metodo, caminho, corpo, token, chave)
+        except OSError:
+            codigo = 'conexao'
+
+        latencias.append(time.perf_counter() - inicio)
+        status[codigo] = status.get(codigo, 0) + 1
+
+
+async def medir(nome, url, cenario, ids, token, clientes, duracao,
+                idempotencia):
+    partes = urlsplit(url)
+    alvo = (partes.hostname, partes.port)
+    latencias, status = [], {}
+
+    inicio = time.perf_counter()
+    fim = inicio + duracao
+    await asyncio.gather(*(
+        cliente(alvo, cenario, ids, token, fim, latencias, status,
+                idempotencia)
+        for _ in range(clientes)))
+    total = time.perf_counter() - inicio
+
+    erros = sum(v for k, v in status.items()
+                if not isinstance(k, int) or k >= 500)
+    print(f'{nome:<6} {len(latencias) / total:8.1f} req/s  '
+          f'p50={percentil(latencias, 0.50) * 1000:8.2f}ms  '
+          f'p99={percentil(latencias, 0.99) * 1000:8.2f}ms  '
+          f'erros={erros}  status={status}')
+
+
+async def aquecer_viagens(url, ids_passageiros, ids_motoristas, token):
+    partes = urlsplit(url)
+
+    for id_passageiro in ids_passageiros:
+        await requisitar(
+            partes.hostname, partes.port, 'POST', '/viagens/',
+            {'id_passageiro': id_passageiro,
+             'id_motorista': random.choice(ids_motoristas)}, token)
+
+    marcadores = ', '.join(['%s'] * len(ids_passageiros))
+    with conexao() as cursor:
+        cursor.execute(
+            f'SELECT id FROM viagens WHERE id_passageiro IN ({marcadores})',
+            ids_passageiros)
+        return [v[0] for v in cursor.fetchall()]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compara a API de viagens em Flask (app.servidor api3) '
+                    'com a API assíncrona (app.asgi). Suba os dois '
+                    'servidores com LIMITES_HABILITADOS=0 antes de rodar. '
+                    'Use um banco descartável.')
+    parser.add_argument('--flask', default='http://127.0.0.1:5003')
+    parser.add_argument('--asgi', default='http://127.0.0.1:5005')
+    parser.add_argument('--cenario', choices=('reserva', 'busca'),
+                        default='reserva')
+    parser.add_argument('--clientes', type=int, default=1000)
+    parser.add_argument('--duracao', type=float, default=30)
+    parser.add_argument('--passageiros', type=int, default=200)
+    parser.add_argument('--motoristas', type=int, default=20)
+    parser.add_argument('--idempotencia', action='store_true',
+                        help='Envia uma Idempotency-Key nova em cada reserva.')
+    args = parser.parse_args()
+
+    # A API assíncrona só cobre o modo de saldo direto; com lançamentos ou
+    # reserva em duas fases ela nem sobe, então não há o que comparar.
+    if config.SALDOS_LANCAMENTOS or config.RESERVA_DUAS_FASES:
+        parser.error('SALDOS_LANCAMENTOS e RESERVA_DUAS_FASES ficam fora do '
+                     'escopo da API assíncrona; desligue-os para comparar.')
+
+    print(f'cenário={args.cenario}  idempotencia='
+          f'{"sim" if args.idempotencia else "não"}  '
+          f'ganhos_adiados={"sim" if config.GANHOS_ADIADOS else "não"}  '
+          f'modo=saldo direto')
+
+    inicializador_banco()
+    token = gerar_tokens(1)[0]['access_token']
+    ids_passageiros, ids_motoristas = preparar(
+        args.passageiros, args.motoristas)
+
+    try:
+        ids_viagens = []
+        if args.cenario == 'busca':
+            ids_viagens = asyncio.run(aquecer_viagens(
+                args.flask, ids_passageiros, ids_motoristas, token))
+
+        ids = (ids_passageiros, ids_motoristas, ids_viagens)
+        for nome, url in (('flask', args.flask), ('asgi', args.asgi)):
+            asyncio.run(medir(nome, url, args.cenario, ids, token,
+                              args.clientes, args.duracao,
+                              args.idempotencia))
+    finally:
+        limpar(ids_passageiros, ids_motoristas)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import statistics
+import subprocess
+import argparse
+import json
+import time
+import sys
+
+
+FASES = ('importacao', 'fabrica', 'primeira', 'segunda')
+
+
+def medir(nome):
+    # Roda num processo novo: nada pode estar importado nem inicializado.
+    tempos = {}
+
+    inicio = time.perf_counter()
+    if nome == 'legado':
+        import main
+        tempos['importacao'] = time.perf_counter() - inicio
+
+        app, caminho = main.app1, '/passageiros'
+        tempos['fabrica'] = 0.0
+    else:
+        from app.servidor import APIS
+        tempos['importacao'] = time.perf_counter() - inicio
+
+        fabrica, _ = APIS[nome]
+        inicio = time.perf_counter()
+        app, caminho = fabrica(), '/metricas'
+        tempos['fabrica'] = time.perf_counter() - inicio
+
+    from app.auth import gerar_tokens
+    token = gerar_tokens(1)[0]['access_token']
+    cabecalhos = {'Authorization': f'Bearer {token}'}
+    cliente = app.test_client()
+
+    for fase in ('primeira', 'segunda'):
+        inicio = time.perf_counter()
+        resposta = cliente.get(caminho, headers=cabecalhos)
+        tempos[fase] = time.perf_counter() - inicio
+
+        if resposta.status_code >= 500:
+            raise RuntimeError(
+                f'{nome} respondeu {resposta.status_code} em {caminho}')
+
+    print(json.dumps(tempos))
+
+
+def executar(nome, repeticoes):
+    amostras = {fase: [] for fase in FASES}
+
+    for _ in range(repeticoes):
+        saida = subprocess.run(
+            [sys.executable, '-W', 'ignore', '-m',
+             'bench.bench_inicializacao', '--medir', nome],
+            check=True, capture_output=True, text=True).stdout
+        tempos = json.loads(saida.strip().splitlines()[-1])
+
+        for fase in FASES:
+            amostras[fase].append(tempos[fase])
+
+    colunas = '  '.join(
+        f'{fase}={statistics.median(amostras[fase]) * 1000:8.2f}ms'
+        for fase in FASES)
+    print(f'{nome:<7} {colunas}')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Mede, em processos novos, o tempo de importação, de '
+                    'criação do app e das duas primeiras requisições (a '
+                    'primeira inclui a inicialização preguiçosa do banco, '
+                    'do pool e das threads de fundo). Mostra a mediana.')
+    parser.add_argument('apis', nargs='*',
+                        default=['api1', 'api2', 'api3', 'api4', 'unica',
+                                 'legado'])
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--medir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        medir(args.medir)
+        return
+
+    for nome in args.apis:
+        executar(nome, args.repeticoes)
+
+
+if __name__ == '__main__':
+    main()
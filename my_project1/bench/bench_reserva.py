@@ -0,0 +1,173 @@
+from concurrent.futures import ThreadPoolExecutor
+from app.database import conexao, inicializador_banco
+from app.routes.trips import registrar_viagem
+from app.validation import formatar_nome
+from decimal import Decimal
+import argparse
+import random
+import time
+
+
+def reserva_legada(cursor, id_passageiro, id_motorista):
+    # Fluxo original de POST /viagens: leituras com trava, conta em Decimal e
+    # três escritas separadas.
+    cursor.execute('''
+        SELECT nome, saldo, endereco_rua, endereco_numero,
+               endereco_bairro, endereco_cidade, endereco_estado,
+               endereco_cep, km, metodo_pagamento
+            FROM passageiros WHERE id = %s FOR UPDATE''', (id_passageiro,))
+    passageiro = cursor.fetchone()
+    if not passageiro:
+        return None, ('Passageiro não encontrado!', 404)
+
+    cursor.execute('''
+        SELECT nome, valor_passagem, status
+            FROM motoristas WHERE id = %s''', (id_motorista,))
+    motorista = cursor.fetchone()
+    if not motorista:
+        return None, ('Motorista não encontrado!', 404)
+
+    nome_passageiro = formatar_nome(passageiro[0])
+    nome_motorista = formatar_nome(motorista[0])
+    endereco_rua = str(passageiro[2]).strip()
+    endereco_numero = str(passageiro[3])
+    endereco_bairro = str(passageiro[4])
+    endereco_cidade = formatar_nome(passageiro[5])
+    endereco_estado = str(passageiro[6]).strip().upper()
+    endereco_cep = str(passageiro[7]).strip()
+    saldo = Decimal(str(passageiro[1])).quantize(Decimal('0.01'))
+    km = Decimal(str(passageiro[8])).quantize(Decimal('0.01'))
+    valor_passagem = Decimal(str(motorista[1])).quantize(Decimal('0.01'))
+    metodo_pagamento = str(passageiro[9]).strip().lower()
+    status_moto = str(motorista[2]).strip().lower()
+
+    if valor_passagem <= 0:
+        return None, ('Valor da passagem não pode ser negativo!', 400)
+
+    if km <= 0:
+        return None, ('Km deve ser positivo!', 400)
+
+    if status_moto != 'ativo':
+        return None, (
+            'Motorista suspenso ou bloqueado não pode fazer viagens!', 409)
+
+    total_viagem = (valor_passagem * km).quantize(Decimal('0.01'))
+
+    if saldo < total_viagem:
+        return None, ('Saldo insuficiente!', 400)
+
+    cursor.execute('UPDATE passageiros SET saldo = saldo - %s WHERE id = %s',
+                   (total_viagem, id_passageiro))
+    cursor.execute('UPDATE motoristas SET quantia = quantia + %s WHERE id = %s',
+                   (total_viagem, id_motorista))
+    cursor.execute('''
+        INSERT INTO viagens
+            (id_passageiro, id_motorista, nome_passageiro,
+             nome_motorista, endereco_rua, endereco_numero, endereco_bairro,
+             endereco_cidade, endereco_estado, endereco_cep, valor_por_km,
+             total_viagem, metodo_pagamento)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)''',
+                   (id_passageiro, id_motorista, nome_passageiro,
+                    nome_motorista, endereco_rua, endereco_numero,
+                    endereco_bairro, endereco_cidade, endereco_estado,
+                    endereco_cep, valor_passagem, total_viagem,
+                    metodo_pagamento))
+    return cursor.lastrowid, None
+
+
+def preparar(passageiros, motoristas):
+    prefixo = random.randint(100, 999)
+    ids_passageiros, ids_motoristas = [], []
+
+    with conexao() as cursor:
+        for i in range(passageiros):
+            cursor.execute('''
+                INSERT INTO passageiros (
+                    nome, cpf, telefone, saldo, endereco_rua, endereco_numero,
+                    endereco_bairro, endereco_cidade, endereco_estado,
+                    endereco_cep, km, metodo_pagamento)
+                    VALUES ('Bench', %s, %s, 99999999, 'Rua A', '1', 'Centro',
+                            'Cidade', 'SP', '01000000', 5, 'pix')''',
+                           (f'{prefixo}{i:08d}', f'{prefixo}{i:08d}'))
+            ids_passageiros.append(cursor.lastrowid)
+
+        for i in range(motoristas):
+            cursor.execute('''
+                INSERT INTO motoristas (
+                    nome, cnh, telefone, categoria_cnh, placa,
+                    modelo_carro, ano_carro, valor_passagem)
+                    VALUES ('Bench', %s, %s, 'B', %s, 'Carro', 2020, 2.50)''',
+                           (f'{prefixo}{i:08d}', f'{prefixo}{i:08d}',
+                            f'B{prefixo}{i:03d}'))
+            ids_motoristas.append(cursor.lastrowid)
+
+    return ids_passageiros, ids_motoristas
+
+
+def limpar(ids_passageiros, ids_motoristas):
+    marcadores_p = ', '.join(['%s'] * len(ids_passageiros))
+    marcadores_m = ', '.join(['%s'] * len(ids_motoristas))
+
+    with conexao() as cursor:
+        cursor.execute(
+            f'DELETE FROM viagens WHERE id_passageiro IN ({marcadores_p})',
+            ids_passageiros)
+        cursor.execute(
+            f'DELETE FROM passageiros WHERE id IN ({marcadores_p})',
+            ids_passageiros)
+        cursor.execute(
+            f'DELETE FROM motoristas WHERE id IN ({marcadores_m})',
+            ids_motoristas)
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def executar(nome, reservar, ids_passageiros, ids_motoristas, reservas,
+             concorrencia):
+    def uma(_):
+        id_passageiro = random.choice(ids_passageiros)
+        id_motorista = random.choice(ids_motoristas)
+
+        inicio = time.perf_counter()
+        with conexao() as cursor:
+            reservar(cursor, id_passageiro, id_motorista)
+        return time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        latencias = list(executor.map(uma, range(reservas)))
+    duracao = time.perf_counter() - inicio
+
+    print(f'{nome:<10} {reservas / duracao:8.1f} reservas/s  '
+          f'p50={percentil(latencias, 0.50) * 1000:7.2f}ms  '
+          f'p99={percentil(latencias, 0.99) * 1000:7.2f}ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compara a reserva legada (5 comandos com FOR UPDATE) '
+                    'com registrar_viagem. Use um banco descartável.')
+    parser.add_argument('--reservas', type=int, default=2000)
+    parser.add_argument('--concorrencia', type=int, default=16)
+    parser.add_argument('--passageiros', type=int, default=20)
+    parser.add_argument('--motoristas', type=int, default=3)
+    args = parser.parse_args()
+
+    inicializador_banco()
+    ids_passageiros, ids_motoristas = preparar(
+        args.passageiros, args.motoristas)
+
+    try:
+        for nome, reservar in (('legada', reserva_legada),
+                               ('nova', registrar_viagem)):
+            executar(nome, reservar, ids_passageiros, ids_motoristas,
+                     args.reservas, args.concorrencia)
+    finally:
+        limpar(ids_passageiros, ids_motoristas)
+
+
+if __name__ == '__main__':
+    main()
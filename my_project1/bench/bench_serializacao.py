@@ -0,0 +1,81 @@
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from app.serializacao import ProvedorJSONRapido, compilar_mapeador, orjson
+from app.routes.trips import COLUNAS_VIAGEM
+from datetime import datetime
+from decimal import Decimal
+import timeit
+
+
+LINHAS = 10000
+REPETICOES = 5
+
+
+def linha_viagem(i):
+    agora = datetime(2024, 5, 17, 10, 30, 0)
+    return (i, 10, 20, 'Maria Souza', 'João Lima', 'Rua das Flores',
+            '120', 'Centro', 'São Paulo', 'SP', '01000000',
+            Decimal('2.50'), Decimal('31.25'), 'pix', 'confirmada',
+            agora, agora)
+
+
+def mapear_por_indice(v):
+    return {
+        'id': v[0],
+        'id_passageiro': v[1],
+        'id_motorista': v[2],
+        'nome_passageiro': v[3],
+        'nome_motorista': v[4],
+        'endereco_rua': v[5],
+        'endereco_numero': v[6],
+        'endereco_bairro': v[7],
+        'endereco_cidade': v[8],
+        'endereco_estado': v[9],
+        'endereco_cep': v[10],
+        'valor_por_km': v[11],
+        'total_viagem': v[12],
+        'metodo_pagamento': v[13],
+        'status': v[14],
+        'criado_em': v[15],
+        'atualizado_em': v[16]
+    }
+
+
+def medir(nome, funcao):
+    melhor = min(timeit.repeat(funcao, number=1, repeat=REPETICOES))
+    print(f'{nome:<40} {melhor * 1e6 / LINHAS:8.2f} µs/linha')
+    return melhor
+
+
+def main():
+    app = Flask('bench')
+    padrao = DefaultJSONProvider(app)
+    rapido = ProvedorJSONRapido(app)
+
+    linhas = [linha_viagem(i) for i in range(LINHAS)]
+    mapear = compilar_mapeador(COLUNAS_VIAGEM)
+
+    assert [mapear(v) for v in linhas[:10]] == \
+        [mapear_por_indice(v) for v in linhas[:10]]
+
+    print(f'{LINHAS} linhas de viagens (17 colunas), '
+          f'orjson={"sim" if orjson else "não"}')
+
+    medir('mapeamento por índice',
+          lambda: [mapear_por_indice(v) for v in linhas])
+    medir('mapeador em cache (dict(zip))',
+          lambda: [mapear(v) for v in linhas])
+
+    # response() é o caminho de jsonify nas rotas (com separators
+    # compactos), não o dumps() puro.
+    antes = medir('antes: índice + DefaultJSONProvider',
+                  lambda: padrao.response(
+                      [mapear_por_indice(v) for v in linhas]))
+    depois = medir('depois: mapeador + ProvedorJSONRapido',
+                   lambda: rapido.response([mapear(v) for v in linhas]))
+
+    print(f'ganho: {antes / depois:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
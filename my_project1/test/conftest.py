@@ -1,4 +1,8 @@
+import os
+os.environ.setdefault('DB_NOME', 'test')
+
 import pytest
+from app import cache
 from test.test_database import init_test_db, criar_tabelas, fake_conexao
 from main import (app1,
                    app2,
@@ -16,7 +20,16 @@ def limpar_banco():
         cursor.execute('DELETE FROM motoristas')
         cursor.execute('DELETE FROM viagens')
         cursor.execute('DELETE FROM registros_pagamento')
+        cursor.execute('DELETE FROM chaves_idempotencia')
+        cursor.execute('DELETE FROM outbox')
+        cursor.execute('DELETE FROM fila_pagamentos')
+        cursor.execute('DELETE FROM ganhos_pendentes')
+        cursor.execute('DELETE FROM lancamentos')
+        cursor.execute('DELETE FROM saldos_snapshot')
+        cursor.execute('DELETE FROM reservas_saldo')
         cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+
+    cache.limpar()
         
 
 
@@ -66,3 +79,78 @@ def db_conexao():
 @pytest.fixture
 def auth_headers():
     return {'Authorization': 'Bearer token_valido'}
+
+
+@pytest.fixture(scope='session')
+def api1():
+    from app import create_api1
+    api = create_api1()
+    api.config['TESTING'] = True
+    return api
+
+
+@pytest.fixture
+def client_api1(api1):
+    with api1.app_context():
+        with api1.test_client() as client:
+            yield client
+
+
+@pytest.fixture(scope='session')
+def api2():
+    from app import create_api2
+    api = create_api2()
+    api.config['TESTING'] = True
+    return api
+
+
+@pytest.fixture
+def client_api2(api2):
+    with api2.app_context():
+        with api2.test_client() as client:
+            yield client
+
+
+@pytest.fixture(scope='session')
+def api3():
+    from app import create_api3
+    api = create_api3()
+    api.config['TESTING'] = True
+    return api
+
+
+@pytest.fixture
+def client_api3(api3):
+    with api3.app_context():
+        with api3.test_client() as client:
+            yield client
+
+
+@pytest.fixture(scope='session')
+def api4():
+    from app import create_api4
+    api = create_api4()
+    api.config['TESTING'] = True
+    return api
+
+
+@pytest.fixture
+def client_api4(api4):
+    with api4.app_context():
+        with api4.test_client() as client:
+            yield client
+
+
+@pytest.fixture(scope='session')
+def api_unica():
+    from app import create_api_unica
+    api = create_api_unica()
+    api.config['TESTING'] = True
+    return api
+
+
+@pytest.fixture
+def client_api_unica(api_unica):
+    with api_unica.app_context():
+        with api_unica.test_client() as client:
+            yield client
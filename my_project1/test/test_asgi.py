@@ -0,0 +1,167 @@
+from unittest.mock import ANY, AsyncMock, patch
+from test.test_viagens import inserir_passageiro_e_motorista
+from test.test_database import fake_conexao
+from app.asgi import (create_api_asgi, abrir_pool, fechar_pool, ROTAS,
+                      LIMITE_ROTA)
+from app import create_api_unica
+from limits import parse
+import asyncio
+import json
+import pytest
+
+
+def chamar_com_cabecalhos(app, metodo, caminho, corpo=None, cabecalhos=None):
+    conteudo = json.dumps(corpo).encode() if corpo is not None else b''
+    cabecalhos = dict(cabecalhos or {})
+    if corpo is not None:
+        cabecalhos['Content-Type'] = 'application/json'
+
+    scope = {
+        'type': 'http',
+        'method': metodo,
+        'path': caminho,
+        'headers': [(k.lower().encode(), v.encode())
+                    for k, v in cabecalhos.items()]
+    }
+    enviadas = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': conteudo, 'more_body': False}
+
+    async def send(mensagem):
+        enviadas.append(mensagem)
+
+    asyncio.run(app(scope, receive, send))
+    return (enviadas[0]['status'], json.loads(enviadas[1]['body']),
+            dict(enviadas[0]['headers']))
+
+
+def chamar(app, metodo, caminho, corpo=None, cabecalhos=None):
+    return chamar_com_cabecalhos(app, metodo, caminho, corpo, cabecalhos)[:2]
+
+
+def test_asgi_sem_token():
+    status, corpo = chamar(create_api_asgi(), 'POST', '/viagens/', {})
+
+    assert status == 401
+    assert corpo == {'erro': 'Token não enviado!'}
+
+
+def test_asgi_rota_inexistente(auth_headers):
+    app = create_api_asgi()
+
+    assert chamar(app, 'GET', '/passageiros/1', None, auth_headers)[0] == 404
+    assert chamar(app, 'DELETE', '/viagens/1', None, auth_headers)[0] == 405
+
+
+def test_asgi_rejeita_chave_de_idempotencia_invalida(auth_headers):
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        status, corpo = chamar(
+            create_api_asgi(), 'POST', '/viagens/',
+            {'id_passageiro': 1, 'id_motorista': 1},
+            {**auth_headers, 'Idempotency-Key': 'com espaço'})
+
+    assert status == 400
+    assert 'Idempotency-Key' in corpo['erro']
+
+
+def test_asgi_limita_requisicoes_por_rota():
+    app = create_api_asgi()
+
+    with patch('app.asgi.LIMITE_ROTA', parse('1 per hour')), \
+         patch('app.asgi._limitador', None):
+        primeira, _ = chamar(app, 'GET', '/viagens/1')
+        segunda, corpo = chamar(app, 'GET', '/viagens/1')
+        outra_rota, _ = chamar(app, 'GET', '/registros-pagamento/1')
+
+    assert primeira == 401
+    assert segunda == 429
+    assert 'erro' in corpo
+    assert outra_rota == 401
+
+
+def test_asgi_limita_com_a_chave_do_flask_limiter():
+    # Mesmo IP e endpoint Flask: o contador é o mesmo das rotas síncronas.
+    endpoints = create_api_unica().view_functions
+
+    for _, _, funcao, endpoint, _ in ROTAS:
+        assert endpoint in endpoints
+        assert endpoint.endswith(f'.{funcao.__name__}')
+
+    limitador = AsyncMock()
+    limitador.hit.return_value = False
+
+    with patch('app.config.LIMITES_HABILITADOS', True), \
+         patch('app.asgi._limitador', limitador):
+        status, _ = chamar(create_api_asgi(), 'GET', '/viagens/1')
+
+    assert status == 429
+    limitador.hit.assert_awaited_once_with(
+        LIMITE_ROTA, ANY, 'viagens.buscar_viagem')
+
+
+def test_asgi_reserva_e_registra_pagamento(auth_headers):
+    pytest.importorskip('aiomysql')
+    id_passageiro, id_motorista = inserir_passageiro_e_motorista()
+    app = create_api_asgi()
+
+    asyncio.run(abrir_pool())
+    try:
+        with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+            status_viagem, viagem = chamar(
+                app, 'POST', '/viagens/',
+                {'id_passageiro': id_passageiro,
+                 'id_motorista': id_motorista}, auth_headers)
+            status_registro, registro = chamar(
+                app, 'POST', '/registros-pagamento/',
+                {'id_viagem': viagem['id']}, auth_headers)
+            status_busca, busca = chamar(
+                app, 'GET', f"/viagens/{viagem['id']}", None, auth_headers)
+            status_repetido, _ = chamar(
+                app, 'POST', '/registros-pagamento/',
+                {'id_viagem': viagem['id']}, auth_headers)
+    finally:
+        asyncio.run(fechar_pool())
+
+    assert status_viagem == 201
+    assert status_registro == 201
+    assert status_busca == 200
+    assert busca['total_viagem'] == '12.50'
+    assert status_repetido == 409
+
+    with fake_conexao() as cursor:
+        cursor.execute('SELECT saldo FROM passageiros WHERE id = %s',
+                       (id_passageiro,))
+        assert cursor.fetchone()[0] == 137.50
+
+
+def test_asgi_repete_resposta_idempotente(auth_headers):
+    pytest.importorskip('aiomysql')
+    id_passageiro, id_motorista = inserir_passageiro_e_motorista()
+    app = create_api_asgi()
+    cabecalhos = {**auth_headers, 'Idempotency-Key': 'asgi-1'}
+    corpo = {'id_passageiro': id_passageiro, 'id_motorista': id_motorista}
+
+    asyncio.run(abrir_pool())
+    try:
+        with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+            primeira = chamar_com_cabecalhos(
+                app, 'POST', '/viagens/', corpo, cabecalhos)
+            repetida = chamar_com_cabecalhos(
+                app, 'POST', '/viagens/', corpo, cabecalhos)
+            conflito = chamar_com_cabecalhos(
+                app, 'POST', '/viagens/', {**corpo, 'id_motorista': 0},
+                cabecalhos)
+    finally:
+        asyncio.run(fechar_pool())
+
+    assert primeira[0] == repetida[0] == 201
+    assert repetida[1] == primeira[1]
+    assert repetida[2][b'idempotent-replayed'] == b'true'
+    assert b'idempotent-replayed' not in primeira[2]
+    assert conflito[0] == 422
+
+    with fake_conexao() as cursor:
+        cursor.execute('SELECT saldo FROM passageiros WHERE id = %s',
+                       (id_passageiro,))
+        assert cursor.fetchone()[0] == 137.50
@@ -1,4 +1,5 @@
 from unittest.mock import patch
+from app import brute_force
 import bcrypt
 
 
@@ -109,3 +110,16 @@ def test_logout_integracao(client_app1):
     assert resp.status_code == 200
     assert 'mensagem' in resp.json
 
+
+
+def test_bloqueio_de_login_por_ip():
+    ip = '203.0.113.7'
+
+    for _ in range(brute_force.MAX_TENTATIVAS):
+        assert not brute_force.ip_bloqueado(ip)
+        brute_force.registrar_falha(ip)
+
+    assert brute_force.ip_bloqueado(ip)
+
+    brute_force.limpar_falhas(ip)
+    assert not brute_force.ip_bloqueado(ip)
@@ -0,0 +1,79 @@
+from unittest.mock import patch
+from app.cache import CacheLRU
+from app import cache
+import pytest
+
+
+def test_cache_lru_acerto_e_falha():
+    lru = CacheLRU(max_entradas=2, ttl=60)
+    lru.definir(('viagens', 1), {'id': 1})
+
+    assert lru.obter(('viagens', 1)) == {'id': 1}
+    assert lru.obter(('viagens', 2)) is None
+    assert lru.metricas()['acertos'] == 1
+    assert lru.metricas()['falhas'] == 1
+
+
+def test_cache_lru_despeja_menos_usada():
+    lru = CacheLRU(max_entradas=2, ttl=60)
+    lru.definir('a', 1)
+    lru.definir('b', 2)
+    lru.obter('a')
+    lru.definir('c', 3)
+
+    assert lru.obter('b') is None
+    assert lru.obter('a') == 1
+    assert lru.metricas()['despejadas'] == 1
+
+
+def test_cache_lru_expira_por_ttl():
+    lru = CacheLRU(max_entradas=2, ttl=0)
+    lru.definir('a', 1)
+
+    assert lru.obter('a') is None
+    assert lru.metricas()['expiradas'] == 1
+
+
+def test_cache_lru_tamanho_invalido():
+    with pytest.raises(ValueError):
+        CacheLRU(max_entradas=0)
+
+
+def test_invalidacao_descarta_leitura_em_andamento():
+    cache.definir_backend(CacheLRU(max_entradas=10, ttl=60))
+
+    marca = cache.marcar()
+    cache.invalidar('passageiros', 1)
+    cache.guardar('passageiros', 1, {'id': 1}, marca)
+
+    assert cache.ler('passageiros', 1) is None
+
+    cache.guardar('passageiros', 1, {'id': 1}, cache.marcar())
+    assert cache.ler('passageiros', 1) == {'id': 1}
+
+    cache.invalidar('passageiros', 1)
+    assert cache.ler('passageiros', 1) is None
+
+
+def test_invalidacao_de_outra_chave_nao_descarta_leitura():
+    cache.definir_backend(CacheLRU(max_entradas=10, ttl=60))
+
+    marca = cache.marcar()
+    cache.invalidar('passageiros', 2)
+    cache.invalidar('motoristas', 1)
+    cache.guardar('passageiros', 1, {'id': 1}, marca)
+
+    assert cache.ler('passageiros', 1) == {'id': 1}
+
+
+def test_invalidacao_despejada_continua_descartando_leitura():
+    cache.definir_backend(CacheLRU(max_entradas=10, ttl=60))
+
+    with patch('app.config.CACHE_MAX_ENTRADAS', 1):
+        marca = cache.marcar()
+        cache.invalidar('passageiros', 1)
+        cache.invalidar('passageiros', 2)
+        cache.guardar('passageiros', 1, {'id': 1}, marca)
+
+        assert len(cache._invalidadas) == 1
+        assert cache.ler('passageiros', 1) is None
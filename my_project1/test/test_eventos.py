@@ -0,0 +1,63 @@
+from app.eventos import Despachante
+from unittest.mock import patch, MagicMock
+from contextlib import contextmanager
+
+
+def linha(id, tipo='viagem.criada'):
+    return (id, tipo, 'viagens', id, None, None)
+
+
+def test_despachante_recupera_lacuna():
+    recebidos = []
+    despachante = Despachante(
+        assinantes={'viagem.criada': [lambda e: recebidos.append(e['id'])]})
+    despachante.ultimo_id = 10
+
+    leituras = iter([([], [linha(11), linha(13)]),
+                     ([linha(12)], [linha(14)])])
+
+    with patch.object(despachante, '_ler', lambda: next(leituras)):
+        despachante.drenar()
+        despachante.drenar()
+
+    assert recebidos == [11, 13, 12, 14]
+    assert despachante.metricas()['lacunas_recuperadas'] == 1
+    assert despachante.metricas()['lacunas_pendentes'] == 0
+
+
+def test_despachante_isola_falha_de_assinante():
+    recebidos = []
+
+    def falha(evento):
+        raise RuntimeError('falhou')
+
+    despachante = Despachante(
+        assinantes={'*': [falha, lambda e: recebidos.append(e['id'])]})
+    despachante.ultimo_id = 0
+
+    with patch.object(despachante, '_ler', lambda: ([], [linha(1)])):
+        despachante.drenar()
+
+    assert recebidos == [1]
+    assert despachante.metricas()['falhas_assinantes'] == 1
+
+
+def test_purga_repete_lotes_ate_esvaziar():
+    apagados = iter([2, 2, 1])
+    cursor = MagicMock()
+
+    @contextmanager
+    def conexao():
+        yield cursor
+
+    def executar(*args):
+        cursor.rowcount = next(apagados)
+
+    cursor.execute.side_effect = executar
+    despachante = Despachante(assinantes={}, lote=2)
+
+    with patch('app.eventos.conexao', conexao):
+        assert despachante.purgar() == 5
+
+    assert cursor.execute.call_count == 3
+    assert despachante.metricas()['purgados'] == 5
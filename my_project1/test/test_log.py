@@ -0,0 +1,21 @@
+from app.log import ManipuladorFila
+import logging
+import queue
+
+
+def test_fila_cheia_descarta_sem_bloquear():
+    fila = queue.Queue(2)
+    manipulador = ManipuladorFila(fila)
+
+    logger = logging.getLogger('test_fila_cheia')
+    logger.propagate = False
+    logger.addHandler(manipulador)
+    try:
+        for i in range(5):
+            logger.warning(f'mensagem {i}')
+    finally:
+        logger.removeHandler(manipulador)
+
+    assert manipulador.descartados == 3
+    assert [fila.get_nowait().getMessage() for _ in range(2)] == [
+        'mensagem 0', 'mensagem 1']
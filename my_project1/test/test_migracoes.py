@@ -0,0 +1,23 @@
+from app.migracoes import listar_migracoes, ultima_versao
+from test.test_database import fake_conexao
+
+
+def test_migracoes_ordenadas_e_sem_lacunas():
+    versoes = [versao for versao, _, _ in listar_migracoes()]
+
+    assert versoes == list(range(1, len(versoes) + 1))
+    assert ultima_versao() == versoes[-1]
+
+
+def test_migracoes_possuem_descricao_e_aplicar():
+    for _, _, modulo in listar_migracoes():
+        assert modulo.DESCRICAO
+        assert callable(modulo.aplicar)
+
+
+def test_schema_de_teste_na_ultima_versao():
+    with fake_conexao() as cursor:
+        cursor.execute('SELECT MAX(versao) FROM schema_version')
+        versao = cursor.fetchone()[0]
+
+    assert versao == ultima_versao()
@@ -215,3 +215,38 @@ def test_bloquear_motorista_inexistente(client_app2, db_conexao, auth_headers):
 
     assert resp.status_code == 404
     assert 'erro' in resp.json
+
+
+def test_importar_motoristas_csv(client_api2, auth_headers):
+    csv = (
+        'nome,cnh,telefone,categoria_cnh,placa,modelo_carro,ano_carro,valor_passagem\n'
+        'ana lima,11111111111,21900000001,b,ABC1D23,Onix,2020,2.50\n'
+        'bruno reis,22222222222,21900000002,C,XYZ9K88,HB20,1970,3.00\n'
+        'carla dias,11111111111,21900000003,B,QWE4R56,Argo,2019,2.75\n'
+        'davi melo,33333333333,21900000004,E,RTY7U89,Gol,2018,abc\n'
+        'eva nunes,44444444444,21900000005,A,UIO1P23,Ka,2022,4.10\n'
+    )
+
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        resp = client_api2.post(
+            '/motoristas/import', headers=auth_headers,
+            data=csv.encode(), content_type='text/csv')
+
+    assert resp.status_code == 200
+    assert resp.json['processados'] == 5
+    assert resp.json['criados'] == 2
+    assert sorted(r['linha'] for r in resp.json['rejeicoes']) == [3, 4, 5]
+
+    with fake_conexao() as cursor:
+        cursor.execute(
+            "SELECT categoria_cnh FROM motoristas WHERE cnh = '11111111111'")
+        assert cursor.fetchone()[0] == 'B'
+
+
+def test_importar_motoristas_formato_invalido(client_api2, auth_headers):
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        resp = client_api2.post(
+            '/motoristas/import', headers=auth_headers,
+            data=b'<xml/>', content_type='application/xml')
+
+    assert resp.status_code == 415
@@ -0,0 +1,15 @@
+from app.paginacao import codificar_cursor, decodificar_cursor
+import pytest
+
+
+def test_cursor_ida_e_volta():
+    assert decodificar_cursor(codificar_cursor(42)) == 42
+
+
+def test_cursor_aceita_id_numerico():
+    assert decodificar_cursor('17') == 17
+
+
+def test_cursor_invalido():
+    with pytest.raises(ValueError):
+        decodificar_cursor('isso-nao-e-um-cursor')
@@ -233,3 +233,117 @@ def test_deletar_passageiro_inexistente(client_app1, db_conexao, auth_headers):
         )
 
     assert resp.status_code == 404
+
+
+def passageiro_lote(cpf, telefone):
+    return {
+        'nome': 'ana lima',
+        'cpf': cpf,
+        'telefone': telefone,
+        'saldo': '100.00',
+        'endereco_rua': 'Rua A',
+        'endereco_numero': '10',
+        'endereco_bairro': 'Centro',
+        'endereco_cidade': 'são paulo',
+        'endereco_estado': 'sp',
+        'endereco_cep': '01000-000',
+        'km': '5',
+        'metodo_pagamento': 'PIX'
+    }
+
+
+def test_adicionar_passageiros_em_lote(client_api1, auth_headers):
+    with fake_conexao() as cursor:
+        cursor.execute("""
+            INSERT INTO passageiros (
+                nome, cpf, telefone, saldo, endereco_rua, endereco_numero,
+                endereco_bairro, endereco_cidade, endereco_estado,
+                endereco_cep, km, metodo_pagamento
+            ) VALUES (
+                'Carlos', '11122233344', '11988887777', 30,
+                'Rua C', '10', 'Centro', 'Cidade',
+                'MG', '30000000', 5, 'debito'
+            )
+        """)
+
+    lote = [passageiro_lote('00000000001', '11900000001'),
+            passageiro_lote('11122233344', '11900000002'),
+            passageiro_lote('00000000001', '11900000003'),
+            {'nome': 'sem dados'},
+            passageiro_lote('00000000005', '11900000005')]
+
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        resp = client_api1.post(
+            '/passageiros/bulk', headers=auth_headers, json=lote)
+
+    status = [r['status'] for r in resp.json['resultados']]
+
+    assert resp.status_code == 207
+    assert resp.json['criados'] == 2
+    assert status == [201, 409, 409, 400, 201]
+    assert resp.json['resultados'][0]['id'] > 0
+
+
+def test_atualizar_passageiro_com_versao(client_api1, auth_headers):
+    with fake_conexao() as cursor:
+        cursor.execute("""
+            INSERT INTO passageiros (
+                nome, cpf, telefone, saldo, endereco_rua, endereco_numero,
+                endereco_bairro, endereco_cidade, endereco_estado,
+                endereco_cep, km, metodo_pagamento
+            ) VALUES (
+                'Ana', '43315690866', '11977776666', 40,
+                'Rua D', '20', 'Bairro', 'Cidade',
+                'SP', '04000000', 7, 'credito'
+            )
+        """)
+        novo_id = cursor.lastrowid
+
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        primeira = client_api1.put(
+            f'/passageiros/{novo_id}',
+            headers={**auth_headers, 'If-Match': '"1"'},
+            json={'saldo': 45.00})
+        obsoleta = client_api1.put(
+            f'/passageiros/{novo_id}',
+            headers=auth_headers,
+            json={'saldo': 50.00, 'versao': 1})
+
+    assert primeira.status_code == 200
+    assert primeira.json['versao'] == 2
+    assert obsoleta.status_code == 409
+    assert obsoleta.json['versao_atual'] == 2
+
+
+def test_atualizar_passageiro_com_etag_do_get(client_api1, auth_headers):
+    with fake_conexao() as cursor:
+        cursor.execute("""
+            INSERT INTO passageiros (
+                nome, cpf, telefone, saldo, endereco_rua, endereco_numero,
+                endereco_bairro, endereco_cidade, endereco_estado,
+                endereco_cep, km, metodo_pagamento
+            ) VALUES (
+                'Bia', '52998224725', '11966665555', 40,
+                'Rua E', '30', 'Bairro', 'Cidade',
+                'SP', '05000000', 3, 'pix'
+            )
+        """)
+        novo_id = cursor.lastrowid
+
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        etag = client_api1.get(
+            f'/passageiros/{novo_id}', headers=auth_headers).headers['ETag']
+
+        primeira = client_api1.put(
+            f'/passageiros/{novo_id}',
+            headers={**auth_headers, 'If-Match': etag},
+            json={'nome': 'Beatriz'})
+        obsoleta = client_api1.put(
+            f'/passageiros/{novo_id}',
+            headers={**auth_headers, 'If-Match': etag},
+            json={'nome': 'Bia'})
+
+    assert etag.startswith('W/"1.')
+    assert primeira.status_code == 200
+    assert primeira.json['versao'] == 2
+    assert obsoleta.status_code == 409
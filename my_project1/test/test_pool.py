@@ -0,0 +1,104 @@
+from unittest.mock import patch
+from mysql.connector import errors
+from app.pool import PoolConexoes
+import threading
+import pytest
+
+
+class ConexaoFake:
+    def __init__(self):
+        self.fechada = False
+        self.ping_ok = True
+
+    def ping(self, reconnect=False):
+        if not self.ping_ok:
+            raise errors.InterfaceError('conexão perdida')
+
+    def close(self):
+        self.fechada = True
+
+
+def criar_pool(**kwargs):
+    criadas = []
+
+    def fabrica():
+        con = ConexaoFake()
+        criadas.append(con)
+        return con
+
+    return PoolConexoes(fabrica, **kwargs), criadas
+
+
+def test_pool_preenche_tamanho_minimo():
+    pool, criadas = criar_pool(tamanho_min=3, tamanho_max=5)
+    pool.preencher()
+
+    assert len(criadas) == 3
+    assert pool.metricas()['ociosas'] == 3
+
+
+def test_pool_reutiliza_conexao_devolvida():
+    pool, criadas = criar_pool(tamanho_min=0, tamanho_max=2)
+
+    item = pool.obter()
+    pool.devolver(item)
+    item2 = pool.obter()
+
+    assert item2 is item
+    assert len(criadas) == 1
+
+
+def test_pool_esgotado_levanta_pool_error():
+    pool, _ = criar_pool(tamanho_min=0, tamanho_max=1, timeout_checkout=0.05)
+    pool.obter()
+
+    with pytest.raises(errors.PoolError):
+        pool.obter()
+
+    assert pool.metricas()['esgotamentos'] == 1
+
+
+def test_pool_espera_conexao_liberada():
+    pool, _ = criar_pool(tamanho_min=0, tamanho_max=1, timeout_checkout=2)
+    item = pool.obter()
+
+    threading.Timer(0.05, pool.devolver, args=(item,)).start()
+
+    assert pool.obter() is item
+    assert pool.metricas()['esperas'] == 1
+
+
+def test_pool_descarta_conexao_com_ping_falho():
+    pool, criadas = criar_pool(tamanho_min=0, tamanho_max=2)
+
+    item = pool.obter()
+    pool.devolver(item)
+    criadas[0].ping_ok = False
+
+    novo = pool.obter()
+
+    assert novo is not item
+    assert criadas[0].fechada
+    assert pool.metricas()['pings_falhos'] == 1
+
+
+def test_pool_descarta_conexao_expirada():
+    pool, criadas = criar_pool(tamanho_min=0, tamanho_max=2, vida_maxima=0)
+
+    item = pool.obter()
+    pool.devolver(item)
+
+    assert criadas[0].fechada
+    assert pool.metricas()['total'] == 0
+
+
+def test_pool_esgotado_responde_503(client_api1, auth_headers):
+    pool, _ = criar_pool(tamanho_min=0, tamanho_max=1, timeout_checkout=0.05)
+    pool.obter()
+
+    with patch('app.database.obter_pool', return_value=pool), \
+         patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        resp = client_api1.get('/passageiros/1', headers=auth_headers)
+
+    assert resp.status_code == 503
+    assert resp.json == {'erro': 'Serviço temporariamente indisponível!'}
@@ -0,0 +1,63 @@
+from unittest.mock import patch
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+from app.serializacao import (ProvedorJSONRapido,
+                               compilar_mapeador,
+                                data_http,
+                                 register_json)
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+import pytest
+import json
+
+
+def test_mapeador_compilado_e_reutilizado():
+    mapear = compilar_mapeador(('id', 'status'))
+
+    assert mapear((1, 'confirmada')) == {'id': 1, 'status': 'confirmada'}
+    assert compilar_mapeador(('id', 'status')) is mapear
+
+
+def test_data_http_igual_ao_werkzeug():
+    valores = [datetime(2024, 5, 17, 10, 30, 5),
+               datetime(2024, 1, 1, 1, 0, tzinfo=timezone(timedelta(hours=3))),
+               date(2020, 2, 29)]
+
+    for valor in valores:
+        assert data_http(valor) == http_date(valor)
+
+
+def test_provedor_rapido_equivale_ao_padrao():
+    app = Flask('teste')
+    registro = {'id': 1,
+                'total_viagem': Decimal('12.50'),
+                'criado_em': datetime(2024, 5, 17, 10, 30),
+                'nome': 'João'}
+
+    rapido = json.loads(ProvedorJSONRapido(app).dumps(registro))
+    padrao = json.loads(DefaultJSONProvider(app).dumps(registro))
+
+    assert rapido == padrao
+
+
+@pytest.mark.parametrize('debug', [False, True])
+def test_jsonify_usa_orjson(debug):
+    orjson = pytest.importorskip('orjson')
+    app = Flask('teste')
+    app.debug = debug
+    register_json(app)
+    registro = {'id': 1,
+                'total_viagem': Decimal('12.50'),
+                'criado_em': datetime(2024, 5, 17, 10, 30),
+                'nome': 'João'}
+
+    with app.app_context(), \
+         patch('orjson.dumps', wraps=orjson.dumps) as espiao:
+        rapido = app.json.response(registro)
+
+    padrao = DefaultJSONProvider(app).response(registro)
+
+    assert espiao.call_count == 1
+    assert json.loads(rapido.get_data()) == json.loads(padrao.get_data())
+    assert (b'\n  ' in rapido.get_data()) == debug
@@ -0,0 +1,101 @@
+from app.servidor import ServidorTrabalhador, Supervisor, _abrir_socket
+from app import create_api1, inicializar_app
+from unittest.mock import patch
+from flask import Flask
+import urllib.request
+import threading
+import pytest
+import time
+
+
+def criar_servidor(**kwargs):
+    app = Flask('teste')
+
+    @app.route('/')
+    def raiz():
+        return 'ok'
+
+    sock = _abrir_socket('127.0.0.1', 0, reuseport=False)
+    try:
+        return ServidorTrabalhador(
+            '127.0.0.1', 0, app, sock.fileno(), **kwargs)
+    finally:
+        sock.close()
+
+
+def requisitar(servidor):
+    url = f'http://127.0.0.1:{servidor.port}/'
+    return urllib.request.urlopen(url, timeout=5).read()
+
+
+def test_servidor_recicla_apos_max_requisicoes():
+    servidor = criar_servidor(threads=2, max_requisicoes=3)
+    thread = threading.Thread(target=servidor.serve_forever)
+    thread.start()
+
+    respostas = [requisitar(servidor) for _ in range(3)]
+
+    thread.join(timeout=5)
+    servidor.drenar()
+
+    assert not thread.is_alive()
+    assert respostas == [b'ok'] * 3
+    assert servidor.atendidas == 3
+
+
+def test_servidor_drena_ao_encerrar():
+    servidor = criar_servidor(threads=2)
+    thread = threading.Thread(target=servidor.serve_forever)
+    thread.start()
+
+    assert requisitar(servidor) == b'ok'
+
+    servidor.encerrar()
+    thread.join(timeout=5)
+    servidor.drenar()
+
+    assert not thread.is_alive()
+    assert servidor.atendidas == 1
+
+
+def test_servidor_rejeita_threads_invalidas():
+    with pytest.raises(ValueError):
+        criar_servidor(threads=0)
+
+
+def test_supervisor_adia_reinicio_sem_bloquear():
+    supervisor = Supervisor(['api1'])
+    supervisor._filhos = {123: ('api1', 0, time.monotonic())}
+
+    with patch('app.servidor.os.waitpid', side_effect=[(123, 256), (0, 0)]), \
+         patch('app.servidor.time.sleep') as dormir, \
+         patch.object(supervisor, '_iniciar_filho') as iniciar:
+        supervisor._recolher()
+        supervisor._reiniciar_pendentes()
+
+        assert not dormir.called
+        assert not iniciar.called
+        assert ('api1', 0) in supervisor._reinicios
+
+        supervisor._reinicios[('api1', 0)] = time.monotonic()
+        supervisor._reiniciar_pendentes()
+
+    iniciar.assert_called_once_with('api1', 0)
+    assert not supervisor._reinicios
+
+
+def test_app_inicializa_na_primeira_requisicao(auth_headers):
+    with patch('app.inicializador_banco') as banco, \
+         patch('app.preencher_pool') as pool, \
+         patch('app.iniciar_despachante') as despachante, \
+         patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        app = create_api1()
+        assert not banco.called and not pool.called
+
+        app.test_client().get('/metricas', headers=auth_headers)
+        app.test_client().get('/metricas', headers=auth_headers)
+        inicializar_app(app)
+
+        assert banco.call_count == 1
+        assert pool.call_count == 1
+        assert despachante.call_count == 1
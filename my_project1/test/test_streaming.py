@@ -0,0 +1,45 @@
+from unittest.mock import patch, MagicMock
+from flask import Flask
+from app.pool import PoolConexoes
+from app.streaming import resposta_streaming
+import json
+
+
+def pool_com_linhas(*lotes):
+    pool = PoolConexoes(MagicMock, tamanho_min=0, tamanho_max=1)
+    item = pool.obter()
+    cursor = item.con.cursor.return_value
+    cursor.description = [('id',), ('status',)]
+    cursor.fetchmany.side_effect = lotes
+    pool.devolver(item)
+    return pool
+
+
+def test_streaming_descarta_conexao_se_cliente_desconecta():
+    pool = pool_com_linhas([(1, 'confirmada')], [(2, 'confirmada')], [])
+    app = Flask('teste')
+
+    with patch('app.streaming.obter_pool', return_value=pool), \
+         app.test_request_context():
+        pedacos = iter(resposta_streaming('SELECT', ()).response)
+        assert next(pedacos) == '['
+        next(pedacos)
+        pedacos.close()
+
+    metricas = pool.metricas()
+    assert metricas['descartadas'] == 1
+    assert metricas['total'] == 0
+
+
+def test_streaming_marca_lista_truncada_em_erro():
+    pool = pool_com_linhas([(1, 'confirmada')], RuntimeError('caiu'))
+    app = Flask('teste')
+
+    with patch('app.streaming.obter_pool', return_value=pool), \
+         app.test_request_context():
+        corpo = ''.join(resposta_streaming('SELECT', ()).response)
+
+    assert json.loads(corpo) == [
+        {'id': 1, 'status': 'confirmada'},
+        {'erro': 'Listagem interrompida!', 'linhas': 1}]
+    assert pool.metricas()['descartadas'] == 1
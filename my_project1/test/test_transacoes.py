@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+from unittest.mock import patch, MagicMock
+from mysql.connector import errors
+from app.pool import PoolConexoes
+from app import database
+import pytest
+
+
+def conexao_com_falhas(falhas):
+    @contextmanager
+    def conexao():
+        if falhas:
+            raise errors.DatabaseError(errno=falhas.pop(0))
+        yield None
+    return conexao
+
+
+def test_transacao_repetida_apos_deadlock():
+    antes = database.metricas_transacoes()
+
+    with patch('app.database.conexao', conexao_com_falhas([1213, 1205])), \
+         patch('app.database.time.sleep') as espera:
+        assert database.executar_transacao(lambda cursor: 'ok') == 'ok'
+
+    depois = database.metricas_transacoes()
+    assert espera.call_count == 2
+    assert depois['deadlocks'] == antes['deadlocks'] + 1
+    assert depois['lock_timeouts'] == antes['lock_timeouts'] + 1
+
+
+def test_transacao_esgota_tentativas():
+    falhas = [1213] * database.config.TRANSACAO_TENTATIVAS
+
+    with patch('app.database.conexao', conexao_com_falhas(falhas)), \
+         patch('app.database.time.sleep'):
+        with pytest.raises(errors.DatabaseError):
+            database.executar_transacao(lambda cursor: 'ok')
+
+
+def test_transacao_nao_repete_outros_erros():
+    with patch('app.database.conexao', conexao_com_falhas([1062, 1062])), \
+         patch('app.database.time.sleep') as espera:
+        with pytest.raises(errors.DatabaseError):
+            database.executar_transacao(lambda cursor: 'ok')
+
+    espera.assert_not_called()
+
+
+def test_transacao_repetida_sem_contexto_flask():
+    # Trabalhadores de fundo usam a conexao() real, fora de requisição.
+    pool = PoolConexoes(MagicMock, tamanho_min=0, tamanho_max=1)
+    falhas = [1213]
+
+    def reservar(cursor):
+        if falhas:
+            raise errors.DatabaseError(errno=falhas.pop(0))
+        return 'ok'
+
+    with patch('app.database.obter_pool', return_value=pool), \
+         patch('app.database.time.sleep') as espera:
+        assert database.executar_transacao(reservar) == 'ok'
+
+    assert espera.call_count == 1
@@ -1,5 +1,19 @@
 from unittest.mock import patch
 from test.test_database import fake_conexao
+from app import cache
+from app import eventos
+from app.eventos import Despachante
+from app.pagamentos_automaticos import TrabalhadorPagamentos
+from app.ganhos import ConsolidadorGanhos
+from app.lancamentos import ConsolidadorLancamentos
+from app.reservas import LiberadorReservas, validar_configuracao
+from app.routes.trips import (reservar_saldo, liquidar_reserva,
+                              registrar_viagem_lancamentos)
+from app.database import executar_transacao, metricas_transacoes
+from decimal import Decimal
+import pytest
+import json
+import threading
 
 
 
@@ -236,3 +250,572 @@ def test_cancelar_viagem_inexistente(client_app3, db_conexao, auth_headers):
 
     assert resp.status_code == 404
     assert 'erro' in resp.json
+
+
+def inserir_viagens(quantidade):
+    id_passageiro, id_motorista = inserir_passageiro_e_motorista()
+
+    with fake_conexao() as cursor:
+        for _ in range(quantidade):
+            cursor.execute("""
+                INSERT INTO viagens
+                (id_passageiro, id_motorista, nome_passageiro, nome_motorista,
+                 endereco_rua, endereco_numero, endereco_bairro,
+                 endereco_cidade, endereco_estado, endereco_cep,
+                 valor_por_km, total_viagem, metodo_pagamento, status)
+                VALUES
+                (%s, %s, 'Maria', 'João',
+                 'Rua A', '10', 'Centro',
+                 'SP', 'SP', '01000000',
+                 2.50, 12.50, 'pix', 'confirmada')
+            """, (id_passageiro, id_motorista))
+
+    return id_passageiro, id_motorista
+
+
+def test_listar_viagens_paginado(client_api3, auth_headers):
+    inserir_viagens(3)
+
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        pagina1 = client_api3.get('/viagens/?limit=2', headers=auth_headers)
+        cursor = pagina1.headers['X-Proximo-Cursor']
+        pagina2 = client_api3.get(
+            f'/viagens/?limit=2&after={cursor}', headers=auth_headers)
+
+    assert pagina1.status_code == 200
+    assert len(pagina1.json) == 2
+    assert len(pagina2.json) == 1
+    assert pagina2.json[0]['id'] > pagina1.json[-1]['id']
+    assert 'X-Proximo-Cursor' not in pagina2.headers
+
+
+def test_listar_viagens_limit_invalido(client_api3, auth_headers):
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        resp = client_api3.get('/viagens/?limit=abc', headers=auth_headers)
+
+    assert resp.status_code == 400
+    assert 'erro' in resp.json
+
+
+def test_listar_viagens_streaming(client_api3, auth_headers):
+    inserir_viagens(3)
+
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        resp = client_api3.get(
+            '/viagens/?stream=true&limit=1', headers=auth_headers)
+        corpo = json.loads(resp.get_data(as_text=True))
+
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    assert len(corpo) == 3
+    assert [v['id'] for v in corpo] == sorted(v['id'] for v in corpo)
+
+
+def test_listar_viagens_filtradas(client_api3, auth_headers):
+    _, id_motorista = inserir_viagens(3)
+
+    with fake_conexao() as cursor:
+        cursor.execute("""
+            UPDATE viagens SET status = 'cancelada'
+                ORDER BY id LIMIT 1""")
+
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        resp = client_api3.get(
+            f'/viagens/?status=confirmada&id_motorista={id_motorista}'
+            '&criado_desde=2000-01-01', headers=auth_headers)
+        invalido = client_api3.get(
+            '/viagens/?status=perdida', headers=auth_headers)
+
+    assert resp.status_code == 200
+    assert len(resp.json) == 2
+    assert all(v['status'] == 'confirmada' for v in resp.json)
+    assert invalido.status_code == 400
+
+
+def test_buscar_viagem_campos_esparsos(client_api3, auth_headers):
+    id_viagem = inserir_viagem()
+
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        resp = client_api3.get(
+            f'/viagens/{id_viagem}?fields=status,total_viagem',
+            headers=auth_headers)
+        invalido = client_api3.get(
+            f'/viagens/{id_viagem}?fields=senha', headers=auth_headers)
+
+    assert resp.status_code == 200
+    assert set(resp.json) == {'id', 'status', 'total_viagem'}
+    assert invalido.status_code == 400
+
+
+def test_buscar_viagem_condicional(client_api3, auth_headers):
+    id_viagem = inserir_viagem()
+
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        resp = client_api3.get(f'/viagens/{id_viagem}', headers=auth_headers)
+        etag = resp.headers['ETag']
+
+        nao_modificada = client_api3.get(
+            f'/viagens/{id_viagem}',
+            headers={**auth_headers, 'If-None-Match': etag})
+
+        with fake_conexao() as cursor:
+            cursor.execute("""
+                UPDATE viagens SET status = 'cancelada',
+                       atualizado_em = atualizado_em + INTERVAL 1 SECOND
+                    WHERE id = %s""", (id_viagem,))
+        cache.invalidar('viagens', id_viagem)
+
+        modificada = client_api3.get(
+            f'/viagens/{id_viagem}',
+            headers={**auth_headers, 'If-None-Match': etag})
+
+    assert resp.status_code == 200
+    assert 'Last-Modified' in resp.headers
+    assert nao_modificada.status_code == 304
+    assert nao_modificada.get_data() == b''
+    assert modificada.status_code == 200
+    assert modificada.json['status'] == 'cancelada'
+
+
+def test_adicionar_viagem_debita_saldo_e_credita_motorista(
+        client_api3, auth_headers):
+    id_passageiro, id_motorista = inserir_passageiro_e_motorista()
+
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        resp = client_api3.post(
+            '/viagens/', headers=auth_headers,
+            json={'id_passageiro': id_passageiro,
+                  'id_motorista': id_motorista})
+
+    assert resp.status_code == 201
+
+    with fake_conexao() as cursor:
+        cursor.execute('SELECT saldo FROM passageiros WHERE id = %s',
+                       (id_passageiro,))
+        saldo = cursor.fetchone()[0]
+        cursor.execute('SELECT quantia FROM motoristas WHERE id = %s',
+                       (id_motorista,))
+        quantia = cursor.fetchone()[0]
+        cursor.execute('''SELECT total_viagem, nome_passageiro
+                            FROM viagens WHERE id = %s''', (resp.json['id'],))
+        viagem = cursor.fetchone()
+
+    assert saldo == 137.50
+    assert quantia == 712.50
+    assert viagem == (12.50, 'Maria')
+
+
+def test_adicionar_viagem_motorista_bloqueado(client_api3, auth_headers):
+    id_passageiro, id_motorista = inserir_passageiro_e_motorista()
+
+    with fake_conexao() as cursor:
+        cursor.execute("UPDATE motoristas SET status = 'bloqueado' WHERE id = %s",
+                       (id_motorista,))
+
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        resp = client_api3.post(
+            '/viagens/', headers=auth_headers,
+            json={'id_passageiro': id_passageiro,
+                  'id_motorista': id_motorista})
+
+    assert resp.status_code == 409
+
+    with fake_conexao() as cursor:
+        cursor.execute('SELECT saldo FROM passageiros WHERE id = %s',
+                       (id_passageiro,))
+        assert cursor.fetchone()[0] == 150
+
+
+def test_adicionar_viagem_idempotente(client_api3, auth_headers):
+    id_passageiro, id_motorista = inserir_passageiro_e_motorista()
+    headers = {**auth_headers, 'Idempotency-Key': 'reserva-123'}
+    corpo = {'id_passageiro': id_passageiro, 'id_motorista': id_motorista}
+
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        primeira = client_api3.post('/viagens/', headers=headers, json=corpo)
+        repetida = client_api3.post('/viagens/', headers=headers, json=corpo)
+
+    assert primeira.status_code == 201
+    assert repetida.status_code == 201
+    assert repetida.json == primeira.json
+    assert repetida.headers['Idempotent-Replayed'] == 'true'
+
+    with fake_conexao() as cursor:
+        cursor.execute('SELECT COUNT(*) FROM viagens')
+        assert cursor.fetchone()[0] == 1
+        cursor.execute('SELECT saldo FROM passageiros WHERE id = %s',
+                       (id_passageiro,))
+        assert cursor.fetchone()[0] == 137.50
+
+
+def test_adicionar_viagem_chave_reutilizada(client_api3, auth_headers):
+    id_passageiro, id_motorista = inserir_passageiro_e_motorista()
+    headers = {**auth_headers, 'Idempotency-Key': 'reserva-456'}
+
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        client_api3.post(
+            '/viagens/', headers=headers,
+            json={'id_passageiro': id_passageiro,
+                  'id_motorista': id_motorista})
+        resp = client_api3.post(
+            '/viagens/', headers=headers,
+            json={'id_passageiro': id_passageiro,
+                  'id_motorista': id_motorista + 1})
+
+    assert resp.status_code == 422
+
+
+def test_adicionar_viagem_publica_evento(client_api3, auth_headers):
+    id_passageiro, id_motorista = inserir_passageiro_e_motorista()
+    recebidos = []
+    despachante = Despachante(
+        assinantes={eventos.VIAGEM_CRIADA: [recebidos.append]})
+    despachante.posicionar()
+
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        resp = client_api3.post(
+            '/viagens/', headers=auth_headers,
+            json={'id_passageiro': id_passageiro,
+                  'id_motorista': id_motorista})
+
+    assert despachante.drenar() == 1
+    assert recebidos[0]['id_entidade'] == resp.json['id']
+    assert recebidos[0]['dados'] == {'id_passageiro': id_passageiro,
+                                     'id_motorista': id_motorista}
+
+
+def test_adicionar_viagem_com_pagamento_automatico(
+        client_api3, client_api4, auth_headers):
+    id_passageiro, id_motorista = inserir_passageiro_e_motorista()
+
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        resp = client_api3.post(
+            '/viagens/', headers=auth_headers,
+            json={'id_passageiro': id_passageiro,
+                  'id_motorista': id_motorista,
+                  'registrar_pagamento': True})
+        fila = client_api4.get(
+            f"/registros-pagamento/fila?id_viagem={resp.json['id']}",
+            headers=auth_headers)
+
+    assert resp.status_code == 201
+    assert resp.json['registro_pagamento'] == 'pendente'
+    assert fila.json['pendentes'] == 1
+    assert fila.json['pendente'] is True
+
+    assert TrabalhadorPagamentos().processar_lote() == 1
+
+    with fake_conexao() as cursor:
+        cursor.execute('''SELECT valor_viagem FROM registros_pagamento
+                            WHERE id_viagem = %s''', (resp.json['id'],))
+        assert cursor.fetchall() == [(12.50,)]
+        cursor.execute('SELECT COUNT(*) FROM fila_pagamentos')
+        assert cursor.fetchone()[0] == 0
+
+
+def test_ganhos_adiados_somam_pendentes(client_api2, client_api3, auth_headers):
+    id_passageiro, id_motorista = inserir_passageiro_e_motorista()
+
+    with patch('app.config.GANHOS_ADIADOS', True), \
+         patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        client_api3.post(
+            '/viagens/', headers=auth_headers,
+            json={'id_passageiro': id_passageiro,
+                  'id_motorista': id_motorista})
+        antes = client_api2.get(f'/motoristas/{id_motorista}',
+                                headers=auth_headers)
+
+        with fake_conexao() as cursor:
+            cursor.execute('SELECT quantia FROM motoristas WHERE id = %s',
+                           (id_motorista,))
+            assert cursor.fetchone()[0] == 700
+
+        assert ConsolidadorGanhos().consolidar() == 1
+        depois = client_api2.get(f'/motoristas/{id_motorista}',
+                                 headers=auth_headers)
+
+    assert antes.json['quantia'] == depois.json['quantia'] == '712.50'
+
+    with fake_conexao() as cursor:
+        cursor.execute('SELECT quantia FROM motoristas WHERE id = %s',
+                       (id_motorista,))
+        assert cursor.fetchone()[0] == 712.50
+
+
+def test_saldos_por_lancamentos(client_api1, client_api3, auth_headers):
+    id_passageiro, id_motorista = inserir_passageiro_e_motorista()
+
+    with patch('app.config.SALDOS_LANCAMENTOS', True), \
+         patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        resp = client_api3.post(
+            '/viagens/', headers=auth_headers,
+            json={'id_passageiro': id_passageiro,
+                  'id_motorista': id_motorista})
+        passageiro = client_api1.get(f'/passageiros/{id_passageiro}',
+                                     headers=auth_headers)
+        extrato = client_api1.get(
+            f'/passageiros/{id_passageiro}/lancamentos', headers=auth_headers)
+
+        assert ConsolidadorLancamentos().consolidar() == 2
+        depois = client_api1.get(f'/passageiros/{id_passageiro}',
+                                 headers=auth_headers)
+
+    assert resp.status_code == 201
+    assert passageiro.json['saldo'] == '137.50'
+    assert depois.json['saldo'] == '137.50'
+    assert [l['valor'] for l in extrato.json] == ['-12.50']
+
+    with fake_conexao() as cursor:
+        cursor.execute('SELECT SUM(valor) FROM lancamentos')
+        assert cursor.fetchone()[0] == 0
+        cursor.execute('SELECT saldo FROM passageiros WHERE id = %s',
+                       (id_passageiro,))
+        assert cursor.fetchone()[0] == 150
+        cursor.execute('''SELECT conta, saldo FROM saldos_snapshot
+                            ORDER BY conta''')
+        assert cursor.fetchall() == [('passageiro', -12.50),
+                                     ('motorista', 12.50)]
+
+def test_reservas_simultaneas_do_mesmo_passageiro_sem_deadlock():
+    id_passageiro, id_motorista = inserir_passageiro_e_motorista()
+
+    # Saldo para uma só reserva de 12.50.
+    with fake_conexao() as cursor:
+        cursor.execute('UPDATE passageiros SET saldo = 20 WHERE id = %s',
+                       (id_passageiro,))
+
+    antes = metricas_transacoes()['deadlocks']
+    largada = threading.Barrier(2)
+    resultados = []
+
+    def reservar():
+        largada.wait()
+        resultados.append(executar_transacao(
+            registrar_viagem_lancamentos, id_passageiro, id_motorista))
+
+    threads = [threading.Thread(target=reservar) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(erro is None for _, erro in resultados) == [False, True]
+    assert ('Saldo insuficiente!', 400) in [erro for _, erro in resultados]
+    assert metricas_transacoes()['deadlocks'] == antes
+
+    with fake_conexao() as cursor:
+        cursor.execute('SELECT COUNT(*) FROM viagens')
+        assert cursor.fetchone()[0] == 1
+        cursor.execute('''SELECT SUM(valor) FROM lancamentos
+                            WHERE conta = 'passageiro' ''')
+        assert cursor.fetchone()[0] == -12.50
+
+
+def test_consolidacao_pega_lancamento_confirmado_fora_de_ordem():
+    id_passageiro, _ = inserir_passageiro_e_motorista()
+    partidas = "('x', 'ajuste', 'passageiro', %s, %s, %s)"
+
+    with fake_conexao() as cursor:
+        cursor.execute(f'''
+            INSERT INTO lancamentos
+                (referencia, tipo, conta, id_conta, valor, id)
+                VALUES {partidas}''', (id_passageiro, -10, 1000))
+
+    assert ConsolidadorLancamentos().consolidar() == 1
+
+    # Id menor que o já consolidado, como uma transação que pegou o id
+    # antes e confirmou depois.
+    with fake_conexao() as cursor:
+        cursor.execute(f'''
+            INSERT INTO lancamentos
+                (referencia, tipo, conta, id_conta, valor, id)
+                VALUES {partidas}''', (id_passageiro, -5, 500))
+
+    assert ConsolidadorLancamentos().consolidar() == 1
+
+    with fake_conexao() as cursor:
+        cursor.execute('''SELECT saldo FROM saldos_snapshot
+                            WHERE conta = 'passageiro' AND id_conta = %s''',
+                       (id_passageiro,))
+        assert cursor.fetchone()[0] == -15
+
+
+def test_reserva_em_duas_fases(client_api3, auth_headers):
+    id_passageiro, id_motorista = inserir_passageiro_e_motorista()
+
+    with patch('app.config.RESERVA_DUAS_FASES', True), \
+         patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        resp = client_api3.post(
+            '/viagens/', headers=auth_headers,
+            json={'id_passageiro': id_passageiro,
+                  'id_motorista': id_motorista})
+
+    assert resp.status_code == 201
+
+    with fake_conexao() as cursor:
+        cursor.execute('SELECT saldo FROM passageiros WHERE id = %s',
+                       (id_passageiro,))
+        assert cursor.fetchone()[0] == 137.50
+        cursor.execute('SELECT quantia FROM motoristas WHERE id = %s',
+                       (id_motorista,))
+        assert cursor.fetchone()[0] == 712.50
+        cursor.execute('SELECT COUNT(*) FROM reservas_saldo')
+        assert cursor.fetchone()[0] == 0
+
+
+def test_reserva_em_duas_fases_motorista_suspenso(client_api3):
+    id_passageiro, id_motorista = inserir_passageiro_e_motorista()
+
+    with fake_conexao() as cursor:
+        id_reserva, falha = reservar_saldo(
+            cursor, id_passageiro, id_motorista)
+
+    assert falha is None
+
+    with fake_conexao() as cursor:
+        cursor.execute('''UPDATE motoristas SET status = 'suspenso'
+                            WHERE id = %s''', (id_motorista,))
+
+    with fake_conexao() as cursor:
+        novo_id, falha = liquidar_reserva(cursor, id_reserva)
+
+    assert novo_id is None
+    assert falha[1] == 409
+
+    with fake_conexao() as cursor:
+        cursor.execute('SELECT COUNT(*) FROM viagens WHERE id_motorista = %s',
+                       (id_motorista,))
+        assert cursor.fetchone()[0] == 0
+        cursor.execute('SELECT COUNT(*) FROM reservas_saldo WHERE id = %s',
+                       (id_reserva,))
+        assert cursor.fetchone()[0] == 1
+
+
+def test_reserva_em_duas_fases_repetida_nao_segura_saldo(
+        client_api3, auth_headers):
+    id_passageiro, id_motorista = inserir_passageiro_e_motorista()
+    cabecalhos = {**auth_headers, 'Idempotency-Key': 'duas-fases-1'}
+    corpo = {'id_passageiro': id_passageiro, 'id_motorista': id_motorista}
+
+    with patch('app.config.RESERVA_DUAS_FASES', True), \
+         patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        primeira = client_api3.post(
+            '/viagens/', headers=cabecalhos, json=corpo)
+
+        with patch('app.routes.trips.reservar_saldo') as reservar:
+            repetida = client_api3.post(
+                '/viagens/', headers=cabecalhos, json=corpo)
+
+    assert primeira.status_code == repetida.status_code == 201
+    assert repetida.headers['Idempotent-Replayed'] == 'true'
+    reservar.assert_not_called()
+
+    with fake_conexao() as cursor:
+        cursor.execute('SELECT saldo FROM passageiros WHERE id = %s',
+                       (id_passageiro,))
+        assert cursor.fetchone()[0] == 137.50
+
+
+def test_duas_fases_recusa_saldos_por_lancamentos():
+    with patch('app.config.RESERVA_DUAS_FASES', True), \
+         patch('app.config.SALDOS_LANCAMENTOS', True):
+        with pytest.raises(ValueError):
+            validar_configuracao()
+
+
+def test_reserva_nao_altera_versao(client_api3, auth_headers):
+    id_passageiro, id_motorista = inserir_passageiro_e_motorista()
+
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        viagem = client_api3.post(
+            '/viagens/', headers=auth_headers,
+            json={'id_passageiro': id_passageiro,
+                  'id_motorista': id_motorista})
+
+    assert viagem.status_code == 201
+
+    with fake_conexao() as cursor:
+        cursor.execute('SELECT versao FROM passageiros WHERE id = %s',
+                       (id_passageiro,))
+        assert cursor.fetchone()[0] == 1
+        cursor.execute('SELECT versao FROM motoristas WHERE id = %s',
+                       (id_motorista,))
+        assert cursor.fetchone()[0] == 1
+
+
+def test_reserva_arredonda_meio_centavo_para_o_par(client_api3, auth_headers):
+    id_passageiro, id_motorista = inserir_passageiro_e_motorista()
+
+    # 2.25 * 0.50 = 1.125: Decimal.quantize dá 1.12, ROUND() do MySQL, 1.13.
+    with fake_conexao() as cursor:
+        cursor.execute('UPDATE passageiros SET km = 0.50 WHERE id = %s',
+                       (id_passageiro,))
+        cursor.execute(
+            'UPDATE motoristas SET valor_passagem = 2.25 WHERE id = %s',
+            (id_motorista,))
+
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        resp = client_api3.post(
+            '/viagens/', headers=auth_headers,
+            json={'id_passageiro': id_passageiro,
+                  'id_motorista': id_motorista})
+
+    assert resp.status_code == 201
+
+    with fake_conexao() as cursor:
+        cursor.execute('SELECT total_viagem FROM viagens WHERE id = %s',
+                       (resp.json['id'],))
+        assert cursor.fetchone()[0] == Decimal('1.12')
+        cursor.execute('SELECT saldo FROM passageiros WHERE id = %s',
+                       (id_passageiro,))
+        assert cursor.fetchone()[0] == Decimal('148.88')
+
+def test_reserva_expirada_liberada(client_api3):
+    id_passageiro, id_motorista = inserir_passageiro_e_motorista()
+
+    with patch('app.config.RESERVA_VALIDADE', 0):
+        with fake_conexao() as cursor:
+            id_reserva, falha = reservar_saldo(
+                cursor, id_passageiro, id_motorista)
+
+    assert falha is None
+
+    with fake_conexao() as cursor:
+        cursor.execute('SELECT saldo FROM passageiros WHERE id = %s',
+                       (id_passageiro,))
+        assert cursor.fetchone()[0] == 137.50
+        cursor.execute('SELECT valor FROM reservas_saldo WHERE id = %s',
+                       (id_reserva,))
+        assert cursor.fetchone()[0] == 12.50
+
+    assert LiberadorReservas().liberar() == 1
+
+    with fake_conexao() as cursor:
+        cursor.execute('SELECT saldo FROM passageiros WHERE id = %s',
+                       (id_passageiro,))
+        assert cursor.fetchone()[0] == 150
+        cursor.execute('SELECT COUNT(*) FROM reservas_saldo WHERE id = %s',
+                       (id_reserva,))
+        assert cursor.fetchone()[0] == 0
+
+
+def test_api_unica_atende_todos_os_recursos(client_api_unica, auth_headers):
+    id_passageiro, id_motorista = inserir_passageiro_e_motorista()
+
+    with patch('app.auth.validar_token', return_value=({'sub': 1}, 200)):
+        viagem = client_api_unica.post(
+            '/viagens/', headers=auth_headers,
+            json={'id_passageiro': id_passageiro,
+                  'id_motorista': id_motorista})
+        passageiro = client_api_unica.get(
+            f'/passageiros/{id_passageiro}', headers=auth_headers)
+        motorista = client_api_unica.get(
+            f'/motoristas/{id_motorista}', headers=auth_headers)
+        registro = client_api_unica.post(
+            '/registros-pagamento/', headers=auth_headers,
+            json={'id_viagem': viagem.json['id']})
+
+    assert viagem.status_code == 201
+    assert passageiro.json['saldo'] == '137.50'
+    assert motorista.json['quantia'] == '712.50'
+    assert registro.status_code == 201